@@ -1,27 +1,30 @@
 """
-AI Engine & Analytics Logic
-Handles data processing, statistical analysis, and recovery predictions.
-NOW INTEGRATED WITH LIVE ML MODEL (rehab_model.pkl)
+AI Engine
+Live form-quality checks with the ML model (rehab_model.pkl), plus full-history
+and cohort analytics on the columnar analytics core. The per-user routes serve
+the same output from incremental rollups (analytics_rollup).
 """
-import random
-import time
 import os
-import joblib
 import numpy as np
-from datetime import datetime, timedelta
+
+import analytics_core
+from analytics_core import SessionColumns
 
 class AIEngine:
     
     # Global model cache
     _model = None
+    _load_attempted = False
     
     @classmethod
     def load_model(cls):
-        """Loads the trained Random Forest model (rehab_model.pkl)"""
-        if cls._model is None:
+        """Loads the trained Random Forest model (rehab_model.pkl) on first use"""
+        if not cls._load_attempted:
+            cls._load_attempted = True
             try:
                 model_path = os.path.join(os.path.dirname(__file__), "rehab_model.pkl")
                 if os.path.exists(model_path):
+                    import joblib  # Deferred: pulls in sklearn, only needed by live sessions
                     cls._model = joblib.load(model_path)
                     print(f"✅ AI Model Loaded: {model_path}")
                 else:
@@ -55,171 +58,16 @@ class AIEngine:
     @staticmethod
     def get_detailed_analytics(sessions):
         """Processes session history for the Analytics graphs."""
-        history = []
-        exercise_counts = {}
-        total_acc_sum = 0
-        count_acc = 0
-
-        for s in sessions:
-            reps = s.get('total_reps', 0)
-            errors = s.get('total_errors', 0)
-            exercise = s.get('exercise', 'Freestyle') 
-            
-            # Calculate real accuracy based on recorded errors
-            acc = 100
-            if reps > 0:
-                # Standard calculation: (Total Reps - Errors) / Total Reps * 100
-                acc = max(0, int((reps - errors) / reps * 100)) # << FIX APPLIED: Changed heuristic to standard accuracy
-            
-            date_str = s.get('date', 'Unknown')
-            history.append({
-                'date': date_str,
-                'date_short': date_str[5:] if len(date_str) >= 10 else date_str,
-                'reps': reps,
-                'accuracy': acc,
-                'duration': s.get('duration', 0)
-            })
-            
-            if exercise in exercise_counts:
-                exercise_counts[exercise] += reps
-            else:
-                exercise_counts[exercise] = reps
-                
-            if reps > 0:
-                total_acc_sum += acc
-                count_acc += 1
-
-        exercise_stats = [{'name': k, 'total_reps': v} for k, v in exercise_counts.items()]
-        avg_accuracy = round(total_acc_sum / count_acc) if count_acc > 0 else 100
-
-        return {
-            'history': history,
-            'exercise_stats': exercise_stats,
-            'average_accuracy': avg_accuracy
-        }
+        return analytics_core.detailed_analytics(SessionColumns.from_sessions(sessions))
 
     @staticmethod
     def get_recovery_prediction(sessions):
         """Generates AI predictions for ROM, Asymmetry, Recommendations, and Session History."""
         if not sessions:
             return None
+        return analytics_core.recovery_predictions(SessionColumns.from_sessions(sessions))[0]
 
-        # 1. COMPLIANCE & STREAK
-        dates = [s['date'] for s in sessions]
-        today = datetime.now().date()
-        date_set = set(dates)
-        
-        loop_date = today
-        current_streak = 0
-        if loop_date.strftime("%Y-%m-%d") not in date_set:
-             yesterday = loop_date - timedelta(days=1)
-             if yesterday.strftime("%Y-%m-%d") in date_set:
-                 loop_date = yesterday
-
-        while loop_date.strftime("%Y-%m-%d") in date_set:
-            current_streak += 1
-            loop_date -= timedelta(days=1)
-        
-        last_7_days = [(today - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
-        days_trained = sum(1 for d in last_7_days if d in date_set)
-        adherence = int((days_trained / 7) * 100)
-
-        # 2. ASYMMETRY
-        total_right = sum(s.get('right_reps', 0) for s in sessions)
-        total_left = sum(s.get('left_reps', 0) for s in sessions)
-        total_limb = total_right + total_left
-        asymmetry = 0
-        if total_limb > 0:
-            asymmetry = abs(total_right - total_left) / total_limb * 100
-
-        # 3. AI METRICS & SESSION HISTORY
-        recent_sessions = sessions[-5:]
-        rom_progress = []
-        stability_score = 0
-        session_history = []
-
-        # If user has only 1 session, add a dummy "Baseline" point
-        if len(recent_sessions) == 1:
-            try:
-                base_date = datetime.strptime(recent_sessions[0]['date'], "%Y-%m-%d")
-                prev_date = (base_date - timedelta(days=1)).strftime("%Y-%m-%d")
-                rom_progress.append({'date': prev_date[5:], 'rom': 70}) 
-            except:
-                pass
-
-        for s in sessions:
-            reps = s.get('total_reps', 1) or 1
-            errors = s.get('total_errors', 0)
-            
-            # Calculate accuracy based on successful reps (Reps - Errors) / Reps
-            acc = max(0, int((reps - errors) / reps * 100)) # << FIX APPLIED: Changed heuristic to standard accuracy
-            
-            # Predict ROM based on Accuracy (Better form = Better ROM potential)
-            base_rom = 85 + (acc * 0.5) 
-            rom_val = min(145, max(60, int(base_rom))) # Removed random jitter for stability
-            
-            date_label = s.get('date', 'Unknown')
-            
-            session_history.append({
-                'date': date_label,
-                'accuracy': acc,
-                'reps': reps,
-                'rom': rom_val,
-                'errors': errors
-            })
-
-        for s in recent_sessions:
-            reps = s.get('total_reps', 1) or 1
-            errors = s.get('total_errors', 0)
-            # Calculate accuracy based on successful reps (Reps - Errors) / Reps
-            acc = max(0, int((reps - errors) / reps * 100)) # << FIX APPLIED: Changed heuristic to standard accuracy
-            
-            base_rom = 85 + (acc * 0.5)
-            rom_val = min(145, max(60, int(base_rom)))
-            
-            date_str = s.get('date', 'Unknown')
-            short_date = date_str[5:] if len(date_str) >= 10 else date_str
-
-            rom_progress.append({
-                'date': short_date, 
-                'rom': rom_val
-            })
-            stability_score += acc
-            
-        avg_stability = int(stability_score / len(recent_sessions)) if recent_sessions else 0
-
-        # 4. RECOMMENDATIONS
-        recommendations = []
-        if asymmetry > 15:
-            weaker = "Left" if total_right > total_left else "Right"
-            recommendations.append(f"Imbalance: {weaker} side lagging by {int(asymmetry)}%. Use unilateral exercises.")
-        if avg_stability < 70:
-            recommendations.append("Form Correction Needed: AI detected recurring stability issues.")
-        elif avg_stability > 90:
-            recommendations.append("High Performance: Your form is optimal for increased resistance.")
-        if adherence < 50:
-            recommendations.append("Consistency: Aim for 4+ days/week to prevent regression.")
-
-        # 5. HOTSPOTS
-        # Based on actual error rate rather than pure random
-        severity = 100 - avg_stability
-        hotspots = {
-            'shoulder': int(severity * 0.7),
-            'elbow': int(severity * 0.3),
-            'hip': int(severity * 0.1)
-        }
-
-        session_history.reverse()
-
-        return {
-            'rom_chart': rom_progress,
-            'asymmetry': {'right': total_right, 'left': total_left, 'score': int(asymmetry)},
-            'stability_score': avg_stability,
-            'compliance': {'streak': current_streak, 'weekly_adherence': adherence, 'days_trained': days_trained},
-            'recommendations': recommendations,
-            'hotspots': hotspots,
-            'session_history': session_history
-        }
-
-# Initial load when module is imported
-AIEngine.load_model()
\ No newline at end of file
+    @staticmethod
+    def get_cohort_predictions(sessions_by_patient):
+        """Recovery predictions for many patients at once ({email: sessions} -> {email: prediction})."""
+        return analytics_core.evaluate_cohort(sessions_by_patient)
@@ -0,0 +1,360 @@
+"""
+Columnar analytics core
+Loads session dicts into NumPy columns once and computes every AIEngine metric
+(accuracy, ROM estimate, streak, adherence, asymmetry) in vectorized form.
+A cohort mode evaluates many patients in one call, and rollup backfills read
+the same columns. The recommendation and hotspot rules are shared with the
+incremental rollups, which fold one session at a time with session_accuracy.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+DATE_FORMAT = "%Y-%m-%d"
+
+# Day number used for dates that cannot be parsed (never matches a real day)
+INVALID_DAY = np.iinfo(np.int64).min
+
+
+def _to_day_numbers(dates: List[str]) -> np.ndarray:
+    """Converts 'YYYY-MM-DD' strings to int64 days since the epoch."""
+    arr = np.asarray(dates, dtype=str)
+    if arr.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    valid = np.char.str_len(arr) == 10
+    days = np.full(arr.shape, INVALID_DAY, dtype=np.int64)
+    try:
+        days[valid] = arr[valid].astype('datetime64[D]').astype(np.int64)
+    except ValueError:
+        # Mixed / malformed strings: fall back to element-wise parsing
+        for i in np.flatnonzero(valid):
+            try:
+                days[i] = np.datetime64(arr[i], 'D').astype(np.int64)
+            except ValueError:
+                pass
+    return days
+
+
+def _day_number(date) -> int:
+    return int(np.datetime64(date, 'D').astype(np.int64))
+
+
+def _short_date(date_str: str) -> str:
+    return date_str[5:] if len(date_str) >= 10 else date_str
+
+
+def session_measured_rom(session: dict) -> Optional[int]:
+    """ROM measured from the session's telemetry (best side), if it was archived."""
+    values = [v for v in (session.get('rom') or {}).values() if v is not None]
+    return max(values) if values else None
+
+
+@dataclass
+class SessionColumns:
+    """Session history stored column-wise; rows of one patient are contiguous."""
+    day: np.ndarray
+    reps: np.ndarray
+    errors: np.ndarray
+    right_reps: np.ndarray
+    left_reps: np.ndarray
+    group: np.ndarray
+    group_count: int
+    measured_rom: np.ndarray    # float64, NaN where no telemetry was archived
+    # Output-only columns are kept as plain lists
+    dates: List[str] = field(default_factory=list)
+    exercises: List[str] = field(default_factory=list)
+    durations: list = field(default_factory=list)
+    session_ids: list = field(default_factory=list)
+    timestamps: list = field(default_factory=list)
+
+    @classmethod
+    def from_sessions(cls, sessions) -> 'SessionColumns':
+        return cls.from_cohort([sessions])
+
+    @classmethod
+    def from_cohort(cls, cohort) -> 'SessionColumns':
+        """Builds columns for a list of per-patient, timestamp-sorted session lists."""
+        dates, exercises, durations, session_ids = [], [], [], []
+        reps, errors, right, left, rom, timestamps, sizes = [], [], [], [], [], [], []
+        for sessions in cohort:
+            n = 0
+            for s in sessions:
+                dates.append(s.get('date', 'Unknown'))
+                exercises.append(s.get('exercise', 'Freestyle'))
+                durations.append(s.get('duration', 0))
+                session_ids.append(s.get('session_id'))
+                timestamps.append(s.get('timestamp', 0))
+                reps.append(s.get('total_reps', 0))
+                errors.append(s.get('total_errors', 0))
+                right.append(s.get('right_reps', 0))
+                left.append(s.get('left_reps', 0))
+                measured = session_measured_rom(s)
+                rom.append(np.nan if measured is None else measured)
+                n += 1
+            sizes.append(n)
+
+        return cls(
+            day=_to_day_numbers(dates),
+            reps=np.asarray(reps, dtype=np.int64),
+            errors=np.asarray(errors, dtype=np.int64),
+            right_reps=np.asarray(right, dtype=np.int64),
+            left_reps=np.asarray(left, dtype=np.int64),
+            group=np.repeat(np.arange(len(sizes), dtype=np.int64), sizes),
+            group_count=len(sizes),
+            measured_rom=np.asarray(rom, dtype=np.float64),
+            dates=dates,
+            exercises=exercises,
+            durations=durations,
+            session_ids=session_ids,
+            timestamps=timestamps,
+        )
+
+    def __len__(self):
+        return self.reps.size
+
+
+# --- VECTORIZED METRICS ---
+
+def history_accuracy(reps: np.ndarray, errors: np.ndarray) -> np.ndarray:
+    """(Reps - Errors) / Reps * 100, floored at 0; sessions with 0 reps score 100."""
+    reps, errors = np.asarray(reps, dtype=np.int64), np.asarray(errors, dtype=np.int64)
+    safe_reps = np.where(reps > 0, reps, 1)
+    acc = np.maximum(np.trunc((reps - errors) / safe_reps * 100), 0).astype(np.int64)
+    return np.where(reps > 0, acc, 100)
+
+
+def prediction_accuracy(reps: np.ndarray, errors: np.ndarray) -> np.ndarray:
+    """Same accuracy, but 0 reps is treated as 1 rep (as the prediction always did)."""
+    reps, errors = np.asarray(reps, dtype=np.int64), np.asarray(errors, dtype=np.int64)
+    reps = np.where(reps != 0, reps, 1)
+    return np.maximum(np.trunc((reps - errors) / reps * 100), 0).astype(np.int64)
+
+
+def rom_estimate(acc: np.ndarray) -> np.ndarray:
+    """Predict ROM based on Accuracy (Better form = Better ROM potential)"""
+    return np.clip(np.trunc(85 + (np.asarray(acc) * 0.5)), 60, 145).astype(np.int64)
+
+
+def session_accuracy(reps: int, errors: int) -> int:
+    """history_accuracy of a single session, without the array round-trip."""
+    if reps > 0:
+        return max(0, int((reps - errors) / reps * 100))
+    return 100
+
+
+def session_roms(measured: List[Optional[int]], acc) -> List[int]:
+    """Measured ROM where telemetry was archived, otherwise the accuracy-based estimate."""
+    return [m if m is not None else e for m, e in zip(measured, rom_estimate(acc).tolist())]
+
+
+def recommendations(right_reps: int, left_reps: int, avg_stability: int, adherence: int) -> List[str]:
+    total_limb = right_reps + left_reps
+    asymmetry = abs(right_reps - left_reps) / total_limb * 100 if total_limb > 0 else 0
+
+    result = []
+    if asymmetry > 15:
+        weaker = "Left" if right_reps > left_reps else "Right"
+        result.append(f"Imbalance: {weaker} side lagging by {int(asymmetry)}%. Use unilateral exercises.")
+    if avg_stability < 70:
+        result.append("Form Correction Needed: AI detected recurring stability issues.")
+    elif avg_stability > 90:
+        result.append("High Performance: Your form is optimal for increased resistance.")
+    if adherence < 50:
+        result.append("Consistency: Aim for 4+ days/week to prevent regression.")
+    return result
+
+
+def hotspots(avg_stability: int) -> dict:
+    severity = 100 - avg_stability
+    return {
+        'shoulder': int(severity * 0.7),
+        'elbow': int(severity * 0.3),
+        'hip': int(severity * 0.1)
+    }
+
+
+def group_sum(values: np.ndarray, group: np.ndarray, group_count: int) -> np.ndarray:
+    out = np.zeros(group_count, dtype=np.int64)
+    np.add.at(out, group, values)
+    return out
+
+
+def streaks(day: np.ndarray, group: np.ndarray, group_count: int, today: int) -> np.ndarray:
+    """
+    Current training streak per group: length of the consecutive-day run ending
+    today (or yesterday, if today has no session yet).
+    """
+    result = np.zeros(group_count, dtype=np.int64)
+    mask = (day != INVALID_DAY) & (day <= today)
+    if not mask.any():
+        return result
+
+    # Unique (group, day) pairs, sorted by group then day
+    pairs = np.unique(np.stack([group[mask], day[mask]], axis=1), axis=0)
+    ug, ud = pairs[:, 0], pairs[:, 1]
+
+    run_start = np.ones(ug.size, dtype=bool)
+    run_start[1:] = (ug[1:] != ug[:-1]) | (ud[1:] != ud[:-1] + 1)
+    run_id = np.cumsum(run_start) - 1
+    run_len = np.bincount(run_id)
+
+    # The last pair of each group is its most recent training day
+    last = np.ones(ug.size, dtype=bool)
+    last[:-1] = ug[:-1] != ug[1:]
+    active = last & (ud >= today - 1)
+    result[ug[active]] = run_len[run_id[active]]
+    return result
+
+
+def days_trained(day: np.ndarray, group: np.ndarray, group_count: int, today: int, window: int = 7) -> np.ndarray:
+    """Number of distinct days with a session in the last `window` days, per group."""
+    mask = (day > today - window) & (day <= today)
+    if not mask.any():
+        return np.zeros(group_count, dtype=np.int64)
+    pairs = np.unique(np.stack([group[mask], day[mask]], axis=1), axis=0)
+    return np.bincount(pairs[:, 0], minlength=group_count).astype(np.int64)
+
+
+def positions_from_end(group: np.ndarray, group_count: int) -> np.ndarray:
+    """Index of each row counted from the end of its group (0 = most recent)."""
+    ends = np.cumsum(np.bincount(group, minlength=group_count))
+    return ends[group] - 1 - np.arange(group.size)
+
+
+def risk_status(reps: np.ndarray, errors: np.ndarray, has_session: np.ndarray) -> List[str]:
+    """Therapist risk label from each patient's latest session (no session = Normal)."""
+    accuracy = np.maximum(100 - np.trunc(errors / np.maximum(reps, 1) * 20), 0)
+    return np.select(
+        [~has_session, accuracy < 60, accuracy < 80],
+        ["Normal", "High Risk", "Alert"],
+        default="Normal"
+    ).tolist()
+
+
+# --- AIENGINE OUTPUTS ---
+
+def detailed_analytics(cols: SessionColumns) -> dict:
+    """Vectorized AIEngine.get_detailed_analytics for a single patient."""
+    acc = history_accuracy(cols.reps, cols.errors)
+
+    history = [
+        {
+            'date': date_str,
+            'date_short': _short_date(date_str),
+            'reps': reps,
+            'accuracy': a,
+            'duration': duration
+        }
+        for date_str, reps, a, duration in zip(cols.dates, cols.reps.tolist(), acc.tolist(), cols.durations)
+    ]
+
+    exercise_stats = []
+    if len(cols):
+        names, first_index, inverse = np.unique(
+            np.asarray(cols.exercises, dtype=object).astype(str), return_index=True, return_inverse=True
+        )
+        totals = group_sum(cols.reps, inverse.ravel(), names.size)
+        for i in np.argsort(first_index, kind='stable'):
+            exercise_stats.append({'name': cols.exercises[first_index[i]], 'total_reps': int(totals[i])})
+
+    counted = cols.reps > 0
+    count_acc = int(counted.sum())
+    avg_accuracy = round(int(acc[counted].sum()) / count_acc) if count_acc > 0 else 100
+
+    return {
+        'history': history,
+        'exercise_stats': exercise_stats,
+        'average_accuracy': avg_accuracy
+    }
+
+
+def recovery_predictions(cols: SessionColumns, today=None) -> List[Optional[dict]]:
+    """
+    Vectorized AIEngine.get_recovery_prediction for every group in `cols`.
+    Returns one prediction (or None for patients without sessions) per group.
+    """
+    today_date = today or datetime.now().date()
+    today_day = _day_number(today_date)
+    g, G = cols.group, cols.group_count
+
+    # 1. COMPLIANCE & STREAK
+    streak = streaks(cols.day, g, G, today_day)
+    trained = days_trained(cols.day, g, G, today_day)
+
+    # 2. ASYMMETRY
+    total_right = group_sum(cols.right_reps, g, G)
+    total_left = group_sum(cols.left_reps, g, G)
+
+    # 3. AI METRICS
+    acc = prediction_accuracy(cols.reps, cols.errors)
+    # Real ROM where telemetry exists, otherwise the accuracy-based estimate
+    measured = ~np.isnan(cols.measured_rom)
+    rom = np.where(measured, np.nan_to_num(cols.measured_rom), rom_estimate(acc)).astype(np.int64)
+    counts = np.bincount(g, minlength=G)
+    recent_mask = positions_from_end(g, G) < 5
+    stability_sum = group_sum(acc[recent_mask], g[recent_mask], G)
+
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]]).tolist()
+    reps_out = np.where(cols.reps != 0, cols.reps, 1).tolist()
+    errors_l, acc_l, rom_l = cols.errors.tolist(), acc.tolist(), rom.tolist()
+
+    results = []
+    for i in range(G):
+        n = int(counts[i])
+        if n == 0:
+            results.append(None)
+            continue
+        lo, hi = starts[i], starts[i] + n
+
+        days_i = int(trained[i])
+        adherence = int((days_i / 7) * 100)
+        right_i, left_i = int(total_right[i]), int(total_left[i])
+        total_limb = right_i + left_i
+        asymmetry = abs(right_i - left_i) / total_limb * 100 if total_limb > 0 else 0
+
+        recent_lo = max(lo, hi - 5)
+        rom_progress = []
+        # If user has only 1 session, add a dummy "Baseline" point
+        if n == 1:
+            try:
+                base_date = datetime.strptime(cols.dates[lo], DATE_FORMAT)
+                prev_date = (base_date - timedelta(days=1)).strftime(DATE_FORMAT)
+                rom_progress.append({'date': prev_date[5:], 'rom': 70})
+            except (TypeError, ValueError):
+                pass
+        rom_progress.extend(
+            {'date': _short_date(cols.dates[k]), 'rom': rom_l[k]} for k in range(recent_lo, hi)
+        )
+        avg_stability = int(int(stability_sum[i]) / (hi - recent_lo))
+
+        session_history = [
+            {
+                'date': cols.dates[k],
+                'accuracy': acc_l[k],
+                'reps': reps_out[k],
+                'rom': rom_l[k],
+                'errors': errors_l[k]
+            }
+            for k in range(hi - 1, lo - 1, -1)
+        ]
+
+        results.append({
+            'rom_chart': rom_progress,
+            'asymmetry': {'right': right_i, 'left': left_i, 'score': int(asymmetry)},
+            'stability_score': avg_stability,
+            'compliance': {'streak': int(streak[i]), 'weekly_adherence': adherence, 'days_trained': days_i},
+            # 4. RECOMMENDATIONS / 5. HOTSPOTS
+            'recommendations': recommendations(right_i, left_i, avg_stability, adherence),
+            'hotspots': hotspots(avg_stability),
+            'session_history': session_history
+        })
+    return results
+
+
+def evaluate_cohort(sessions_by_patient: Dict[str, list], today=None) -> Dict[str, Optional[dict]]:
+    """Recovery predictions for many patients in one vectorized pass."""
+    keys = list(sessions_by_patient)
+    cols = SessionColumns.from_cohort(sessions_by_patient[k] for k in keys)
+    return dict(zip(keys, recovery_predictions(cols, today)))
@@ -0,0 +1,293 @@
+"""
+Incremental analytics rollups
+Per-user summary documents, one per exercise plus a user-wide one, that are
+updated once per stored session, so the analytics endpoints never have to
+rescan a patient's history.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from analytics_core import (SessionColumns, INVALID_DAY, group_sum, session_measured_rom, session_accuracy,
+                            history_accuracy, prediction_accuracy, session_roms, recommendations, hotspots)
+from constants import ROLLUP_RING_SIZE, ROLLUP_DAY_WINDOW
+
+# Exercise key used for the user-wide rollup document
+ALL_EXERCISES = "*"
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def _parse_date(date_str):
+    try:
+        return datetime.strptime(date_str, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        return None
+
+
+def _column(entries, key):
+    return [e[key] for e in entries]
+
+
+class AnalyticsRollup:
+    """
+    Builds, updates and reads rollup documents.
+
+    A rollup holds running counts and sums over the full history, per-day
+    aggregates for the recent day window, the current streak state and a ring
+    of the last ROLLUP_RING_SIZE sessions used for the history charts.
+    """
+
+    @staticmethod
+    def new(email, exercise=ALL_EXERCISES) -> dict:
+        return {
+            'email': email,
+            'exercise': exercise,
+            'session_count': 0,
+            'total_reps': 0,
+            'total_errors': 0,
+            'accuracy_sum': 0,
+            'accuracy_count': 0,
+            'right_reps': 0,
+            'left_reps': 0,
+            'exercise_reps': [],
+            'days': {},
+            'streak': {'last_date': None, 'length': 0},
+            'recent': [],
+            'last_timestamp': 0,
+        }
+
+    @staticmethod
+    def build(email, sessions, exercise=ALL_EXERCISES) -> dict:
+        """
+        Builds a rollup from a full, timestamp-sorted session history (backfill)
+        in one columnar pass; the result matches folding the sessions one by one.
+        """
+        rollup = AnalyticsRollup.new(email, exercise)
+        cols = SessionColumns.from_sessions(sessions)
+        if not len(cols):
+            return rollup
+
+        # 1. COUNTS & SUMS
+        counted = cols.reps > 0
+        rollup.update({
+            'session_count': len(cols),
+            'total_reps': int(cols.reps.sum()),
+            'total_errors': int(cols.errors.sum()),
+            'right_reps': int(cols.right_reps.sum()),
+            'left_reps': int(cols.left_reps.sum()),
+            'accuracy_sum': int(history_accuracy(cols.reps[counted], cols.errors[counted]).sum()),
+            'accuracy_count': int(counted.sum()),
+            'last_timestamp': max(0, max(cols.timestamps)),
+        })
+        names, first_index, inverse = np.unique(
+            np.asarray(cols.exercises, dtype=object).astype(str), return_index=True, return_inverse=True
+        )
+        totals = group_sum(cols.reps, inverse.ravel(), names.size)
+        rollup['exercise_reps'] = [
+            {'name': cols.exercises[first_index[i]], 'total_reps': int(totals[i])}
+            for i in np.argsort(first_index, kind='stable')
+        ]
+
+        # 2. PER-DAY AGGREGATES (most recent day window)
+        days, inverse = np.unique(np.asarray(cols.dates, dtype=str), return_inverse=True)
+        inverse = inverse.ravel()
+        sessions_per_day = np.bincount(inverse, minlength=days.size)
+        reps_per_day = group_sum(cols.reps, inverse, days.size)
+        errors_per_day = group_sum(cols.errors, inverse, days.size)
+        for i in range(max(0, days.size - ROLLUP_DAY_WINDOW), days.size):
+            rollup['days'][str(days[i])] = {'sessions': int(sessions_per_day[i]),
+                                           'reps': int(reps_per_day[i]),
+                                           'errors': int(errors_per_day[i])}
+
+        # 3. STREAK STATE: only dates later than every earlier one move the run
+        valid = np.flatnonzero(cols.day != INVALID_DAY)
+        if valid.size:
+            day = cols.day[valid]
+            earlier = np.maximum.accumulate(np.concatenate([[INVALID_DAY], day[:-1]]))
+            advancing = valid[day > earlier]
+            run_days = cols.day[advancing]
+            breaks = np.flatnonzero(np.diff(run_days) != 1)
+            rollup['streak'] = {
+                'last_date': cols.dates[advancing[-1]],
+                'length': int(run_days.size - (breaks[-1] + 1 if breaks.size else 0)),
+            }
+
+        # 4. LAST-N RING
+        measured = cols.measured_rom.tolist()
+        rollup['recent'] = [
+            {
+                'session_id': cols.session_ids[k],
+                'date': cols.dates[k],
+                'reps': int(cols.reps[k]),
+                'errors': int(cols.errors[k]),
+                'duration': cols.durations[k],
+                'rom': None if np.isnan(measured[k]) else int(measured[k]),
+            }
+            for k in range(max(0, len(cols) - ROLLUP_RING_SIZE), len(cols))
+        ]
+        return rollup
+
+    @staticmethod
+    def apply_session(rollup: dict, session: dict) -> dict:
+        """Folds a single newly stored session into the rollup (in place)."""
+        reps = session.get('total_reps', 0)
+        errors = session.get('total_errors', 0)
+        exercise = session.get('exercise', 'Freestyle')
+        date_str = session.get('date', 'Unknown')
+
+        # 1. COUNTS & SUMS
+        rollup['session_count'] += 1
+        rollup['total_reps'] += reps
+        rollup['total_errors'] += errors
+        rollup['right_reps'] += session.get('right_reps', 0)
+        rollup['left_reps'] += session.get('left_reps', 0)
+        if reps > 0:
+            rollup['accuracy_sum'] += session_accuracy(reps, errors)
+            rollup['accuracy_count'] += 1
+        rollup['last_timestamp'] = max(rollup['last_timestamp'], session.get('timestamp', 0))
+
+        # Stored as a list (not a dict) to keep insertion order and avoid
+        # exercise names being used as document keys
+        for entry in rollup['exercise_reps']:
+            if entry['name'] == exercise:
+                entry['total_reps'] += reps
+                break
+        else:
+            rollup['exercise_reps'].append({'name': exercise, 'total_reps': reps})
+
+        # 2. PER-DAY AGGREGATES (bounded to the most recent day window)
+        day = rollup['days'].setdefault(date_str, {'sessions': 0, 'reps': 0, 'errors': 0})
+        day['sessions'] += 1
+        day['reps'] += reps
+        day['errors'] += errors
+        if len(rollup['days']) > ROLLUP_DAY_WINDOW:
+            for old in sorted(rollup['days'])[:-ROLLUP_DAY_WINDOW]:
+                del rollup['days'][old]
+
+        # 3. STREAK STATE (length of the consecutive-day run ending at last_date)
+        session_date = _parse_date(date_str)
+        streak = rollup['streak']
+        last_date = _parse_date(streak['last_date'])
+        if session_date is not None:
+            if last_date is None or session_date - last_date > timedelta(days=1):
+                streak['last_date'] = date_str
+                streak['length'] = 1
+            elif session_date - last_date == timedelta(days=1):
+                streak['last_date'] = date_str
+                streak['length'] += 1
+            # Same day (or a late, out-of-order write) leaves the run unchanged
+
+        # 4. LAST-N RING
+        rollup['recent'].append({
+            'session_id': session.get('session_id'),
+            'date': date_str,
+            'reps': reps,
+            'errors': errors,
+            'duration': session.get('duration', 0),
+            'rom': session_measured_rom(session),
+        })
+        if len(rollup['recent']) > ROLLUP_RING_SIZE:
+            del rollup['recent'][:-ROLLUP_RING_SIZE]
+
+        return rollup
+
+    @staticmethod
+    def contains(rollup: dict, session_id) -> bool:
+        """True if a recent session with this id was already folded in."""
+        return session_id is not None and any(s.get('session_id') == session_id for s in rollup['recent'])
+
+    @staticmethod
+    def get_detailed_analytics(rollup: dict) -> dict:
+        """Analytics graphs (history, per-exercise reps, average accuracy) from a rollup."""
+        recent = rollup['recent']
+        accuracy = history_accuracy(_column(recent, 'reps'), _column(recent, 'errors')).tolist()
+        history = []
+        for s, acc in zip(recent, accuracy):
+            date_str = s['date']
+            history.append({
+                'date': date_str,
+                'date_short': date_str[5:] if len(date_str) >= 10 else date_str,
+                'reps': s['reps'],
+                'accuracy': acc,
+                'duration': s['duration']
+            })
+
+        count_acc = rollup['accuracy_count']
+        avg_accuracy = round(rollup['accuracy_sum'] / count_acc) if count_acc > 0 else 100
+
+        return {
+            'history': history,
+            'exercise_stats': [dict(e) for e in rollup['exercise_reps']],
+            'average_accuracy': avg_accuracy
+        }
+
+    @staticmethod
+    def get_recovery_prediction(rollup: dict, today=None):
+        """Recovery prediction (ROM, asymmetry, compliance, recommendations) from a rollup."""
+        if rollup['session_count'] == 0:
+            return None
+
+        # 1. COMPLIANCE & STREAK
+        today = today or datetime.now().date()
+        last_date = _parse_date(rollup['streak']['last_date'])
+        current_streak = 0
+        if last_date is not None and timedelta(0) <= today - last_date <= timedelta(days=1):
+            current_streak = rollup['streak']['length']
+
+        last_7_days = [(today - timedelta(days=i)).strftime(DATE_FORMAT) for i in range(7)]
+        days_trained = sum(1 for d in last_7_days if d in rollup['days'])
+        adherence = int((days_trained / 7) * 100)
+
+        # 2. ASYMMETRY
+        total_right = rollup['right_reps']
+        total_left = rollup['left_reps']
+        total_limb = total_right + total_left
+        asymmetry = 0
+        if total_limb > 0:
+            asymmetry = abs(total_right - total_left) / total_limb * 100
+
+        # 3. AI METRICS & SESSION HISTORY
+        recent = rollup['recent']
+        accuracy = prediction_accuracy(_column(recent, 'reps'), _column(recent, 'errors')).tolist()
+        roms = session_roms(_column(recent, 'rom'), accuracy)
+        recent_sessions = recent[-5:]
+        rom_progress = []
+
+        # If user has only 1 session, add a dummy "Baseline" point
+        if rollup['session_count'] == 1:
+            base_date = _parse_date(recent_sessions[0]['date'])
+            if base_date is not None:
+                prev_date = (base_date - timedelta(days=1)).strftime(DATE_FORMAT)
+                rom_progress.append({'date': prev_date[5:], 'rom': 70})
+
+        session_history = [
+            {
+                'date': s['date'],
+                'accuracy': acc,
+                'reps': s['reps'] or 1,
+                'rom': rom,
+                'errors': s['errors']
+            }
+            for s, acc, rom in reversed(list(zip(recent, accuracy, roms)))
+        ]
+
+        for s, rom in zip(recent_sessions, roms[-5:]):
+            date_str = s['date']
+            rom_progress.append({
+                'date': date_str[5:] if len(date_str) >= 10 else date_str,
+                'rom': rom
+            })
+
+        avg_stability = int(sum(accuracy[-5:]) / len(recent_sessions)) if recent_sessions else 0
+
+        return {
+            'rom_chart': rom_progress,
+            'asymmetry': {'right': total_right, 'left': total_left, 'score': int(asymmetry)},
+            'stability_score': avg_stability,
+            'compliance': {'streak': current_streak, 'weekly_adherence': adherence, 'days_trained': days_trained},
+            # 4. RECOMMENDATIONS / 5. HOTSPOTS
+            'recommendations': recommendations(total_right, total_left, avg_stability, adherence),
+            'hotspots': hotspots(avg_stability),
+            'session_history': session_history
+        }
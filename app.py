@@ -2,35 +2,43 @@
 Flask application with API routes - THREADING MODE (No Eventlet)
 """
 from flask import Flask, Response, jsonify, request
-import cv2
-import mediapipe as mp
 import numpy as np
 import time
-import json
+import math
 import os
+import atexit
+import threading
+import base64
 import random
 import string
-import requests
-import certifi
-from collections import deque
 from datetime import datetime
 from flask_cors import CORS
 from dotenv import load_dotenv
 from flask_bcrypt import Bcrypt
-from pymongo import MongoClient
 from flask_mail import Mail, Message
 from flask_socketio import SocketIO, emit
-from bson.objectid import ObjectId
 
-# --- OPTIONAL: Google Auth Library (Requested) ---
-# We import this to satisfy dependencies, though we use requests 
-# for Access Token validation to match the current Frontend flow.
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+# NOTE: cv2 / mediapipe (workout_session) and joblib / sklearn (AIEngine.load_model)
+# are imported on the first /start_tracking, so API-only workers never load them.
+# pymongo is only imported by the connection manager when Mongo is selected.
+# Google sign-in validates access tokens over HTTP with `requests`, imported by
+# that route, so neither requests nor the google-auth library load at startup.
 
 # --- IMPORT CUSTOM AI MODULE ---
-from ai_engine import AIEngine
-from constants import EXERCISE_PRESETS
+import analytics_core
+from analytics_rollup import AnalyticsRollup, ALL_EXERCISES
+from query_cache import QueryCache, ALL_USERS
+from db_manager import ConnectionManager, mongo_pool_options
+from session_writer import SessionWriteQueue, StorageUnavailable, is_transient_error
+from storage import DuplicateUserError
+import telemetry
+from constants import (EXERCISE_PRESETS, THERAPIST_MAX_PAGE_SIZE,
+                       SERIES_DEFAULT_POINTS, SERIES_MAX_POINTS,
+                       GHOST_LOOKAHEAD_DEFAULT, GHOST_LOOKAHEAD_MAX)
+from downsample import downsample_series
+from models import ReportSnapshot
+from frame_profiler import ProfilerRegistry, render_prometheus
+from latency import LatencySink, display_lookahead_ms, finite_number, monotonic_ms
 
 # ----------------------------------------------------
 # 0. CONFIGURATION
@@ -62,50 +70,122 @@ mail = Mail(app)
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = "physiocheck_db"
 
-# Initialize as None to handle connection failures gracefully
-client = None
-db = None
-users_collection = None
-otp_collection = None
-sessions_collection = None
-exercises_collection = None
-protocols_collection = None
-notifications_collection = None
-
-try:
-    print("⏳ Attempting to connect to MongoDB...")
-    client = MongoClient(
-        MONGO_URI,
-        serverSelectionTimeoutMS=5000, # 5 second timeout
-        tls=True,
-        tlsCAFile=certifi.where(),
-        tlsAllowInvalidCertificates=True,
-    )
-    # Trigger a connection verify
-    client.admin.command("ping")
-    db = client[DB_NAME]
-
-    users_collection = db["users"]
-    otp_collection = db["otps"]
-    sessions_collection = db["sessions"]
-    exercises_collection = db["exercises"]
-    protocols_collection = db["protocols"]
-    notifications_collection = db["notifications"]
-
-    print(f"✅ Connected to MongoDB Cloud: {DB_NAME}")
-except Exception as e:
-    print(f"⚠️ DB Error: {e}")
-    print("⚠️ WARNING: Application running without Database. Login/Signup will fail.")
+# "mongo" (default), or "memory" / "sqlite" to run without a Mongo cluster
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "mongo").lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", "physiocheck.db")
+
+# Set by the connection manager once the backend is reachable; routes treat
+# None as "database unavailable" (503) until then
+storage = None
+
+def _on_storage_ready(ready_storage):
+    global storage
+    storage = ready_storage
+
+# Connects in the background with backoff, so startup never waits on Mongo
+db_manager = ConnectionManager(
+    STORAGE_BACKEND,
+    mongo_uri=MONGO_URI,
+    db_name=DB_NAME,
+    sqlite_path=SQLITE_PATH,
+    client_options=mongo_pool_options(),
+    on_ready=_on_storage_ready,
+    max_backoff=float(os.getenv("DB_CONNECT_MAX_BACKOFF", 60)),
+)
+db_manager.start()
+atexit.register(db_manager.close)
+if not db_manager.ready:
+    print("⚠️ Database not connected yet. Login/Signup will return 503 until it is.")
+
+# Query-result cache for analytics/therapist routes (invalidated on writes)
+query_cache = QueryCache(
+    max_entries=int(os.getenv("QUERY_CACHE_MAX_ENTRIES", 1024)),
+    ttl=float(os.getenv("QUERY_CACHE_TTL", 60)),
+)
+# Archived telemetry never changes, so decoded series and their downsampled
+# levels are only evicted by LRU / TTL. Decoded arrays are shared read-only
+# instead of being copied for every zoom level.
+decoded_series_cache = QueryCache(max_entries=16, ttl=3600, copy=telemetry.TelemetrySeries.read_only)
+series_cache = QueryCache(max_entries=512, ttl=3600)
+
+# Write-behind queue for finished sessions (durable local journal + batched inserts)
+session_writer = SessionWriteQueue(
+    os.getenv("SESSION_JOURNAL_PATH", "session_journal.jsonl"),
+    write_batch=lambda batch: _write_session_batch(batch),
+    on_flushed=lambda docs: _on_sessions_flushed(docs),
+    batch_size=int(os.getenv("SESSION_WRITE_BATCH", 100)),
+    is_transient=lambda e: _is_transient_write_error(e),
+)
+
+def start_background_workers():
+    """Starts the session writer (replaying its journal); once per serving process."""
+    session_writer.start()
+    atexit.register(session_writer.stop)
 
 # ----------------------------------------------------
 # 3. WORKOUT SESSION MANAGEMENT
 # ----------------------------------------------------
 workout_session = None
 last_session_report = None
+last_session_report_snapshot = None
+last_session_series = None
+
+# Warm pose models / cameras shared by consecutive sessions (built on first use,
+# since importing the vision stack is what API-only workers avoid)
+vision_pool = None
+VISION_POOL_SIZE = int(os.getenv("VISION_POOL_SIZE", 1))
+VISION_KEEP_CAMERA_OPEN = os.getenv("VISION_KEEP_CAMERA_OPEN", "0") == "1"
+# Camera index or a video file; VISION_REPLAY (recording or "synthetic") replaces
+# camera and pose model entirely, e.g. for benchmarks/load_test.py
+VISION_SOURCE = os.getenv("VISION_SOURCE", "0")
+VISION_REPLAY = os.getenv("VISION_REPLAY")
+
+# Per-stage frame timings for /metrics (off by default; FRAME_PROFILING=1 enables)
+FRAME_PROFILING = os.getenv("FRAME_PROFILING", "0") == "1"
+frame_profilers = ProfilerRegistry()
+
+# Client-measured end-to-end latency (latency_report events)
+latency_sink = LatencySink()
+# Ghost look-ahead (s) per connected client; the session uses the median
+ghost_lookaheads = {}
+# Pause between streamed frames; tune from /metrics and /api/latency
+STREAM_FRAME_SLEEP = float(os.getenv("STREAM_FRAME_SLEEP", 0.01))
+
+# Reuse the last pose instead of running inference while the patient is still
+# Off by default for VISION_REPLAY: its blank frames never move, so the gate
+# would skip most of the recorded pose stream
+MOTION_GATE = os.getenv("MOTION_GATE", "0" if VISION_REPLAY else "1") == "1"
+
+# Directory for per-session pose recordings (.npz, replayable with pose_replay.py)
+POSE_RECORD_DIR = os.getenv("POSE_RECORD_DIR")
+
+def get_vision_pool():
+    global vision_pool
+    if vision_pool is None:
+        from vision_pool import VisionPool
+        vision_pool = VisionPool(max_models=VISION_POOL_SIZE, keep_camera_open=VISION_KEEP_CAMERA_OPEN,
+                                 camera_index=int(VISION_SOURCE) if VISION_SOURCE.isdigit() else VISION_SOURCE,
+                                 replay=VISION_REPLAY)
+        atexit.register(vision_pool.close)
+    return vision_pool
+
+def _apply_ghost_lookahead():
+    session = workout_session
+    if session is not None:
+        values = sorted(ghost_lookaheads.values())
+        session.ghost_lookahead = values[len(values) // 2] if values else GHOST_LOOKAHEAD_DEFAULT
+
+def _set_ghost_lookahead(sid, ms):
+    ms = finite_number(ms)
+    if ms is None:
+        # Missing, non-numeric, NaN or infinite: keep the current look-ahead
+        return
+    ghost_lookaheads[sid] = min(max(ms / 1000, 0.0), GHOST_LOOKAHEAD_MAX)
+    _apply_ghost_lookahead()
 
 def init_session(exercise_name="Bicep Curl"):
     """Initialize a new workout session, ensuring the old one is closed."""
-    global workout_session, last_session_report
+    global workout_session, last_session_report, last_session_report_snapshot, last_session_series
     
     # 1. Force close existing session
     if workout_session:
@@ -119,14 +199,32 @@ def init_session(exercise_name="Bicep Curl"):
 
     # Reset last report for new session
     last_session_report = None
+    last_session_report_snapshot = None
+    last_session_series = None
     
     # 2. Start new session
     print(f"🎥 Initializing Camera for {exercise_name}...")
     from workout_session import WorkoutSession
-    workout_session = WorkoutSession(exercise_name)
+    motion_gate = None
+    if MOTION_GATE:
+        from motion_gate import MotionGate
+        motion_gate = MotionGate()
+    workout_session = WorkoutSession(exercise_name, vision_pool=get_vision_pool(),
+                                     profiler=frame_profilers.create() if FRAME_PROFILING else None,
+                                     motion_gate=motion_gate)
+    if POSE_RECORD_DIR:
+        from pose_replay import PoseRecorder
+        workout_session.recorder = PoseRecorder(workout_session.exercise_config.name)
+    _apply_ghost_lookahead()
+
+if os.getenv("VISION_PREWARM", "0") == "1":
+    # Camera hosts: build the first pose model in the background at boot
+    threading.Thread(target=lambda: get_vision_pool().prewarm(VISION_POOL_SIZE),
+                     name="vision-prewarm", daemon=True).start()
 
 def generate_video_frames():
     """Generator function to stream video frames."""
+    import cv2
     from constants import WorkoutPhase
     global workout_session
     
@@ -136,25 +234,47 @@ def generate_video_frames():
     if current_session is None:
         return
 
+    p = current_session.profiler
+
     # Loop to capture frames
     while current_session.phase != WorkoutPhase.INACTIVE:
         try:
             if current_session is None:
                 break
 
+            frame_start = p.now() if p else 0
             frame, should_continue = current_session.process_frame()
             
             if not should_continue or frame is None:
                 break
 
-            # Emit real-time data to frontend via WebSocket
-            socketio.emit("workout_update", current_session.get_state_dict())
-            
-            # Control frame rate (Standard time.sleep works in threading mode)
-            time.sleep(0.01)
-
-            # Encode frame for HTTP Stream
-            ret, buffer = cv2.imencode(".jpg", frame)
+            # Emit real-time data to frontend via WebSocket (fewer updates under load)
+            sched = current_session.scheduler
+            if sched.begin("emit"):
+                t = p.now() if p else 0
+                # The snapshot's JSON is serialized once (shared with /session_state);
+                # the emit stamp travels as a second argument (a tuple is sent as two)
+                snapshot = current_session.state_snapshot
+                socketio.emit("workout_update", (snapshot.body, {"emit": monotonic_ms()}))
+                sched.end("emit")
+                if p:
+                    p.lap("emit", t)
+
+            # Encode frame for HTTP Stream (skipped frames are simply not streamed)
+            ret, buffer = False, None
+            if sched.begin("encode"):
+                t = p.now() if p else 0
+                ret, buffer = cv2.imencode(".jpg", frame)
+                sched.end("encode")
+                if p:
+                    p.lap("encode", t)
+                    if not ret:
+                        p.drop("encode_failed")
+            elif p:
+                p.drop("encode_deferred")
+            sched.end_frame()
+            if p and ret:
+                p.frame_done(frame_start)
             if ret:
                 yield (
                     b"--frame\r\n"
@@ -162,6 +282,9 @@ def generate_video_frames():
                     + buffer.tobytes()
                     + b"\r\n"
                 )
+
+            # Control frame rate (Standard time.sleep works in threading mode)
+            time.sleep(STREAM_FRAME_SLEEP)
         except Exception as e:
             print(f"Stream Error: {e}")
             break
@@ -278,10 +401,29 @@ def handle_connect():
 @socketio.on("disconnect")
 def handle_disconnect():
     print("🔴 Client disconnected")
+    if ghost_lookaheads.pop(request.sid, None) is not None:
+        _apply_ghost_lookahead()
+
+@socketio.on("clock_sync")
+def handle_clock_sync(data):
+    """NTP-style probe: the ack carries the server's monotonic clock (ms)."""
+    data = data or {}
+    return {"client_send": data.get("client_send"), "server_time": monotonic_ms()}
+
+@socketio.on("latency_report")
+def handle_latency_report(data):
+    if latency_sink.add(request.sid, data):
+        _set_ghost_lookahead(request.sid, display_lookahead_ms(data))
+
+@socketio.on("ghost_lookahead")
+def handle_ghost_lookahead(data):
+    """Explicit look-ahead from a client: {"ms": <milliseconds>} (clamped to GHOST_LOOKAHEAD_MAX)."""
+    if isinstance(data, dict):
+        _set_ghost_lookahead(request.sid, data.get("ms"))
 
 @socketio.on("stop_session")
 def handle_stop_session(data):
-    global workout_session, last_session_report
+    global workout_session, last_session_report, last_session_report_snapshot, last_session_series
     if not workout_session:
         return
 
@@ -291,26 +433,45 @@ def handle_stop_session(data):
 
     try:
         print("🛑 Stop session command received")
-        # SAVE REPORT BEFORE STOPPING
-        last_session_report = workout_session.get_final_report()
-        
         workout_session.stop()
+        # stop() waits for the frame in flight and no frame runs after it, so the
+        # final report can be built fresh (the published one rounds duration to 1 s)
+        last_session_report = workout_session.get_final_report()
+        if email:
+            # Safe after stop(): the frame loop no longer touches the calibration data
+            _save_calibration_profile(workout_session, email)
+        if workout_session.recorder is not None:
+            _save_pose_recording(workout_session.recorder)
+        last_session_series = workout_session.live_series.view()
         workout_session = None 
 
-        if email and sessions_collection is not None:
+        ack = {"status": "success"}
+        if email:
             r = last_session_report["summary"]["RIGHT"]
             l = last_session_report["summary"]["LEFT"]
+            chunks, telemetry_meta, rom = telemetry.archive(last_session_series)
             
-            sessions_collection.insert_one({
+            session_doc = {
                 "email": email,
                 "exercise": exercise,
                 "timestamp": time.time(),
                 "date": datetime.now().strftime("%Y-%m-%d"),
                 "total_reps": r["total_reps"] + l["total_reps"],
                 "total_errors": r["error_count"] + l["error_count"],
-            })
+                "right_reps": r["total_reps"],
+                "left_reps": l["total_reps"],
+                "duration": last_session_report["duration"],
+                "rom": rom,
+                "telemetry": telemetry_meta,
+                # Journal-only field, moved to the telemetry repository on flush
+                "_telemetry": [base64.b64encode(c).decode("ascii") for c in chunks],
+            }
+            # Journaled locally and flushed in the background (see _on_sessions_flushed)
+            ack["session_id"] = session_writer.submit(session_doc)
+            last_session_report["session_id"] = ack["session_id"]
 
-        emit("session_stopped", {"status": "success"})
+        last_session_report_snapshot = ReportSnapshot.build(last_session_report)
+        emit("session_stopped", ack)
     except Exception as e:
         print(f"Stop session error: {e}")
         emit("session_stopped", {"status": "error", "message": str(e)})
@@ -318,6 +479,88 @@ def handle_stop_session(data):
 # ----------------------------------------------------
 # 6. ANALYTICS & AI ROUTES
 # ----------------------------------------------------
+def _build_rollup(email, exercise=ALL_EXERCISES):
+    """Backfills a rollup from the full session history (first access only)."""
+    sessions = storage.sessions.find_by_email(email, None if exercise == ALL_EXERCISES else exercise)
+    return AnalyticsRollup.build(email, sessions, exercise)
+
+def _update_rollups(session_doc):
+    """Folds a freshly inserted session into its exercise and user-wide rollups (session writer thread only)."""
+    email = session_doc["email"]
+    try:
+        for exercise in (session_doc.get("exercise", "Freestyle"), ALL_EXERCISES):
+            rollup = storage.rollups.get(email, exercise)
+            if rollup is None:
+                # History already contains session_doc, so a rebuild covers it
+                rollup = _build_rollup(email, exercise)
+            elif AnalyticsRollup.contains(rollup, session_doc.get("session_id")):
+                # A read backfilled the rollup after this session was inserted
+                continue
+            else:
+                AnalyticsRollup.apply_session(rollup, session_doc)
+            storage.rollups.put(rollup)
+    except Exception as e:
+        # Rollups are rebuilt from history on the next read if this fails
+        print(f"⚠️ Rollup update error: {e}")
+        try:
+            storage.rollups.delete_user(email)
+        except Exception:
+            pass
+
+def _is_transient_write_error(e):
+    """Outages are retried indefinitely; other errors eventually dead-letter the session."""
+    if is_transient_error(e):
+        return True
+    try:
+        from pymongo.errors import ConnectionFailure
+    except ImportError:
+        return False
+    return isinstance(e, ConnectionFailure)
+
+def _write_session_batch(batch):
+    """Stores a batch from the session writer: telemetry chunks first, then the sessions."""
+    if storage is None:
+        raise StorageUnavailable("storage unavailable")
+    docs = []
+    for entry in batch:
+        doc = dict(entry)
+        chunks = doc.pop("_telemetry", None)
+        if chunks:
+            storage.telemetry.put(doc["session_id"], [base64.b64decode(c) for c in chunks])
+        docs.append(doc)
+    storage.sessions.insert_many(docs)
+
+def load_session_telemetry(session_id):
+    """Decodes a stored session's angle series into NumPy arrays (None if absent)."""
+    chunks = storage.telemetry.get(session_id) if storage is not None else []
+    return telemetry.decode(chunks) if chunks else None
+
+class _NoTelemetry(LookupError):
+    """Raised inside cached computations so a missing series is never cached."""
+
+def _on_sessions_flushed(session_docs):
+    """
+    Runs on the session writer thread once a batch is stored. Gets the whole batch,
+    even sessions a retried attempt found already stored; rollups skip repeats.
+    """
+    for session_doc in session_docs:
+        _update_rollups(session_doc)
+        query_cache.invalidate(session_doc["email"])
+        decoded_series_cache.invalidate(session_doc["session_id"])
+        series_cache.invalidate(session_doc["session_id"])
+    query_cache.invalidate(ALL_USERS)
+
+def _get_user_rollup(email, exercise=ALL_EXERCISES):
+    """Reads a user's rollup (one exercise or all), backfilling it from history if missing."""
+    rollup = storage.rollups.get(email, exercise)
+    if rollup is None:
+        rollup = _build_rollup(email, exercise)
+        # Insert only: the session writer owns updates and may have stored a
+        # newer rollup since this history was read
+        if rollup["session_count"] > 0 and not storage.rollups.insert_if_absent(rollup):
+            rollup = storage.rollups.get(email, exercise) or rollup
+    return rollup
+
 @app.route("/api/user/analytics_detailed", methods=["POST"])
 def analytics_detailed():
     """Returns detailed workout history for graphs."""
@@ -325,12 +568,17 @@ def analytics_detailed():
     email = data.get("email")
     if not email: return jsonify({"error": "Email required"}), 400
 
-    if sessions_collection is None:
+    if storage is None:
         return jsonify({"total_sessions": 0, "history": []})
 
-    sessions = list(sessions_collection.find({"email": email}).sort("timestamp", 1))
-    
-    analytics = AIEngine.get_detailed_analytics(sessions)
+    # Optional filter: one exercise's rollup instead of the user-wide one
+    exercise = data.get("exercise") or ALL_EXERCISES
+
+    analytics = query_cache.get_or_compute(
+        email, "analytics_detailed",
+        lambda: AnalyticsRollup.get_detailed_analytics(_get_user_rollup(email, exercise)),
+        params=(exercise,)
+    )
     return jsonify(analytics)
 
 @app.route("/api/user/ai_prediction", methods=["POST"])
@@ -340,12 +588,16 @@ def ai_prediction():
     email = data.get("email")
     if not email: return jsonify({"error": "Email required"}), 400
 
-    if sessions_collection is None:
+    if storage is None:
         return jsonify({"error": "Database unavailable"}), 500
 
-    sessions = list(sessions_collection.find({"email": email}).sort("timestamp", 1))
-    
-    prediction = AIEngine.get_recovery_prediction(sessions)
+    exercise = data.get("exercise") or ALL_EXERCISES
+
+    prediction = query_cache.get_or_compute(
+        email, "ai_prediction",
+        lambda: AnalyticsRollup.get_recovery_prediction(_get_user_rollup(email, exercise)),
+        params=(exercise,)
+    )
     
     if not prediction:
         return jsonify({"error": "Not enough data for prediction"}), 200 
@@ -357,21 +609,17 @@ def ai_prediction():
 # ----------------------------------------------------
 @app.route("/api/auth/send-otp", methods=["POST"])
 def send_otp():
-    if users_collection is None:
+    if storage is None:
         return jsonify({"error": "Database unavailable. Check server logs."}), 503
 
     data = request.get_json(silent=True) or {}
     email = data.get("email")
 
-    if users_collection.find_one({"email": email}):
+    if storage.users.find_by_email(email):
         return jsonify({"error": "Email already registered"}), 400
 
     otp = "".join(random.choices(string.digits, k=6))
-    otp_collection.update_one(
-        {"email": email},
-        {"$set": {"otp": otp, "created_at": time.time()}},
-        upsert=True,
-    )
+    storage.otps.upsert(email, otp, time.time())
 
     try:
         msg = Message("PhysioCheck OTP", sender=app.config["MAIL_USERNAME"], recipients=[email])
@@ -384,11 +632,11 @@ def send_otp():
 
 @app.route("/api/auth/login", methods=["POST"])
 def login():
-    if users_collection is None:
+    if storage is None:
         return jsonify({"error": "Database unavailable. Check server logs."}), 503
 
     data = request.get_json(silent=True) or {}
-    user = users_collection.find_one({"email": data.get("email")})
+    user = storage.users.find_by_email(data.get("email"))
 
     if user and bcrypt.check_password_hash(user["password"], data.get("password")):
         return jsonify({
@@ -401,7 +649,7 @@ def login():
 
 @app.route("/api/auth/signup-verify", methods=["POST"])
 def signup_verify():
-    if users_collection is None:
+    if storage is None:
         return jsonify({"error": "Database unavailable. Check server logs."}), 503
 
     data = request.get_json(silent=True) or {}
@@ -414,11 +662,11 @@ def signup_verify():
     if not all([email, otp_input, password, name]):
         return jsonify({"error": "Missing required fields"}), 400
 
-    otp_record = otp_collection.find_one({"email": email})
+    otp_record = storage.otps.find(email)
     if not otp_record or otp_record.get("otp") != otp_input:
         return jsonify({"error": "Invalid OTP"}), 400
 
-    if users_collection.find_one({"email": email}):
+    if storage.users.find_by_email(email):
         return jsonify({"error": "User already exists"}), 400
 
     hashed_pw = bcrypt.generate_password_hash(password).decode('utf-8')
@@ -429,8 +677,13 @@ def signup_verify():
         "role": role, 
         "created_at": time.time()
     }
-    users_collection.insert_one(new_user)
-    otp_collection.delete_one({"email": email})
+    try:
+        storage.users.insert(new_user)
+    except DuplicateUserError:
+        # Lost a race with a concurrent signup for the same email
+        return jsonify({"error": "User already exists"}), 400
+    storage.otps.delete(email)
+    query_cache.invalidate(ALL_USERS)
 
     return jsonify({"user": {"email": email, "name": name, "role": role}}), 201
 
@@ -439,7 +692,7 @@ def signup_verify():
 def google_auth():
     """Handles Google Login/Signup by verifying token and checking DB."""
     # EDGE CASE: DB NOT CONNECTED
-    if users_collection is None:
+    if storage is None:
         print("❌ Login failed: Database not connected")
         return jsonify({"error": "Database unavailable. Check server logs."}), 503
 
@@ -455,6 +708,7 @@ def google_auth():
         # We must use requests.get() to verify it against Google's UserInfo API.
         # google-auth library (id_token.verify_oauth2_token) requires an ID Token (JWT).
         
+        import requests
         google_response = requests.get(
             f"https://www.googleapis.com/oauth2/v1/userinfo?access_token={token}",
             headers={"Accept": "application/json"}
@@ -471,7 +725,7 @@ def google_auth():
             return jsonify({"error": "Email not found in Google profile"}), 400
 
         # Check if user exists in DB
-        user = users_collection.find_one({"email": email})
+        user = storage.users.find_by_email(email)
         
         if user:
             # User exists -> LOGIN
@@ -490,7 +744,17 @@ def google_auth():
                 "auth_provider": "google",
                 "created_at": time.time()
             }
-            users_collection.insert_one(new_user)
+            try:
+                storage.users.insert(new_user)
+            except DuplicateUserError:
+                # Registered concurrently -> LOGIN as the stored user
+                user = storage.users.find_by_email(email)
+                return jsonify({
+                    "email": user["email"],
+                    "role": user.get("role", "patient"),
+                    "name": user["name"]
+                }), 200
+            query_cache.invalidate(ALL_USERS)
             
             return jsonify({
                 "email": email,
@@ -506,34 +770,76 @@ def google_auth():
 def get_exercises():
     return jsonify(_get_frontend_exercise_list())
 
+PATIENT_FIELDS = ("name", "email", "date_joined", "status", "hasActiveProtocol")
+
 @app.route("/api/therapist/patients", methods=["GET"])
 def therapist_patients():
-    if users_collection is None: return jsonify({"patients": []}), 200
+    """
+    Lists patients with their risk status.
+    Optional query params: page (1-based), page_size and fields (comma separated).
+    Without page_size every patient is returned, as before.
+    """
+    if storage is None: return jsonify({"patients": []}), 200
+
+    try:
+        page = max(1, int(request.args.get("page", 1)))
+        page_size = request.args.get("page_size")
+        page_size = min(THERAPIST_MAX_PAGE_SIZE, max(1, int(page_size))) if page_size else None
+    except ValueError:
+        return jsonify({"error": "page and page_size must be integers"}), 400
+
+    fields = request.args.get("fields")
+    fields = tuple(f for f in fields.split(",") if f in PATIENT_FIELDS) if fields else PATIENT_FIELDS
+
+    result = query_cache.get_or_compute(
+        ALL_USERS, "therapist_patients",
+        lambda: _patient_page(page, page_size, fields),
+        params=(page, page_size, fields)
+    )
+    return jsonify(result), 200
+
+def _patient_page(page, page_size, fields):
+    skip = (page - 1) * page_size if page_size else 0
+    patients = storage.users.list_by_role("patient", skip, page_size, fields=("name", "email", "created_at"))
+    total = storage.users.count_by_role("patient") if page_size else len(patients)
+
+    statuses = []
+    if "status" in fields and patients:
+        latest = storage.sessions.latest_per_email([p["email"] for p in patients])
+        last = [latest.get(p["email"]) for p in patients]
+        statuses = analytics_core.risk_status(
+            np.array([(d or {}).get("total_reps") or 0 for d in last], dtype=np.int64),
+            np.array([(d or {}).get("total_errors") or 0 for d in last], dtype=np.int64),
+            np.array([d is not None for d in last], dtype=bool),
+        )
 
-    patients = list(users_collection.find({"role": "patient"}, {"_id": 0, "name": 1, "email": 1, "created_at": 1}))
     enriched = []
-    for p in patients:
-        last = sessions_collection.find_one({"email": p["email"]}, sort=[("timestamp", -1)])
-        status = "Normal"
-        if last:
-            reps = last.get("total_reps", 0)
-            errors = last.get("total_errors", 0)
-            accuracy = max(0, 100 - int((errors / max(reps, 1)) * 20))
-            if accuracy < 60: status = "High Risk"
-            elif accuracy < 80: status = "Alert"
-        enriched.append({
+    for i, p in enumerate(patients):
+        row = {
             "name": p.get("name", "Unknown"),
             "email": p["email"],
             "date_joined": datetime.fromtimestamp(p.get("created_at", time.time())).strftime("%Y-%m-%d"),
-            "status": status,
+            "status": statuses[i] if statuses else "Normal",
             "hasActiveProtocol": False
-        })
-    return jsonify({"patients": enriched}), 200
+        }
+        enriched.append({f: row[f] for f in fields})
+
+    return {
+        "patients": enriched,
+        "total": total,
+        "page": page if page_size else 1,
+        "page_size": page_size or total
+    }
 
 @app.route("/api/therapist/notifications", methods=["GET"])
 def therapist_notifications():
-    if notifications_collection is None: return jsonify([]), 200
-    notifs = list(notifications_collection.find({}).sort("timestamp", -1).limit(10))
+    if storage is None: return jsonify([]), 200
+    # Notifications are written by the Node backend, so only the TTL refreshes this entry
+    response = query_cache.get_or_compute(ALL_USERS, "therapist_notifications", _recent_notifications)
+    return jsonify(response), 200
+
+def _recent_notifications():
+    notifs = storage.notifications.recent(10)
     response = []
     for n in notifs:
         response.append({
@@ -543,15 +849,99 @@ def therapist_notifications():
             "message": n.get("message", ""),
             "time": n.get("time", "Recently")
         })
-    return jsonify(response), 200
+    return response
+
+@app.route("/api/cache/metrics", methods=["GET"])
+def cache_metrics():
+    """Hit/miss counters of the query-result cache."""
+    return jsonify(query_cache.metrics()), 200
+
+@app.route("/api/health/live", methods=["GET"])
+def health_live():
+    """Liveness: the process is up (does not depend on the database)."""
+    return jsonify({"status": "ok"}), 200
+
+@app.route("/api/health/ready", methods=["GET"])
+def health_ready():
+    """Readiness: 200 once storage is connected, 503 while it is still connecting."""
+    status = db_manager.status()
+    status["pending_sessions"] = session_writer.pending_count()
+    if vision_pool is not None:
+        status["vision_pool"] = vision_pool.status()
+    return jsonify(status), 200 if status["ready"] else 503
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus scrape endpoint: frame pipeline stage latencies, drops and FPS."""
+    gauges = {
+        "physiocheck_storage_ready": int(db_manager.ready),
+        "physiocheck_pending_sessions": session_writer.pending_count(),
+        "physiocheck_frame_profiling_enabled": int(FRAME_PROFILING),
+    }
+    session = workout_session
+    if session is not None and session.motion_gate is not None:
+        gate = session.motion_gate
+        gauges["physiocheck_inference_skip_ratio"] = gate.skip_ratio
+        gauges["physiocheck_inference_skipped_frames"] = gate.skipped
+    body = render_prometheus(frame_profilers.profilers(), gauges) + latency_sink.render_prometheus()
+    if session is not None:
+        body += session.scheduler.render_prometheus()
+    return Response(body, mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/latency", methods=["GET"])
+def latency_metrics():
+    """Latest client latency reports, running totals per segment and the ghost look-ahead."""
+    session = workout_session
+    lookahead = session.ghost_lookahead if session is not None else None
+    return jsonify({**latency_sink.snapshot(),
+                    'ghost_lookahead_ms': round(lookahead * 1000, 1) if lookahead is not None else None}), 200
 
 # ----------------------------------------------------
 # 8. STREAMING ROUTES
 # ----------------------------------------------------
+def _load_calibration_profile(email, exercise):
+    """Stored thresholds for a returning patient (None -> full calibration)."""
+    if not email or storage is None:
+        return None
+    try:
+        return storage.calibrations.get(email, EXERCISE_PRESETS.get(exercise, EXERCISE_PRESETS["Bicep Curl"]).name)
+    except Exception as e:
+        print(f"⚠️ Calibration profile lookup failed: {e}")
+        return None
+
+def _save_pose_recording(recorder):
+    """Writes the recording in the background (compression takes a moment on long sessions)."""
+    if not len(recorder):
+        return
+    os.makedirs(POSE_RECORD_DIR, exist_ok=True)
+    name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{recorder.exercise.replace(' ', '_')}.npz"
+    path = os.path.join(POSE_RECORD_DIR, name)
+
+    def save():
+        try:
+            recorder.save(path)
+            print(f"🎞️ Pose recording saved: {path} ({len(recorder)} frames)")
+        except Exception as e:
+            print(f"⚠️ Pose recording failed: {e}")
+
+    threading.Thread(target=save, name="pose-recording", daemon=True).start()
+
+def _save_calibration_profile(session, email):
+    profile = session.calibration_manager.completed_profile(email)
+    if profile is None or storage is None:
+        return
+    try:
+        storage.calibrations.put(profile)
+    except Exception as e:
+        print(f"⚠️ Calibration profile save failed: {e}")
+
 @app.route("/start_tracking", methods=["POST"])
 def start_tracking():
     data = request.get_json(silent=True) or {}
     exercise = data.get("exercise", "Bicep Curl")
+    email = data.get("email")
+    # "auto" (learn from the first reps) or "hold" (extend/contract holds); default in constants
+    calibration_mode = data.get("calibration")
 
     print(f"🚀 Received start_tracking request for: {exercise}")
 
@@ -559,7 +949,8 @@ def start_tracking():
         init_session(exercise)
         
         if workout_session:
-            workout_session.start()
+            workout_session.start(calibration_profile=_load_calibration_profile(email, exercise),
+                                  calibration_mode=calibration_mode)
             return jsonify({"status": "started", "exercise": exercise})
         else:
             return jsonify({"error": "Failed to initialize workout session"}), 500
@@ -576,20 +967,118 @@ def video_feed():
 
 @app.route("/report_data")
 def report_data():
-    global workout_session, last_session_report
-    
-    if workout_session:
-        return jsonify(workout_session.get_final_report())
-    
-    if last_session_report:
-        return jsonify(last_session_report)
-        
-    return jsonify({"error": "No session data found"})
+    """Serves the latest published report snapshot; supports If-None-Match (304)."""
+    current_session = workout_session
+    if current_session:
+        state = current_session.state_snapshot
+        snapshot = state.report if state else None
+    else:
+        snapshot = last_session_report_snapshot
+    if snapshot is None:
+        return jsonify({"error": "No session data found"})
+
+    response = Response(snapshot.body, mimetype="application/json")
+    response.set_etag(snapshot.etag)
+    # Always revalidate; unchanged reports cost an empty 304
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route("/session_state")
+def session_state():
+    """Latest per-frame state for polling clients (shares the snapshot's cached JSON)."""
+    current_session = workout_session
+    snapshot = current_session.state_snapshot if current_session else None
+    if snapshot is None:
+        return jsonify({"error": "No active session"}), 404
+
+    response = Response(snapshot.body, mimetype="application/json")
+    response.set_etag(str(snapshot.frame_id))
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+def _seconds_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    seconds = float(value)
+    # nan/inf would each open a new series cache entry
+    if not math.isfinite(seconds):
+        raise ValueError(f"{name} must be finite")
+    return seconds
+
+def _series_args():
+    """Parses ?points=&start=&end= (seconds since workout start); ValueError if malformed."""
+    points = int(request.args.get("points", SERIES_DEFAULT_POINTS))
+    points = min(SERIES_MAX_POINTS, max(3, points))
+    return points, _seconds_arg("start"), _seconds_arg("end")
+
+def _downsampled_series(series, points, start, end):
+    return {
+        "samples": len(series),
+        "points": points,
+        "RIGHT": downsample_series(series.time, series.right, points, start, end),
+        "LEFT": downsample_series(series.time, series.left, points, start, end),
+    }
+
+@app.route("/report_series")
+def report_series():
+    """LTTB-downsampled angle series of the active (or last) session."""
+    try:
+        points, start, end = _series_args()
+    except ValueError:
+        return jsonify({"error": "points, start and end must be finite numbers"}), 400
+
+    current_session = workout_session
+    if current_session:
+        # Published by the frame thread: never read the live history lists here
+        snapshot = current_session.state_snapshot
+        if snapshot is None or snapshot.series is None:
+            return jsonify({"error": "No session data found"})
+        series = snapshot.series
+    elif last_session_series is not None:
+        series = last_session_series
+    else:
+        return jsonify({"error": "No session data found"})
+
+    return jsonify(_downsampled_series(series, points, start, end))
+
+@app.route("/api/sessions/<session_id>/series")
+def session_series(session_id):
+    """LTTB-downsampled angle series of an archived session, cached per zoom level."""
+    if storage is None:
+        return jsonify({"error": "Database unavailable"}), 503
+    try:
+        points, start, end = _series_args()
+    except ValueError:
+        return jsonify({"error": "points, start and end must be finite numbers"}), 400
+
+    def load():
+        series = load_session_telemetry(session_id)
+        if series is None:
+            # Not stored (yet): the write-behind queue may still hold the session
+            raise _NoTelemetry(session_id)
+        return series
+
+    def compute():
+        series = decoded_series_cache.get_or_compute(session_id, "decoded", load)
+        return _downsampled_series(series, points, start, end)
+
+    try:
+        result = series_cache.get_or_compute(session_id, "series", compute, params=(points, start, end))
+    except _NoTelemetry:
+        return jsonify({"error": "No telemetry for this session"}), 404
+    return jsonify(result)
 
 # ----------------------------------------------------
 # 9. RUN SERVER
 # ----------------------------------------------------
 if __name__ == "__main__":
-    print("🚀 Starting Server with THREADING on Port 5001...")
+    port = int(os.getenv("PORT", 5001))
+    debug = os.getenv("FLASK_DEBUG", "1") == "1"
+    # Under the debug reloader only the serving child process owns the journal
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_workers()
+    print(f"🚀 Starting Server with THREADING on Port {port}...")
     # 'allow_unsafe_werkzeug' is needed when running threading mode with socketio in some envs
-    socketio.run(app, host="0.0.0.0", port=5001, debug=True, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    socketio.run(app, host="0.0.0.0", port=port, debug=debug,
+                 allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -0,0 +1,146 @@
+"""
+Auto-calibration from the first working reps
+Counting starts at once on the default thresholds while an online peak/valley
+(zig-zag) detector finds the turning points of the first reps. Thresholds are
+updated after every turning point; once they settle, the session so far is
+replayed through a fresh RepCounter so the early reps are counted again on the
+final thresholds.
+"""
+from collections import deque
+from statistics import median
+from typing import Dict, Optional
+
+from constants import (DEFAULT_CONTRACTED_THRESHOLD, DEFAULT_EXTENDED_THRESHOLD,
+                       AUTO_CALIBRATION_REPS, AUTO_CALIBRATION_PROMINENCE,
+                       AUTO_CALIBRATION_SPREAD, AUTO_CALIBRATION_MIN_ROM,
+                       AUTO_CALIBRATION_INSET)
+from models import ArmMetrics, CalibrationData, SessionHistory
+
+
+class TurningPointDetector:
+    """
+    Online peak/valley detector with hysteresis: an extreme is confirmed once the
+    angle has moved `prominence` degrees back from it.
+    """
+
+    def __init__(self, prominence: float):
+        self.prominence = prominence
+        self.direction = 0      # +1 looking for a peak, -1 for a valley, 0 undecided
+        self.extreme = None
+        self.start = None
+
+    def add(self, angle: float):
+        """Returns ('peak' | 'valley', angle) when a turning point is confirmed, else None."""
+        if self.extreme is None:
+            self.extreme = self.start = angle
+            return None
+
+        if self.direction == 0:
+            # Undecided until the first move of `prominence` from the start
+            if angle - self.start >= self.prominence:
+                self.direction, self.extreme = 1, angle
+            elif self.start - angle >= self.prominence:
+                self.direction, self.extreme = -1, angle
+            return None
+
+        if self.direction == 1:
+            if angle > self.extreme:
+                self.extreme = angle
+            elif self.extreme - angle >= self.prominence:
+                peak, self.direction, self.extreme = self.extreme, -1, angle
+                return ('peak', peak)
+        else:
+            if angle < self.extreme:
+                self.extreme = angle
+            elif angle - self.extreme >= self.prominence:
+                valley, self.direction, self.extreme = self.extreme, 1, angle
+                return ('valley', valley)
+        return None
+
+
+class AutoCalibrator:
+    """Learns extended/contracted thresholds from the turning points of both sides."""
+
+    def __init__(self, data: CalibrationData, safety_margin: int):
+        self.data = data
+        self.safety_margin = safety_margin
+        self.detectors = {
+            'RIGHT': TurningPointDetector(AUTO_CALIBRATION_PROMINENCE),
+            'LEFT': TurningPointDetector(AUTO_CALIBRATION_PROMINENCE),
+        }
+        # Extended angles are the peaks, contracted angles the valleys
+        self.peaks = deque(maxlen=AUTO_CALIBRATION_REPS)
+        self.valleys = deque(maxlen=AUTO_CALIBRATION_REPS)
+        self.settled = False
+
+        self.data.extended_threshold = DEFAULT_EXTENDED_THRESHOLD
+        self.data.contracted_threshold = DEFAULT_CONTRACTED_THRESHOLD
+        self._apply_safety(DEFAULT_CONTRACTED_THRESHOLD, DEFAULT_EXTENDED_THRESHOLD)
+
+    def add(self, angles: Dict[str, Optional[float]]) -> bool:
+        """Feeds one frame; returns True on the frame the thresholds settle."""
+        if self.settled:
+            return False
+
+        changed = False
+        for arm, angle in angles.items():
+            if angle is None:
+                continue
+            point = self.detectors[arm].add(angle)
+            if point is not None:
+                kind, value = point
+                (self.peaks if kind == 'peak' else self.valleys).append(value)
+                changed = True
+
+        if not changed or not self.peaks or not self.valleys:
+            return False
+
+        # Running estimate after every turning point ("as it goes")
+        peak, valley = median(self.peaks), median(self.valleys)
+        rom = peak - valley
+        if rom < AUTO_CALIBRATION_MIN_ROM:
+            return False
+        # Turning points are the extremes of moving reps; thresholds sit a little
+        # inside them so a normal rep reaches both
+        inset = rom * AUTO_CALIBRATION_INSET
+        self.data.extended_threshold = int(round(peak - inset))
+        self.data.contracted_threshold = int(round(valley + inset))
+        self._apply_safety(valley, peak)
+
+        full = len(self.peaks) == self.peaks.maxlen and len(self.valleys) == self.valleys.maxlen
+        steady = (max(self.peaks) - min(self.peaks) <= AUTO_CALIBRATION_SPREAD and
+                  max(self.valleys) - min(self.valleys) <= AUTO_CALIBRATION_SPREAD)
+        self.settled = full and steady
+        return self.settled
+
+    def _apply_safety(self, valley: float, peak: float):
+        # Same rule as the hold calibration, whose thresholds are the held extremes:
+        # the margin goes around the observed turning points, not the inset thresholds
+        self.data.safe_angle_min = max(20, int(round(valley)) - self.safety_margin)
+        self.data.safe_angle_max = min(175, int(round(peak)) + self.safety_margin)
+
+    @staticmethod
+    def recount(history: SessionHistory, start_time: float, data: CalibrationData,
+                min_rep_duration: float):
+        """
+        Replays the recorded angles through a fresh RepCounter on the settled thresholds.
+        Returns (rep_counter, arm_metrics, feedback_counts) as of the last recorded frame.
+        """
+        from rep_counter import RepCounter
+
+        counter = RepCounter(data, min_rep_duration)
+        metrics = {'RIGHT': ArmMetrics(), 'LEFT': ArmMetrics()}
+        for m in metrics.values():
+            m.last_down_time = m.stage_start_time = start_time
+        scratch = SessionHistory()
+
+        n = min(len(history.time), len(history.right_angle), len(history.left_angle))
+        for i in range(n):
+            t = start_time + history.time[i]
+            for arm, series in (('RIGHT', history.right_angle), ('LEFT', history.left_angle)):
+                # 0 marks frames where the joint was not tracked
+                if series[i]:
+                    counter.process_rep(arm, series[i], metrics[arm], t, scratch)
+
+        feedback = {'RIGHT': scratch.right_feedback_count, 'LEFT': scratch.left_feedback_count}
+        return counter, metrics, feedback
@@ -0,0 +1,333 @@
+"""
+Frame-stage benchmarks
+Per-frame cost and allocations of each stage of the frame pipeline, driven by
+a synthetic landmark stream (or a recording from pose_replay.py), with no
+camera or MediaPipe. Results can be saved as a JSON baseline and compared
+against one to catch regressions between commits.
+
+    python benchmarks/frame_stages.py [--recording rec.npz] [--repeat 5]
+                                      [--save baselines/frame_stages.json]
+                                      [--compare baselines/frame_stages.json] [--tolerance 0.25]
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "frame_stages.json")
+
+
+# --- STAGES ---
+# Each stage is setup(stream) -> (run, frames): run() does one full pass over
+# the stream and is what gets timed; setup is not.
+
+class Stream:
+    """Pose results, timestamps and per-side angles of one landmark stream."""
+
+    def __init__(self, recording):
+        from constants import EXERCISE_PRESETS
+
+        self.recording = recording
+        self.config = EXERCISE_PRESETS.get(recording.exercise, EXERCISE_PRESETS["Bicep Curl"])
+        self.results = recording.results()
+        self.times = recording.t.tolist()
+        self.present = [r for r in self.results if r.pose_landmarks]
+
+        from pose_processor import PoseProcessor
+        from angle_calculator import AngleCalculator
+        processor = PoseProcessor(AngleCalculator(), self.config)
+        self.angles = [processor.get_both_arm_angles(r) for r in self.results]
+
+    def new_session(self, calibration_mode="auto"):
+        from workout_session import WorkoutSession
+
+        session = WorkoutSession(self.config.name)
+        now = [self.times[0]]
+        session.clock = lambda: now[0]
+        session.start(calibration_mode=calibration_mode, capture=False)
+        return session, now
+
+
+def stage_calculate_angle(stream):
+    from angle_calculator import AngleCalculator
+
+    a, b, c = stream.config.right_landmarks
+    points = [([lm[a].x, lm[a].y], [lm[b].x, lm[b].y], [lm[c].x, lm[c].y])
+              for lm in (r.pose_landmarks.landmark for r in stream.present)]
+
+    def run():
+        for p in points:
+            AngleCalculator.calculate_angle(*p)
+    return run, len(points)
+
+
+def stage_smoothed_angle(stream):
+    from angle_calculator import AngleCalculator
+
+    raw = [angles['RIGHT'] for angles in stream.angles if angles['RIGHT'] is not None]
+
+    def run():
+        calc = AngleCalculator()
+        for angle in raw:
+            calc.get_smoothed_angle('RIGHT', angle)
+    return run, len(raw)
+
+
+def stage_both_arm_angles(stream):
+    from angle_calculator import AngleCalculator
+    from pose_processor import PoseProcessor
+
+    def run():
+        processor = PoseProcessor(AngleCalculator(), stream.config)
+        for results in stream.results:
+            processor.get_both_arm_angles(results)
+    return run, len(stream.results)
+
+
+def stage_process_rep(stream):
+    from constants import MIN_REP_DURATION
+    from models import ArmMetrics, CalibrationData, SessionHistory
+    from rep_counter import RepCounter
+
+    frames = list(zip(stream.times, stream.angles))
+
+    def run():
+        counter = RepCounter(CalibrationData(), MIN_REP_DURATION)
+        metrics = {'RIGHT': ArmMetrics(), 'LEFT': ArmMetrics()}
+        history = SessionHistory()
+        for t, angles in frames:
+            for arm in ('RIGHT', 'LEFT'):
+                if angles[arm] is not None:
+                    counter.process_rep(arm, angles[arm], metrics[arm], t, history)
+    return run, 2 * len(frames)
+
+
+def stage_calibration(stream):
+    from angle_calculator import AngleCalculator
+    from calibration import CalibrationManager
+    from constants import CALIBRATION_HOLD_TIME, SAFETY_MARGIN
+    from models import CalibrationData
+    from pose_processor import PoseProcessor
+
+    frames = list(zip(stream.times, stream.results))
+
+    def run():
+        manager = CalibrationManager(PoseProcessor(AngleCalculator(), stream.config),
+                                     CalibrationData(), CALIBRATION_HOLD_TIME, SAFETY_MARGIN)
+        now = [frames[0][0]]
+        manager.clock = lambda: now[0]
+        manager.start()
+        for t, results in frames:
+            now[0] = t
+            if manager.process_frame(results, t):
+                manager.start()
+    return run, len(frames)
+
+
+def stage_ghost(stream):
+    import numpy as np
+
+    session, now = stream.new_session()
+    frames = []
+    for t, r in zip(stream.times, stream.results):
+        if r.pose_landmarks:
+            frame = np.array([(lm.x, lm.y, lm.visibility) for lm in r.pose_landmarks.landmark])
+            frames.append((t, frame[:, :2].copy(), frame[:, 2] > 0))
+
+    def run():
+        for t, points, visible in frames:
+            now[0] = t
+            session._calculate_ideal_pose_realtime(points, visible)
+    return run, len(frames)
+
+
+def stage_ghost_predictor(stream):
+    from pose_predictor import LandmarkPredictor
+
+    frames = [(t, r.pose_landmarks.landmark) for t, r in zip(stream.times, stream.results) if r.pose_landmarks]
+
+    def run():
+        predictor = LandmarkPredictor()
+        for t, landmarks in frames:
+            predictor.update(landmarks, t)
+            predictor.predict(0.1)
+    return run, len(frames)
+
+
+def stage_state_json(stream):
+    # Replayed first so the state carries real reps, history and ghost landmarks
+    session, now = stream.new_session()
+    for t, results in zip(stream.times, stream.results):
+        now[0] = t
+        session.process_results(results)
+    count = len(stream.results)
+
+    def run():
+        for _ in range(count):
+            json.dumps(session.get_state_dict())
+    return run, count
+
+
+def stage_predict_form(stream):
+    from ai_engine import AIEngine
+
+    AIEngine.load_model()
+    indices = stream.config.ai_features_landmarks
+    features = [[v for i in indices for v in (r.pose_landmarks.landmark[i].x, r.pose_landmarks.landmark[i].y)]
+                for r in stream.present]
+
+    def run():
+        for f in features:
+            AIEngine.predict_form(f)
+    return run, len(features)
+
+
+def stage_frame_total(stream):
+    # Everything after inference: phase logic, ghost, history and the published snapshot
+    frames = list(zip(stream.times, stream.results))
+
+    def run():
+        session, now = stream.new_session()
+        for t, results in frames:
+            now[0] = t
+            session.process_results(results)
+    return run, len(frames)
+
+
+STAGES = {
+    "angle.calculate_angle": stage_calculate_angle,
+    "angle.get_smoothed_angle": stage_smoothed_angle,
+    "pose.get_both_arm_angles": stage_both_arm_angles,
+    "rep_counter.process_rep": stage_process_rep,
+    "calibration.process_frame": stage_calibration,
+    "session.ghost_pose": stage_ghost,
+    "session.ghost_predictor": stage_ghost_predictor,
+    "session.state_json": stage_state_json,
+    "ai.predict_form": stage_predict_form,
+    "session.frame_total": stage_frame_total,
+}
+
+
+# --- MEASUREMENT ---
+def measure(run, frames: int, repeat: int) -> dict:
+    run()  # warm-up
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        run()
+        times.append((time.perf_counter_ns() - start) / frames)
+
+    # Allocations in a separate pass: tracing slows everything down
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    run()
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    allocated = sum(max(0, s.size_diff) for s in stats)
+    blocks = sum(max(0, s.count_diff) for s in stats)
+
+    return {
+        "frames": frames,
+        "ns_per_frame": round(statistics.median(times)),
+        "ns_per_frame_min": round(min(times)),
+        "peak_kb": round(peak / 1024, 1),
+        "retained_bytes_per_frame": round(allocated / frames, 1),
+        "retained_blocks_per_frame": round(blocks / frames, 3),
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Stages slower than the baseline by more than `tolerance` (fraction)."""
+    regressions = []
+    for name, current in results["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            continue
+        ratio = current["ns_per_frame"] / max(base["ns_per_frame"], 1)
+        if ratio > 1 + tolerance:
+            regressions.append((name, base["ns_per_frame"], current["ns_per_frame"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--recording", help="pose_replay .npz recording (default: synthetic stream)")
+    parser.add_argument("--exercise", default="Bicep Curl", help="exercise of the synthetic stream")
+    parser.add_argument("--seconds", type=float, default=30.0, help="length of the synthetic stream")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--stage", action="append", choices=sorted(STAGES), help="run only these stages")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, help="write results as a baseline")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="fail on regressions vs a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args(argv)
+
+    from pose_replay import PoseRecording
+
+    if args.recording:
+        recording = PoseRecording.load(args.recording)
+        source = os.path.basename(args.recording)
+    else:
+        recording = PoseRecording.synthetic(args.exercise, seconds=args.seconds)
+        source = f"synthetic:{recording.exercise}:{args.seconds:g}s"
+    # Session / calibration progress messages go to stderr so --json stays clean
+    with contextlib.redirect_stdout(sys.stderr):
+        stream = Stream(recording)
+
+    from ai_engine import AIEngine
+    results = {
+        "source": source,
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "ai_model_loaded": None,
+        "stages": {},
+    }
+    for name in args.stage or STAGES:
+        with contextlib.redirect_stdout(sys.stderr):
+            run, frames = STAGES[name](stream)
+            results["stages"][name] = measure(run, frames, args.repeat)
+    results["ai_model_loaded"] = AIEngine._model is not None
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"⏱️ {source}, {len(recording)} frames, median of {args.repeat} runs")
+        print(f"   {'stage':<28}{'us/frame':>10}{'peak KB':>10}{'B/frame':>10}")
+        for name, row in results["stages"].items():
+            print(f"   {name:<28}{row['ns_per_frame'] / 1000:>10.2f}{row['peak_kb']:>10.1f}"
+                  f"{row['retained_bytes_per_frame']:>10.1f}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"💾 Baseline saved: {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after, ratio in regressions:
+            print(f"❌ {name}: {before / 1000:.2f} -> {after / 1000:.2f} us/frame ({ratio:.2f}x)")
+        if regressions:
+            return 1
+        print(f"✅ No stage slower than baseline by more than {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
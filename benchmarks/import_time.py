@@ -0,0 +1,117 @@
+"""
+Import-time benchmark
+Times a cold `import app` in fresh interpreters (API-only configuration,
+in-memory storage) and fails if the vision / ML stack is loaded or the median
+import time exceeds the budget.
+
+    python benchmarks/import_time.py [--runs 5] [--budget 1.0]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules an API-only worker must never import
+FORBIDDEN = ("cv2", "mediapipe", "joblib", "sklearn", "google.auth", "google.oauth2")
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+elapsed = time.perf_counter() - t0
+forbidden = sorted(m for m in sys.modules if m.split('.')[0] in {roots} or m in {names})
+print(json.dumps({{"seconds": elapsed, "forbidden": forbidden}}))
+"""
+
+
+def _env(journal_dir):
+    env = dict(os.environ)
+    env.update({
+        "STORAGE_BACKEND": "memory",
+        "SESSION_JOURNAL_PATH": os.path.join(journal_dir, "journal.jsonl"),
+    })
+    return env
+
+
+def run_once(env, importtime=False):
+    roots = {m for m in FORBIDDEN if "." not in m}
+    names = set(FORBIDDEN) - roots
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", PROBE.format(roots=roots, names=names)]
+    proc = subprocess.run(cmd, cwd=ROOT, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr else "import failed")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    return result, proc.stderr
+
+
+def slowest_imports(importtime_log, top=10):
+    """(cumulative_us, module) of the slowest direct imports of `app` from -X importtime output."""
+    rows = []
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nesting is encoded as two spaces per level after the leading space
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if cumulative.strip().isdigit() and depth == 1:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=1.0, help="max median seconds")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = _env(tmp)
+        # Warm the bytecode cache so runs measure imports, not compilation
+        run_once(env)
+        times, forbidden = [], set()
+        for _ in range(args.runs):
+            result, _ = run_once(env)
+            times.append(result["seconds"])
+            forbidden.update(result["forbidden"])
+        _, log = run_once(env, importtime=True)
+
+    median = statistics.median(times)
+    summary = {
+        "median_seconds": round(median, 4),
+        "min_seconds": round(min(times), 4),
+        "runs": args.runs,
+        "budget_seconds": args.budget,
+        "forbidden_loaded": sorted(forbidden),
+        "slowest": [{"module": m, "cumulative_ms": round(us / 1000, 1)} for us, m in slowest_imports(log)],
+    }
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        print(f"⏱️ import app: median {median * 1000:.0f} ms (min {min(times) * 1000:.0f} ms, {args.runs} runs)")
+        for row in summary["slowest"]:
+            print(f"   {row['cumulative_ms']:>8.1f} ms  {row['module']}")
+
+    ok = True
+    if forbidden:
+        print(f"❌ Vision/ML modules loaded at import: {', '.join(sorted(forbidden))}")
+        ok = False
+    if median > args.budget:
+        print(f"❌ Median import time {median:.2f}s exceeds budget {args.budget:.2f}s")
+        ok = False
+    if ok:
+        print("✅ Import-time budget met")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,278 @@
+"""
+Load test
+Ramps up simulated workout sessions against local app.py servers and finds
+the point where the delivered frame rate collapses. A server runs one live
+session, so every session gets its own server process (in-memory storage, no
+database) fed by a landmark replay or a video file instead of a camera, plus
+Socket.IO and MJPEG viewer clients.
+
+Each step adds a session, waits --step seconds and records per-client frames
+delivered, update latency, and server CPU and memory. The run is appended as
+one JSON line to the report file so results can be tracked over time.
+
+    python benchmarks/load_test.py [--sessions 8] [--sio-clients 1] [--mjpeg-clients 1]
+                                   [--source synthetic | rec.npz | video.mp4]
+                                   [--step 10] [--fps-floor 20] [--report results/load_test.jsonl]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_REPORT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "load_test.jsonl")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+# --- SERVER ---
+class Server:
+    """One app.py process serving one simulated session."""
+
+    def __init__(self, port: int, source: str, workdir: str):
+        self.port = port
+        self.url = f"http://127.0.0.1:{port}"
+        env = dict(os.environ)
+        env.update({
+            "PORT": str(port),
+            "FLASK_DEBUG": "0",
+            "STORAGE_BACKEND": "memory",
+            "SESSION_JOURNAL_PATH": os.path.join(workdir, f"journal-{port}.jsonl"),
+            "FRAME_PROFILING": "1",
+        })
+        if source.endswith(".npz") or source.startswith("synthetic"):
+            env["VISION_REPLAY"] = source
+        else:
+            env["VISION_SOURCE"] = source
+        self.log = open(os.path.join(workdir, f"server-{port}.log"), "w")
+        self.proc = subprocess.Popen([sys.executable, "app.py"], cwd=ROOT, env=env,
+                                     stdout=self.log, stderr=subprocess.STDOUT)
+
+    def wait_ready(self, timeout: float = 60.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError(f"server on port {self.port} exited (see {self.log.name})")
+            try:
+                if requests.get(f"{self.url}/api/health/ready", timeout=1).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.2)
+        raise TimeoutError(f"server on port {self.port} not ready after {timeout:.0f}s")
+
+    def start_session(self, exercise: str):
+        r = requests.post(f"{self.url}/start_tracking", json={"exercise": exercise, "calibration": "auto"}, timeout=60)
+        r.raise_for_status()
+
+    def usage(self):
+        """(cpu_seconds, rss_bytes) from /proc."""
+        with open(f"/proc/{self.proc.pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        cpu = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        with open(f"/proc/{self.proc.pid}/statm") as f:
+            rss = int(f.read().split()[1]) * PAGE_SIZE
+        return cpu, rss
+
+    def stop(self):
+        self.proc.terminate()
+        try:
+            self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+        self.log.close()
+
+
+# --- CLIENTS ---
+class MjpegClient(threading.Thread):
+    """Reads /video_feed (which also drives the session's frame loop)."""
+
+    def __init__(self, url: str):
+        super().__init__(daemon=True)
+        self.url = f"{url}/video_feed"
+        self.arrivals = []
+        self.error = None
+        self._stopping = threading.Event()
+
+    def run(self):
+        try:
+            with requests.get(self.url, stream=True, timeout=30) as r:
+                tail = b""
+                for chunk in r.iter_content(chunk_size=65536):
+                    if self._stopping.is_set():
+                        return
+                    data = tail + chunk
+                    now = time.time()
+                    self.arrivals.extend([now] * data.count(b"--frame\r\n"))
+                    tail = data[-9:]
+        except Exception as e:
+            # Errors once the run is over are just the server going away
+            if not self._stopping.is_set():
+                self.error = str(e)
+
+    def stop(self):
+        self._stopping.set()
+
+
+class SocketClient:
+    """Receives workout_update events and measures their delivery latency."""
+
+    def __init__(self, url: str):
+        import socketio
+
+        self.arrivals = []
+        self.latencies = []
+        self.client = socketio.Client(reconnection=False)
+        self.client.on("workout_update", self._on_update)
+        self.client.connect(url, wait_timeout=10)
+        self.transport = self.client.transport()
+
+    def _on_update(self, payload, timing=None):
+        now = time.time()
+        state = json.loads(payload)
+        self.arrivals.append(now)
+        if "timestamp" in state:
+            self.latencies.append((now - state["timestamp"]) * 1000)
+
+    def stop(self):
+        self.client.disconnect()
+
+
+# --- RUN ---
+def _in_window(arrivals, start, end):
+    return sum(1 for t in arrivals if start <= t < end)
+
+
+def measure_step(sessions, start, end, usage_before):
+    window = end - start
+    mjpeg_fps, sio_fps, latencies = [], [], []
+    for s in sessions:
+        for c in s["mjpeg"]:
+            mjpeg_fps.append(_in_window(c.arrivals, start, end) / window)
+        for c in s["sio"]:
+            sio_fps.append(_in_window(c.arrivals, start, end) / window)
+            latencies.extend(l for t, l in zip(c.arrivals, c.latencies) if start <= t < end)
+
+    cpu, rss = 0.0, 0
+    for s in sessions:
+        c, r = s["server"].usage()
+        cpu += c - usage_before.get(s["server"].port, (c, r))[0]
+        rss += r
+    return {
+        "sessions": len(sessions),
+        "mjpeg_fps_per_client": [round(f, 1) for f in mjpeg_fps],
+        "mjpeg_fps_median": round(statistics.median(mjpeg_fps), 1) if mjpeg_fps else None,
+        "sio_updates_per_client": [round(f, 1) for f in sio_fps],
+        "latency_ms_p50": round(_percentile(latencies, 0.5), 1) if latencies else None,
+        "latency_ms_p95": round(_percentile(latencies, 0.95), 1) if latencies else None,
+        "server_cpu_percent": round(100 * cpu / window, 1),
+        "server_rss_mb": round(rss / 2 ** 20, 1),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8, help="maximum simulated sessions")
+    parser.add_argument("--sio-clients", type=int, default=1, help="Socket.IO viewers per session")
+    parser.add_argument("--mjpeg-clients", type=int, default=1, help="MJPEG viewers per session (at least 1)")
+    parser.add_argument("--source", default="synthetic",
+                        help='"synthetic[:exercise]", a pose_replay .npz recording or a video file')
+    parser.add_argument("--exercise", default="Bicep Curl")
+    parser.add_argument("--step", type=float, default=10.0, help="seconds measured per session count")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds ignored after adding a session")
+    parser.add_argument("--fps-floor", type=float, default=20.0, help="median FPS below this is a collapse")
+    parser.add_argument("--keep-going", action="store_true", help="continue ramping after the collapse")
+    parser.add_argument("--base-port", type=int, default=5101)
+    parser.add_argument("--report", default=DEFAULT_REPORT, help="JSON-lines file the run is appended to")
+    args = parser.parse_args(argv)
+
+    steps, sessions, collapse_at = [], [], None
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            for i in range(args.sessions):
+                server = Server(args.base_port + i, args.source, workdir)
+                server.wait_ready()
+                server.start_session(args.exercise)
+                session = {
+                    "server": server,
+                    "mjpeg": [MjpegClient(server.url) for _ in range(max(1, args.mjpeg_clients))],
+                    "sio": [SocketClient(server.url) for _ in range(args.sio_clients)],
+                }
+                for c in session["mjpeg"]:
+                    c.start()
+                sessions.append(session)
+
+                time.sleep(args.warmup)
+                usage_before = {s["server"].port: s["server"].usage() for s in sessions}
+                start = time.time()
+                time.sleep(args.step)
+                step = measure_step(sessions, start, time.time(), usage_before)
+                steps.append(step)
+                print(f"📈 {step['sessions']:>2} sessions: {step['mjpeg_fps_median']} fps median, "
+                      f"latency p50/p95 {step['latency_ms_p50']}/{step['latency_ms_p95']} ms, "
+                      f"CPU {step['server_cpu_percent']}%, RSS {step['server_rss_mb']} MB")
+
+                if collapse_at is None and (step["mjpeg_fps_median"] or 0) < args.fps_floor:
+                    collapse_at = step["sessions"]
+                    print(f"💥 Frame rate collapsed at {collapse_at} sessions")
+                    if not args.keep_going:
+                        break
+        finally:
+            for s in sessions:
+                for c in s["mjpeg"]:
+                    c.stop()
+                for c in s["sio"]:
+                    try:
+                        c.stop()
+                    except Exception:
+                        pass
+                s["server"].stop()
+
+    errors = [c.error for s in sessions for c in s["mjpeg"] if c.error]
+    report = {
+        "created_at": time.time(),
+        "commit": _git_commit(),
+        "source": args.source,
+        "exercise": args.exercise,
+        "sio_clients": args.sio_clients,
+        "mjpeg_clients": max(1, args.mjpeg_clients),
+        "sio_transport": sessions[0]["sio"][0].transport if sessions and sessions[0]["sio"] else None,
+        "fps_floor": args.fps_floor,
+        "collapse_at_sessions": collapse_at,
+        "max_sustained_sessions": (collapse_at - 1) if collapse_at else len(steps),
+        "cpu_count": os.cpu_count(),
+        "steps": steps,
+        "client_errors": errors[:10],
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.report)), exist_ok=True)
+    with open(args.report, "a") as f:
+        f.write(json.dumps(report) + "\n")
+    print(f"✅ Sustained {report['max_sustained_sessions']} session(s) at >= {args.fps_floor:g} fps; "
+          f"report appended to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,13 +2,31 @@
 Calibration logic: Dynamically determines ROM thresholds
 """
 import time
-from typing import TYPE_CHECKING
-from constants import CalibrationPhase, ExerciseConfig
+from statistics import median
+from typing import TYPE_CHECKING, Optional
+from constants import (CalibrationPhase, ExerciseConfig, CALIBRATION_CHECK_TIME,
+                       CALIBRATION_CHECK_MIN_FRAMES, CALIBRATION_CHECK_TOLERANCE,
+                       CALIBRATION_PROFILE_MAX_AGE_DAYS, CALIBRATION_MIN_HOLD_TIME,
+                       CALIBRATION_CI_TARGET, CALIBRATION_MOVE_TOLERANCE,
+                       CALIBRATION_OUTLIER_FRAMES, CALIBRATION_EFFECTIVE_RATE)
+from streaming_stats import HoldEstimator
 
 if TYPE_CHECKING:
     from pose_processor import PoseProcessor
     from models import CalibrationData
 
+# CalibrationData fields persisted in a per-user, per-exercise profile
+PROFILE_FIELDS = ('extended_threshold', 'contracted_threshold', 'safe_angle_min', 'safe_angle_max')
+
+
+def is_profile_usable(profile: Optional[dict], now: Optional[float] = None) -> bool:
+    """A stored profile is used only if complete and younger than the max age."""
+    if not profile or any(profile.get(f) is None for f in PROFILE_FIELDS):
+        return False
+    age = (now or time.time()) - profile.get('calibrated_at', 0)
+    return age <= CALIBRATION_PROFILE_MAX_AGE_DAYS * 86400
+
+
 class CalibrationManager:
     def __init__(self, pose_processor, data: 'CalibrationData', hold_time: int, safety_margin: int):
         self.pose_processor = pose_processor
@@ -23,20 +41,88 @@ class CalibrationManager:
         self.exercise_name = self.exercise_config.name
 
         self.start_time = 0.0
-        self.min_angle = 360  # Start with max possible angle
-        self.max_angle = 0    # Start with min possible angle
+        # Set by the session (replays run on recorded time)
+        self.clock = time.time
+
+        # Streaming estimate of the held pose (both sides averaged) plus per-side
+        # summaries; constant memory however long the hold takes
+        self.estimator = self._new_estimator()
+        self.side_estimators = {'RIGHT': self._new_estimator(), 'LEFT': self._new_estimator()}
 
-    def start(self):
+        # Stored profile being verified, and where the final thresholds came from
+        self.profile: Optional[dict] = None
+        self.source: Optional[str] = None  # "profile", "calibration" or "auto"
+        self._check_angles = []
+        self.mode = "hold"
+        self.auto_fallback = False
+
+    def start(self, profile: Optional[dict] = None, mode: str = "hold"):
+        """Starts with a one-second check of `profile` when usable, else a full calibration.
+        In "auto" mode a failed check asks the session to auto-calibrate (auto_fallback)."""
+        self.source = None
+        self.mode = mode
+        self.auto_fallback = False
+        if is_profile_usable(profile):
+            self._start_verify(profile)
+        else:
+            self._start_full()
+
+    def _start_full(self, prefix: str = ""):
+        self.profile = None
         self.data.active = True
         self.data.phase = CalibrationPhase.EXTEND
         # Use dynamic joint and hold time in the message
-        self.data.message = f"CALIBRATION: Fully EXTEND your {self.joint_name} joint for {self.hold_time} seconds."
+        self.data.message = f"{prefix}CALIBRATION: Fully EXTEND your {self.joint_name} joint for {self.hold_time} seconds."
         self.data.progress = 0
-        self.start_time = time.time()
-        self.min_angle = 360
-        self.max_angle = 0
+        self.start_time = self.clock()
+        self._reset_estimators(self.start_time)
         print(f"Starting calibration for: {self.exercise_name} (Joint: {self.joint_name})")
 
+    def start_auto(self, prefix: str = ""):
+        """No hold phases: thresholds are learned from the first reps (see auto_calibration)."""
+        self.profile = None
+        self.source = None
+        self.mode = "auto"
+        self.auto_fallback = False
+        self.data.active = False
+        self.data.phase = None
+        self.data.message = f"{prefix}AUTO-CALIBRATING: Start your {self.exercise_name} reps."
+        self.data.progress = 0
+        print(f"Auto-calibrating from first reps for: {self.exercise_name} (Joint: {self.joint_name})")
+
+    def finish_auto(self):
+        self.source = "auto"
+        self.data.phase = CalibrationPhase.COMPLETE
+        self.data.message = f"{self.exercise_name} Calibration Complete. Keep going!"
+        self.data.progress = 100
+        print(f"Auto-calibration settled for {self.exercise_name}: "
+              f"Contracted={self.data.contracted_threshold}, Extended={self.data.extended_threshold}")
+
+    def _new_estimator(self) -> HoldEstimator:
+        return HoldEstimator(
+            min_hold=CALIBRATION_MIN_HOLD_TIME,
+            max_hold=self.hold_time,
+            ci_target=CALIBRATION_CI_TARGET,
+            move_tolerance=CALIBRATION_MOVE_TOLERANCE,
+            outlier_frames=CALIBRATION_OUTLIER_FRAMES,
+            effective_rate=CALIBRATION_EFFECTIVE_RATE,
+        )
+
+    def _reset_estimators(self, start_time: float):
+        self.estimator.reset(start_time)
+        for est in self.side_estimators.values():
+            est.reset(start_time)
+
+    def _start_verify(self, profile: dict):
+        self.profile = profile
+        self.data.active = True
+        self.data.phase = CalibrationPhase.VERIFY
+        self.data.message = f"WELCOME BACK: Hold your {self.joint_name} EXTENDED for a quick check."
+        self.data.progress = 0
+        self.start_time = self.clock()
+        self._check_angles = []
+        print(f"Verifying saved calibration for: {self.exercise_name} (Joint: {self.joint_name})")
+
     def process_frame(self, results, current_time: float) -> bool:
         """
         Processes a single frame for calibration.
@@ -59,60 +145,116 @@ class CalibrationManager:
             self.data.message = f"CALIBRATION: Please ensure your {self.joint_name} joint is visible."
             self.data.progress = 0
             self.start_time = current_time # Reset timer if pose is lost
+            self._check_angles = []
+            self._reset_estimators(current_time)
             return False
             
         current_angle = sum(valid_angles) / len(valid_angles)
-        
-        # Update min/max angles based on motion
-        self.min_angle = min(self.min_angle, current_angle)
-        self.max_angle = max(self.max_angle, current_angle)
-        
-        elapsed_time = current_time - self.start_time
+
+        if self.data.phase == CalibrationPhase.VERIFY:
+            return self._process_verify(current_angle, current_time)
         
         if self.data.phase == CalibrationPhase.EXTEND:
-            # Check if the user is holding the extended position (high angle)
-            # Check if the current angle is close to the max angle found so far (within 5 degrees)
-            if current_angle > (self.max_angle - 5) or elapsed_time < 0.5:
-                self.data.progress = int((elapsed_time / self.hold_time) * 100)
-                self.data.message = f"CALIBRATION: Hold EXTENDED {self.joint_name} position. ({self.hold_time - int(elapsed_time)}s left)"
-            else:
-                # Movement detected, reset timer
-                self.start_time = current_time
-                self.data.message = f"CALIBRATION: Please hold EXTENDED {self.joint_name} position steady."
-                self.data.progress = 0
-
-            if elapsed_time >= self.hold_time:
-                # Transition to CONTRACT phase
-                self.data.extended_threshold = int(self.max_angle)
-                self.data.phase = CalibrationPhase.CONTRACT
-                self.start_time = current_time
-                self.data.progress = 0
-                self.data.message = f"CALIBRATION: Great! Now Fully CONTRACT your {self.joint_name} joint for {self.hold_time} seconds."
-                self.min_angle = 360 # Reset min angle for next phase
-                self.max_angle = 0 # Reset max angle for next phase
-        
+            label, quantile = "EXTENDED", 0.9
         elif self.data.phase == CalibrationPhase.CONTRACT:
-            # Check if the user is holding the contracted position (low angle)
-            # Check if the current angle is close to the min angle found so far (within 5 degrees)
-            if current_angle < (self.min_angle + 5) or elapsed_time < 0.5:
-                self.data.progress = int((elapsed_time / self.hold_time) * 100)
-                self.data.message = f"CALIBRATION: Hold CONTRACTED {self.joint_name} position. ({self.hold_time - int(elapsed_time)}s left)"
-            else:
-                # Movement detected, reset timer
-                self.start_time = current_time
-                self.data.message = f"CALIBRATION: Please hold CONTRACTED {self.joint_name} position steady."
-                self.data.progress = 0
-
-            if elapsed_time >= self.hold_time:
-                # Calibration Complete
-                self.data.contracted_threshold = int(self.min_angle)
-                self._finalize_calibration()
-                return True
-                
+            label, quantile = "CONTRACTED", 0.1
+        else:
+            return False
+
+        # Glitches are dropped; a sustained move restarts the hold estimate
+        restarts = self.estimator.restarts
+        self.estimator.add(current_angle, current_time)
+        if self.estimator.restarts != restarts:
+            for est in self.side_estimators.values():
+                est.reset(current_time)
+        for arm, angle in (('RIGHT', right_angle), ('LEFT', left_angle)):
+            if angle is not None:
+                self.side_estimators[arm].add(angle, current_time)
+
+        est = self.estimator
+        elapsed_time = est.elapsed(current_time)
+        self.data.progress = int(est.progress(current_time) * 100)
+        if est.restarts != restarts:
+            self.data.message = f"CALIBRATION: Please hold {label} {self.joint_name} position steady."
+        else:
+            self.data.message = f"CALIBRATION: Hold {label} {self.joint_name} position. ({max(0, self.hold_time - int(elapsed_time))}s left)"
+
+        # Finishes as soon as the hold angle is pinned down (at most hold_time)
+        if not est.done(current_time):
+            return False
+
+        # Robust extreme of the hold: a single bad landmark cannot move a high/low quantile
+        threshold = int(round(est.quantile(quantile)))
+        summaries = {arm: e.summary() for arm, e in self.side_estimators.items()}
+        print(f"Calibration {label} hold: {threshold}° after {elapsed_time:.1f}s "
+              f"(±{est.ci_halfwidth(current_time):.1f}°, {est.stats.count} frames)")
+
+        if self.data.phase == CalibrationPhase.EXTEND:
+            # Transition to CONTRACT phase
+            self.data.extended_threshold = threshold
+            self.data.extended_angles = summaries
+            self.data.phase = CalibrationPhase.CONTRACT
+            self.start_time = current_time
+            self._reset_estimators(current_time)
+            self.data.progress = 0
+            self.data.message = f"CALIBRATION: Great! Now Fully CONTRACT your {self.joint_name} joint for {self.hold_time} seconds."
+            return False
+
+        # Calibration Complete
+        self.data.contracted_threshold = threshold
+        self.data.contracted_angles = summaries
+        self._finalize_calibration()
+        return True
+
+    def _process_verify(self, current_angle: float, current_time: float) -> bool:
+        """Collects ~1 s of the extended pose and compares it with the stored profile."""
+        self._check_angles.append(current_angle)
+        elapsed_time = current_time - self.start_time
+        self.data.progress = min(100, int((elapsed_time / CALIBRATION_CHECK_TIME) * 100))
+        if elapsed_time < CALIBRATION_CHECK_TIME or len(self._check_angles) < CALIBRATION_CHECK_MIN_FRAMES:
+            return False
+
+        if self._profile_matches(self._check_angles):
+            for f in PROFILE_FIELDS:
+                setattr(self.data, f, int(self.profile[f]))
+            self.source = "profile"
+            self.data.active = False
+            self.data.phase = CalibrationPhase.COMPLETE
+            self.data.message = f"{self.exercise_name}: Saved calibration confirmed. Start Workout!"
+            self.data.progress = 100
+            print(f"Calibration profile confirmed for {self.exercise_name}: "
+                  f"Contracted={self.data.contracted_threshold}, Extended={self.data.extended_threshold}")
+            return True
+
+        print(f"Calibration profile check failed for {self.exercise_name}, recalibrating")
+        if self.mode == "auto":
+            # The session switches to auto-calibration (see WorkoutSession._process_calibration)
+            self.auto_fallback = True
+            return False
+        self._start_full(prefix="Range changed. ")
+        self.start_time = current_time
         return False
 
+    def _profile_matches(self, angles) -> bool:
+        """Steady pose whose median is within tolerance of the stored extended angle."""
+        tolerance = CALIBRATION_CHECK_TOLERANCE
+        steady = max(angles) - min(angles) <= 2 * tolerance
+        return steady and abs(median(angles) - self.profile['extended_threshold']) <= tolerance
+
+    def completed_profile(self, email: str) -> Optional[dict]:
+        """Profile to store after a successful full calibration (None otherwise)."""
+        if self.source not in ("calibration", "auto") or self.data.phase != CalibrationPhase.COMPLETE:
+            return None
+        # Only a plausible range is worth reusing next time
+        if self.data.extended_threshold - self.data.contracted_threshold < 30:
+            return None
+        profile = {'email': email, 'exercise': self.exercise_name, 'calibrated_at': time.time()}
+        profile.update({f: int(getattr(self.data, f)) for f in PROFILE_FIELDS})
+        return profile
+
     def _finalize_calibration(self):
         """Calculates final thresholds and completes calibration."""
+        self.source = "calibration"
         self.data.safe_angle_min = max(20, self.data.contracted_threshold - self.safety_margin)
         self.data.safe_angle_max = min(175, self.data.extended_threshold + self.safety_margin)
 
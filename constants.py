@@ -1,10 +1,49 @@
 """
 Configuration constants and enumerations
 """
-from enum import Enum
+from enum import Enum, IntEnum
 from dataclasses import dataclass, field
 from typing import List
-import mediapipe as mp # Required for easy access to landmark indices
+
+
+class PoseLandmark(IntEnum):
+    """
+    MediaPipe Holistic pose landmark indices (mp.solutions.holistic.PoseLandmark).
+    Kept as a static table so importing constants never loads mediapipe.
+    """
+    NOSE = 0
+    LEFT_EYE_INNER = 1
+    LEFT_EYE = 2
+    LEFT_EYE_OUTER = 3
+    RIGHT_EYE_INNER = 4
+    RIGHT_EYE = 5
+    RIGHT_EYE_OUTER = 6
+    LEFT_EAR = 7
+    RIGHT_EAR = 8
+    MOUTH_LEFT = 9
+    MOUTH_RIGHT = 10
+    LEFT_SHOULDER = 11
+    RIGHT_SHOULDER = 12
+    LEFT_ELBOW = 13
+    RIGHT_ELBOW = 14
+    LEFT_WRIST = 15
+    RIGHT_WRIST = 16
+    LEFT_PINKY = 17
+    RIGHT_PINKY = 18
+    LEFT_INDEX = 19
+    RIGHT_INDEX = 20
+    LEFT_THUMB = 21
+    RIGHT_THUMB = 22
+    LEFT_HIP = 23
+    RIGHT_HIP = 24
+    LEFT_KNEE = 25
+    RIGHT_KNEE = 26
+    LEFT_ANKLE = 27
+    RIGHT_ANKLE = 28
+    LEFT_HEEL = 29
+    RIGHT_HEEL = 30
+    LEFT_FOOT_INDEX = 31
+    RIGHT_FOOT_INDEX = 32
 
 
 class WorkoutPhase(Enum):
@@ -15,6 +54,7 @@ class WorkoutPhase(Enum):
 
 
 class CalibrationPhase(Enum):
+    VERIFY = "VERIFY"  # Quick check of a stored calibration profile
     EXTEND = "EXTEND"
     CONTRACT = "CONTRACT"
     COMPLETE = "COMPLETE"
@@ -58,7 +98,7 @@ class ExerciseConfig:
 
 # --- EXERCISE PRESETS ---
 
-mp_pose = mp.solutions.holistic.PoseLandmark
+mp_pose = PoseLandmark
 
 EXERCISE_PRESETS = {
     "Bicep Curl": ExerciseConfig(
@@ -122,9 +162,54 @@ EXERCISE_PRESETS = {
 }
 
 # Calibration settings
-CALIBRATION_HOLD_TIME = 5     # seconds
+CALIBRATION_HOLD_TIME = 5     # seconds (upper bound; holds end early once the estimate is tight)
+CALIBRATION_MIN_HOLD_TIME = 1.5   # seconds
+CALIBRATION_CI_TARGET = 2.0       # degrees: 95% CI half-width of the hold angle to stop early
+CALIBRATION_MOVE_TOLERANCE = 15   # degrees from the running median that count as moving
+CALIBRATION_OUTLIER_FRAMES = 3    # consecutive off-median frames before the hold restarts
+CALIBRATION_EFFECTIVE_RATE = 10   # independent samples per second (frames are correlated)
+
+# Auto-calibration (learns thresholds from the first reps, no hold phases)
+DEFAULT_CALIBRATION_MODE = "hold"  # "hold" or "auto" (opt in per session)
+AUTO_CALIBRATION_REPS = 3          # turning points of each kind used for the thresholds
+AUTO_CALIBRATION_PROMINENCE = 25   # degrees an extreme must be left by to count as a turning point
+AUTO_CALIBRATION_SPREAD = 15       # degrees: max spread of the last peaks/valleys to settle
+AUTO_CALIBRATION_MIN_ROM = 30      # degrees between thresholds before they are applied
+AUTO_CALIBRATION_INSET = 0.15      # fraction of the ROM the thresholds sit inside the turning points
+
+# Stored calibration profiles (returning patients skip the full calibration)
+CALIBRATION_CHECK_TIME = 1.0             # seconds holding the extended pose
+CALIBRATION_CHECK_MIN_FRAMES = 10        # tracked frames needed for the check
+CALIBRATION_CHECK_TOLERANCE = 15         # degrees from the stored extended angle
+CALIBRATION_PROFILE_MAX_AGE_DAYS = 14    # older profiles force a full calibration
 WORKOUT_COUNTDOWN_TIME = 5    # seconds
 
+# Motion gating (skip pose inference while the patient is still)
+MOTION_GATE_THRESHOLD = 2.5    # mean abs grey-level change (0-255) inside the pose box
+MOTION_GATE_MAX_SKIP = 5       # consecutive skipped frames before inference is forced
+MOTION_GATE_WIDTH = 80         # pixels; frames are compared downscaled to this width
+MOTION_GATE_PADDING = 0.1      # fraction of the frame added around the landmark box
+
+# Frame scheduler (deferrable per-frame work; angles and rep counting always run)
+FRAME_BUDGET_MS = 30.0         # processing budget per frame, capture to encode
+# name: (priority (lower runs first), min interval s, max interval s = deadline)
+FRAME_TASKS = {
+    "emit":     (0, 0.0, 0.1),   # workout_update to the browser
+    "ghost":    (1, 0.0, 0.2),   # ghost pose IK
+    "encode":   (2, 0.0, 0.2),   # JPEG for the MJPEG stream
+    "ai_check": (3, 0.1, 0.5),   # AI form model (was a fixed 100 ms interval)
+}
+
+# Ghost prediction (extrapolated to when the browser shows it)
+GHOST_PREDICTION_MODEL = "velocity"  # "velocity", "acceleration" or "off"
+GHOST_PREDICTION_ALPHA = 0.6         # position gain of the alpha-beta(-gamma) filter
+GHOST_PREDICTION_BETA = 0.4          # velocity gain
+GHOST_PREDICTION_GAMMA = 0.005       # acceleration gain ("acceleration" model only)
+GHOST_LOOKAHEAD_DEFAULT = 0.08       # seconds of network + display latency until a client reports
+GHOST_LOOKAHEAD_MAX = 0.25           # seconds; longer look-aheads overshoot at turning points
+GHOST_TRAJECTORY_STEPS = 100         # trajectory table entries per rep
+GHOST_PHASE_LEAD = 0.15              # fraction of a rep the ghost runs ahead of the patient
+
 # Angle processing
 SMOOTHING_WINDOW = 7
 SAFETY_MARGIN = 10    # degrees
@@ -144,4 +229,15 @@ REP_HYSTERESIS_MARGIN = 5   # degrees: Margin used for state transition stabilit
 DEFAULT_CONTRACTED_THRESHOLD = 50
 DEFAULT_EXTENDED_THRESHOLD = 160
 DEFAULT_SAFE_ANGLE_MIN = 30
-DEFAULT_SAFE_ANGLE_MAX = 175
\ No newline at end of file
+DEFAULT_SAFE_ANGLE_MAX = 175
+
+# Analytics rollups
+ROLLUP_RING_SIZE = 100   # sessions kept for the history charts
+ROLLUP_DAY_WINDOW = 30   # days of per-day aggregates kept (adherence needs 7)
+
+# Therapist dashboard
+THERAPIST_MAX_PAGE_SIZE = 500
+
+# Session chart series (LTTB downsampling)
+SERIES_DEFAULT_POINTS = 500
+SERIES_MAX_POINTS = 5000
@@ -0,0 +1,159 @@
+"""
+Database connection manager
+Builds the storage backend without blocking startup: the Mongo client is
+connected (and pinged) on a background thread, retrying with exponential
+backoff, and routes read `storage` once it is ready.
+"""
+import os
+import threading
+import time
+from typing import Callable, Optional
+
+from storage import Storage, create_storage
+
+# Env var -> pymongo MongoClient keyword (only passed when set)
+MONGO_POOL_OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": ("maxPoolSize", int),
+    "MONGO_MIN_POOL_SIZE": ("minPoolSize", int),
+    "MONGO_MAX_IDLE_TIME_MS": ("maxIdleTimeMS", int),
+    "MONGO_WAIT_QUEUE_TIMEOUT_MS": ("waitQueueTimeoutMS", int),
+    "MONGO_MAX_CONNECTING": ("maxConnecting", int),
+}
+
+
+def mongo_pool_options(environ=None) -> dict:
+    """Connection-pool settings from the environment, e.g. MONGO_MAX_POOL_SIZE=20."""
+    environ = os.environ if environ is None else environ
+    options = {}
+    for env_name, (option, cast) in MONGO_POOL_OPTIONS.items():
+        value = environ.get(env_name)
+        if value not in (None, ""):
+            options[option] = cast(value)
+    return options
+
+
+class ConnectionManager:
+    def __init__(self,
+                 backend: str,
+                 mongo_uri: Optional[str] = None,
+                 db_name: str = "physiocheck_db",
+                 sqlite_path: str = "physiocheck.db",
+                 client_options: Optional[dict] = None,
+                 on_ready: Optional[Callable[[Storage], None]] = None,
+                 initial_backoff: float = 1.0,
+                 max_backoff: float = 60.0,
+                 server_selection_timeout_ms: int = 5000):
+        """
+        Args:
+            backend: "mongo", "memory" or "sqlite"
+            client_options: Extra MongoClient keywords (pool size, idle time, ...)
+            on_ready: Called once with the storage when the first connection succeeds
+        """
+        self.backend = (backend or "mongo").lower()
+        self.mongo_uri = mongo_uri
+        self.db_name = db_name
+        self.sqlite_path = sqlite_path
+        self.client_options = client_options or {}
+        self.on_ready = on_ready
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.server_selection_timeout_ms = server_selection_timeout_ms
+
+        self.client = None
+        self.storage: Optional[Storage] = None
+        self._ready = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.attempts = 0
+        self.last_error: Optional[str] = None
+        self.connected_at: Optional[float] = None
+
+    # --- LIFECYCLE ---
+    def start(self):
+        """Returns immediately; local backends are ready at once, Mongo connects in the background."""
+        if self._thread or self._ready.is_set():
+            return
+        if self.backend != "mongo":
+            self._connect_once()
+            return
+        self._thread = threading.Thread(target=self._run, name="db-connect", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=1.0)
+        if self.storage is not None:
+            self.storage.close()
+        if self.client is not None:
+            self.client.close()
+
+    # --- READINESS ---
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def status(self) -> dict:
+        return {
+            'backend': self.backend,
+            'ready': self.ready,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+            'connected_at': self.connected_at,
+        }
+
+    # --- CONNECTING ---
+    def _run(self):
+        backoff = self.initial_backoff
+        while not self._stop.is_set():
+            if self._connect_once():
+                return
+            print(f"⚠️ DB Error: {self.last_error} (retrying in {backoff:.0f}s)")
+            if self._stop.wait(backoff):
+                return
+            backoff = min(self.max_backoff, backoff * 2)
+
+    def _connect_once(self) -> bool:
+        self.attempts += 1
+        try:
+            db = None
+            if self.backend == "mongo":
+                db = self._connect_mongo()
+            storage = create_storage(self.backend, db=db, sqlite_path=self.sqlite_path)
+            storage.ensure_indexes()
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+
+        self.storage = storage
+        self.last_error = None
+        self.connected_at = time.time()
+        self._ready.set()
+        print(f"✅ Connected to {storage.name} storage: {self.db_name}")
+        if self.on_ready:
+            self.on_ready(storage)
+        return True
+
+    def _connect_mongo(self):
+        import certifi
+        from pymongo import MongoClient
+
+        if self.client is None:
+            print("⏳ Attempting to connect to MongoDB...")
+            # connect=False: no I/O here; the ping below does the first server selection
+            self.client = MongoClient(
+                self.mongo_uri,
+                serverSelectionTimeoutMS=self.server_selection_timeout_ms,
+                tls=True,
+                tlsCAFile=certifi.where(),
+                tlsAllowInvalidCertificates=True,
+                connect=False,
+                **self.client_options,
+            )
+        # The client keeps monitoring the cluster, so later attempts just re-ping
+        self.client.admin.command("ping")
+        return self.client[self.db_name]
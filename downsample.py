@@ -0,0 +1,59 @@
+"""
+Shape-preserving downsampling for chart payloads
+Largest-Triangle-Three-Buckets (Steinarsson, 2013) with the per-bucket
+triangle search vectorized in NumPy.
+"""
+import numpy as np
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of the `n_out` points LTTB keeps (first and last are always kept).
+    `x` must be sorted ascending.
+    """
+    n = x.size
+    if n_out >= n or n <= 2:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:n_out]
+
+    x = x.astype(np.float64, copy=False)
+    y = y.astype(np.float64, copy=False)
+
+    # Bucket edges over the interior points [1, n - 1)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    edges[-1] = n - 1
+
+    # Average point of every bucket (used as the third triangle vertex)
+    starts, ends = edges[:-1], edges[1:]
+    counts = np.maximum(ends - starts, 1)
+    cx, cy = np.cumsum(np.r_[0.0, x]), np.cumsum(np.r_[0.0, y])
+    avg_x = (cx[ends] - cx[starts]) / counts
+    avg_y = (cy[ends] - cy[starts]) / counts
+    avg_x = np.r_[avg_x[1:], x[-1]]
+    avg_y = np.r_[avg_y[1:], y[-1]]
+
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = starts[i], max(ends[i], starts[i] + 1)
+        bx, by = x[lo:hi], y[lo:hi]
+        # Twice the triangle area (a, candidate, next bucket average)
+        area = np.abs((x[a] - avg_x[i]) * (by - y[a]) - (x[a] - bx) * (avg_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def downsample_series(time: np.ndarray, values: np.ndarray, n_out: int,
+                      start: float = None, end: float = None) -> dict:
+    """Clips to [start, end] (seconds) and downsamples to at most `n_out` points."""
+    lo = 0 if start is None else int(np.searchsorted(time, start, side='left'))
+    hi = time.size if end is None else int(np.searchsorted(time, end, side='right'))
+    t, v = time[lo:hi], values[lo:hi]
+    idx = lttb_indices(t, v, n_out)
+    return {
+        't': np.round(t[idx], 2).tolist(),
+        'angle': v[idx].astype(np.int64).tolist(),
+    }
@@ -0,0 +1,160 @@
+"""
+Frame pipeline profiler
+Per-stage latency histograms for the capture -> inference -> emit -> encode
+loop, rendered in the Prometheus text format by /metrics.
+
+Every histogram is written only by the thread that runs the session's frame
+loop, so recording takes no lock; readers copy the bucket list. When profiling
+is off the session holds `None` and each stage costs one truthiness check.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+# Stages in pipeline order (labels of physiocheck_frame_stage_seconds)
+STAGES = (
+    "capture", "flip", "motion_gate", "color_to_rgb", "pose_inference", "color_to_bgr",
+    "calibration", "ai_check", "angles", "rep_counting", "ghost",
+    "state_snapshot", "emit", "encode", "total",
+)
+
+# Log-spaced bucket bounds: 10 us .. ~10 s, four buckets per doubling (~19% wide)
+BUCKET_BOUNDS_NS = [int(10_000 * 2 ** (i / 4)) for i in range(81)]
+
+# Frames slower than this missed the 30 fps deadline
+FRAME_BUDGET_NS = 33_333_333
+
+
+class LatencyHistogram:
+    __slots__ = ("buckets", "count", "sum_ns")
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS_NS) + 1)
+        self.count = 0
+        self.sum_ns = 0
+
+    def record(self, ns: int):
+        self.buckets[bisect_left(BUCKET_BOUNDS_NS, ns)] += 1
+        self.count += 1
+        self.sum_ns += ns
+
+    def quantiles(self, qs=(0.5, 0.95, 0.99)) -> Dict[float, float]:
+        """Quantiles in seconds (upper edge of the bucket holding the rank)."""
+        buckets = list(self.buckets)
+        total = sum(buckets)
+        result = {}
+        for q in qs:
+            if total == 0:
+                result[q] = math.nan
+                continue
+            rank, seen = q * total, 0
+            for i, n in enumerate(buckets):
+                seen += n
+                if seen >= rank:
+                    bound = BUCKET_BOUNDS_NS[min(i, len(BUCKET_BOUNDS_NS) - 1)]
+                    result[q] = bound / 1e9
+                    break
+        return result
+
+
+class FrameProfiler:
+    def __init__(self, name: str):
+        self.name = name
+        self.stages: Dict[str, LatencyHistogram] = {s: LatencyHistogram() for s in STAGES}
+        self.frames = 0
+        self.drops: Dict[str, int] = {}
+        self.started_ns = time.monotonic_ns()
+        self._last_frame_ns = 0
+        self._interval_ewma_ns = 0.0
+
+    @staticmethod
+    def now() -> int:
+        return time.perf_counter_ns()
+
+    def lap(self, stage: str, since_ns: int) -> int:
+        """Records `stage` as the time since `since_ns` and returns the current timestamp."""
+        now = time.perf_counter_ns()
+        self.stages[stage].record(now - since_ns)
+        return now
+
+    def frame_done(self, frame_start_ns: int):
+        now = self.lap("total", frame_start_ns)
+        self.frames += 1
+        if now - frame_start_ns > FRAME_BUDGET_NS:
+            self.drop("over_budget")
+        if self._last_frame_ns:
+            interval = now - self._last_frame_ns
+            # ~1 s smoothing window at 30 fps
+            alpha = 0.03 if self._interval_ewma_ns else 1.0
+            self._interval_ewma_ns += alpha * (interval - self._interval_ewma_ns)
+        self._last_frame_ns = now
+
+    def drop(self, reason: str):
+        self.drops[reason] = self.drops.get(reason, 0) + 1
+
+    @property
+    def fps(self) -> float:
+        return 1e9 / self._interval_ewma_ns if self._interval_ewma_ns else 0.0
+
+
+class ProfilerRegistry:
+    """Profilers of the live and most recent sessions (bounded)."""
+
+    def __init__(self, keep: int = 4):
+        self.keep = keep
+        self._profilers: "OrderedDict[str, FrameProfiler]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._seq = 0
+
+    def create(self) -> FrameProfiler:
+        with self._lock:
+            self._seq += 1
+            profiler = FrameProfiler(str(self._seq))
+            self._profilers[profiler.name] = profiler
+            while len(self._profilers) > self.keep:
+                self._profilers.popitem(last=False)
+            return profiler
+
+    def profilers(self) -> List[FrameProfiler]:
+        with self._lock:
+            return list(self._profilers.values())
+
+
+def _fmt(value: float) -> str:
+    return "NaN" if math.isnan(value) else repr(round(value, 9))
+
+
+def render_prometheus(profilers: List[FrameProfiler], gauges: Optional[Dict[str, float]] = None) -> str:
+    """Prometheus text exposition (version 0.0.4)."""
+    lines = []
+    for name, value in (gauges or {}).items():
+        lines += [f"# TYPE {name} gauge", f"{name} {_fmt(float(value))}"]
+
+    lines += [
+        "# HELP physiocheck_frame_stage_seconds Frame pipeline latency per stage",
+        "# TYPE physiocheck_frame_stage_seconds summary",
+    ]
+    for p in profilers:
+        for stage, hist in p.stages.items():
+            if hist.count == 0:
+                continue
+            labels = f'session="{p.name}",stage="{stage}"'
+            for q, v in hist.quantiles().items():
+                lines.append(f'physiocheck_frame_stage_seconds{{{labels},quantile="{q}"}} {_fmt(v)}')
+            lines.append(f"physiocheck_frame_stage_seconds_sum{{{labels}}} {_fmt(hist.sum_ns / 1e9)}")
+            lines.append(f"physiocheck_frame_stage_seconds_count{{{labels}}} {hist.count}")
+
+    lines += ["# HELP physiocheck_frames_total Frames processed", "# TYPE physiocheck_frames_total counter"]
+    lines += [f'physiocheck_frames_total{{session="{p.name}"}} {p.frames}' for p in profilers]
+
+    lines += ["# HELP physiocheck_frame_drops_total Frames dropped or late", "# TYPE physiocheck_frame_drops_total counter"]
+    for p in profilers:
+        for reason, n in sorted(p.drops.items()):
+            lines.append(f'physiocheck_frame_drops_total{{session="{p.name}",reason="{reason}"}} {n}')
+
+    lines += ["# HELP physiocheck_effective_fps Smoothed delivered frame rate", "# TYPE physiocheck_effective_fps gauge"]
+    lines += [f'physiocheck_effective_fps{{session="{p.name}"}} {_fmt(p.fps)}' for p in profilers]
+    return "\n".join(lines) + "\n"
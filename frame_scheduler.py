@@ -0,0 +1,143 @@
+"""
+Per-frame work scheduler
+Required work (angles, rep counting) always runs. Deferrable tasks ask the
+scheduler before running; it lets them run while the frame's time budget
+allows, reserving the learned cost of higher-priority tasks still to come.
+
+Each task has a minimum interval (a rate limit) and a maximum interval (a
+deadline: an overdue task runs even over budget). An overloaded host
+therefore degrades to fewer ghost updates, emits and encoded frames instead
+of growing latency.
+"""
+import time
+from typing import Callable, Dict, Optional
+
+from constants import FRAME_BUDGET_MS, FRAME_TASKS
+
+
+class _Task:
+    __slots__ = ("name", "priority", "min_interval", "max_interval",
+                 "cost_ns", "last_run", "runs", "skips", "forced", "active")
+
+    def __init__(self, name: str, priority: int, min_interval: float, max_interval: float):
+        self.name = name
+        self.priority = priority
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.cost_ns = 0.0          # EWMA of the run time
+        self.last_run = None        # session clock (s)
+        self.runs = 0
+        self.skips = 0
+        self.forced = 0             # ran over budget because the deadline had passed
+        self.active = False         # considered in the previous frame
+
+
+class FrameScheduler:
+    def __init__(self, budget_ms: float = FRAME_BUDGET_MS, tasks: Optional[Dict[str, tuple]] = None,
+                 clock_ns: Callable[[], int] = time.perf_counter_ns):
+        """
+        Args:
+            budget_ms: Processing time per frame, from capture to encode
+            tasks: name -> (priority, min_interval s, max_interval s); lower priority runs first
+            clock_ns: Measures frame time and task costs. Replays pass the recording's
+                frame clock, which stands still within a frame, so their decisions
+                do not depend on how fast the host runs them
+        """
+        self.clock_ns = clock_ns
+        self.budget_ns = int(budget_ms * 1e6)
+        self.tasks = {name: _Task(name, *spec) for name, spec in (tasks or FRAME_TASKS).items()}
+        self.frames = 0
+        self.overruns = 0
+        self.max_frame_ns = 0
+
+        self._frame_start = 0
+        self._now = 0.0
+        self._considered = set()
+        self._running: Dict[str, int] = {}
+
+    def begin_frame(self, now: float):
+        """`now` is the session clock (recorded time in replays); costs use clock_ns."""
+        self._frame_start = self.clock_ns()
+        self._now = now
+        self._considered = set()
+        self.frames += 1
+
+    def elapsed(self) -> float:
+        """Seconds since begin_frame on the scheduler's clock (0 within a replayed frame)."""
+        return (self.clock_ns() - self._frame_start) / 1e9
+
+    def begin(self, name: str) -> bool:
+        """True if `name` should run on this frame; pair with end(name) when it ran."""
+        task = self.tasks[name]
+        self._considered.add(name)
+        since = None if task.last_run is None else self._now - task.last_run
+
+        if since is not None and since < task.min_interval:
+            return False
+        if since is None or since >= task.max_interval:
+            run, forced = True, True
+        else:
+            # Keep the learned cost of more important work still to come this frame
+            reserved = sum(t.cost_ns for t in self.tasks.values()
+                           if t.priority < task.priority and t.active and t.name not in self._considered)
+            remaining = self.budget_ns - (self.clock_ns() - self._frame_start) - reserved
+            run, forced = task.cost_ns <= remaining, False
+
+        if not run:
+            task.skips += 1
+            return False
+        if forced and task.last_run is not None:
+            task.forced += 1
+        task.last_run = self._now
+        self._running[name] = self.clock_ns()
+        return True
+
+    def end(self, name: str):
+        started = self._running.pop(name, None)
+        if started is None:
+            return
+        task = self.tasks[name]
+        cost = self.clock_ns() - started
+        task.cost_ns = cost if task.runs == 0 else task.cost_ns + 0.2 * (cost - task.cost_ns)
+        task.runs += 1
+
+    def end_frame(self):
+        elapsed = self.clock_ns() - self._frame_start
+        self.max_frame_ns = max(self.max_frame_ns, elapsed)
+        if elapsed > self.budget_ns:
+            self.overruns += 1
+        for task in self.tasks.values():
+            task.active = task.name in self._considered
+
+    def status(self) -> dict:
+        return {
+            'frames': self.frames,
+            'overruns': self.overruns,
+            'budget_ms': self.budget_ns / 1e6,
+            'tasks': {
+                t.name: {'runs': t.runs, 'skips': t.skips, 'forced': t.forced,
+                         'cost_ms': round(t.cost_ns / 1e6, 3)}
+                for t in self.tasks.values()
+            },
+        }
+
+    def render_prometheus(self) -> str:
+        lines = [
+            "# HELP physiocheck_frame_budget_overruns_total Frames that exceeded the processing budget",
+            "# TYPE physiocheck_frame_budget_overruns_total counter",
+            f"physiocheck_frame_budget_overruns_total {self.overruns}",
+            "# HELP physiocheck_scheduler_frames_total Frames seen by the scheduler",
+            "# TYPE physiocheck_scheduler_frames_total counter",
+            f"physiocheck_scheduler_frames_total {self.frames}",
+        ]
+        for metric, field, kind, help_text in (
+                ("physiocheck_scheduled_task_runs_total", "runs", "counter", "Deferrable task runs"),
+                ("physiocheck_scheduled_task_skips_total", "skips", "counter", "Deferrable tasks skipped for budget"),
+                ("physiocheck_scheduled_task_forced_total", "forced", "counter", "Tasks run past budget on deadline")):
+            lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+            lines += [f'{metric}{{task="{t.name}"}} {getattr(t, field)}' for t in self.tasks.values()]
+        lines += ["# HELP physiocheck_scheduled_task_cost_seconds Smoothed task run time",
+                  "# TYPE physiocheck_scheduled_task_cost_seconds gauge"]
+        lines += [f'physiocheck_scheduled_task_cost_seconds{{task="{t.name}"}} {t.cost_ns / 1e9:.6f}'
+                  for t in self.tasks.values()]
+        return "\n".join(lines) + "\n"
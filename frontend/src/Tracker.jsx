@@ -23,6 +23,7 @@ import { useAuth } from "./context/AuthContext";
 import { io } from "socket.io-client";
 
 import GhostModelOverlay from "./components/GhostModelOverlay";
+import { createLatencyTracker } from "./latencyTracker";
 
 // --- UTILITY: TTS ---
 const speak = (text) => {
@@ -99,10 +100,13 @@ const Tracker = () => {
   useEffect(() => {
     const newSocket = io(API_URL);
     setSocket(newSocket);
+    const latency = createLatencyTracker(newSocket);
 
     newSocket.on("connect", () => {
       console.log("WebSocket Connected");
       setConnectionStatus("CONNECTED");
+      // Clock offset handshake (repeated on every reconnect)
+      latency.sync();
     });
 
     newSocket.on("connect_error", (err) => {
@@ -118,7 +122,10 @@ const Tracker = () => {
       handleExitNavigation();
     });
 
-    newSocket.on("workout_update", (json) => {
+    // State arrives as the server's cached JSON bytes, the emit stamp separately
+    newSocket.on("workout_update", (payload, emitTiming) => {
+      const json = JSON.parse(new TextDecoder().decode(payload));
+      latency.record(json, emitTiming);
       setData(json);
       handleWorkoutUpdate(json);
     });
@@ -128,6 +135,7 @@ const Tracker = () => {
     return () => {
       if (stopTimeoutRef.current) clearTimeout(stopTimeoutRef.current);
       if (timerRef.current) clearInterval(timerRef.current);
+      latency.stop();
       newSocket.close();
       window.speechSynthesis.cancel();
     };
@@ -236,7 +244,7 @@ const Tracker = () => {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ exercise: selectedExercise.title }),
+        body: JSON.stringify({ exercise: selectedExercise.title, email: user?.email }),
       });
 
       if (!res.ok) throw new Error("Server error");
@@ -0,0 +1,81 @@
+// --- END-TO-END LATENCY OF WORKOUT UPDATES ---
+// Server stamps (monotonic ms: capture, processed, emit) are mapped onto this
+// page's clock with an NTP-style offset estimate, summarized and reported back
+// to the server ("latency_report") every few seconds.
+const SYNC_SAMPLES = 8;
+const SYNC_TIMEOUT_MS = 2000;
+const REPORT_INTERVAL_MS = 5000;
+const SEGMENTS = ["processing", "emit_wait", "network", "end_to_end"];
+
+const summarize = (values) => {
+  const sorted = [...values].sort((a, b) => a - b);
+  const pick = (q) => sorted[Math.min(sorted.length - 1, Math.floor(q * sorted.length))];
+  return {
+    count: sorted.length,
+    mean: sorted.reduce((sum, v) => sum + v, 0) / sorted.length,
+    p50: pick(0.5),
+    p95: pick(0.95),
+    max: sorted[sorted.length - 1],
+  };
+};
+
+export const createLatencyTracker = (socket) => {
+  let offset = null; // server clock minus page clock (ms)
+  let bestRtt = Infinity;
+  let samples = Object.fromEntries(SEGMENTS.map((s) => [s, []]));
+
+  // Keeps the probe with the smallest round trip (least queueing noise)
+  const probe = () =>
+    new Promise((resolve) => {
+      const sent = performance.now();
+      socket.timeout(SYNC_TIMEOUT_MS).emit("clock_sync", { client_send: sent }, (err, reply) => {
+        const received = performance.now();
+        const rtt = received - sent;
+        if (!err && reply && rtt < bestRtt) {
+          bestRtt = rtt;
+          offset = reply.server_time - (sent + received) / 2;
+        }
+        resolve();
+      });
+    });
+
+  const sync = async () => {
+    bestRtt = Infinity;
+    for (let i = 0; i < SYNC_SAMPLES; i++) await probe();
+  };
+
+  const record = (update, emitTiming) => {
+    const timing = update?.timing;
+    if (!timing || offset === null) return;
+    const received = performance.now();
+    const toPage = (serverMs) => serverMs - offset;
+    const emit = emitTiming?.emit;
+
+    samples.processing.push(timing.processed - timing.capture);
+    if (emit !== undefined) {
+      samples.emit_wait.push(emit - timing.processed);
+      samples.network.push(received - toPage(emit));
+    }
+    // Glass-to-glass as far as the page can tell: capture to the next paint
+    requestAnimationFrame(() => samples.end_to_end.push(performance.now() - toPage(timing.capture)));
+  };
+
+  const flush = () => {
+    const segments = {};
+    SEGMENTS.forEach((s) => {
+      if (samples[s].length) segments[s] = summarize(samples[s]);
+    });
+    samples = Object.fromEntries(SEGMENTS.map((s) => [s, []]));
+    if (Object.keys(segments).length && socket.connected) {
+      socket.emit("latency_report", { clock_rtt_ms: bestRtt, offset_ms: offset, segments });
+    }
+  };
+
+  const timer = setInterval(flush, REPORT_INTERVAL_MS);
+  const stop = () => {
+    clearInterval(timer);
+    flush();
+  };
+
+  return { sync, record, stop };
+};
@@ -0,0 +1,105 @@
+"""
+Ghost trajectory engine
+Once calibration fixes the extended/contracted thresholds, the ideal joint
+angle over one rep is tabulated as a minimum-jerk trajectory parameterized
+by rep progress (0 = extended, 0.5 = contracted, 1 = extended again), stored
+as the cos/sin of the limb rotation. Per frame the ghost is the (33, 2)
+landmark array with the distal point of each exercise limb rotated to the
+tabulated angle a little ahead of the patient: a handful of vector ops, no
+trigonometry.
+"""
+import math
+
+import numpy as np
+
+from constants import ArmStage, GHOST_TRAJECTORY_STEPS, GHOST_PHASE_LEAD
+
+# Stages heading for the contracted end (first half of the rep) / back to the extended end
+_UP_STAGES = (ArmStage.DOWN.value, ArmStage.MOVING_UP.value)
+_DOWN_STAGES = (ArmStage.UP.value, ArmStage.MOVING_DOWN.value)
+
+
+def _min_jerk(s: np.ndarray) -> np.ndarray:
+    return s ** 3 * (10 - 15 * s + 6 * s * s)
+
+
+class GhostEngine:
+    def __init__(self, exercise_config, steps: int = GHOST_TRAJECTORY_STEPS, lead: float = GHOST_PHASE_LEAD):
+        """
+        Args:
+            steps: Table resolution over one rep
+            lead: How far (fraction of a rep) the ghost runs ahead of the patient
+        """
+        self.steps = steps
+        self.lead = lead
+        right, left = exercise_config.right_landmarks, exercise_config.left_landmarks
+        # Rows are (RIGHT, LEFT); A-B-C with B the joint, C the point that gets moved
+        self.abc = np.array([[right[0], left[0]], [right[1], left[1]], [right[2], left[2]]])
+
+        # Inverse of the easing: angle progress (0..1) -> time within a half rep
+        grid = np.linspace(0.0, 1.0, steps + 1)
+        self._time_of_progress = np.interp(grid, _min_jerk(grid), grid).tolist()
+        self.thresholds = None
+        self.angles = self.cos = self.sin = None
+
+    def calibrate(self, extended: float, contracted: float):
+        """(Re)builds the trajectory table; a no-op while the thresholds are unchanged."""
+        if self.thresholds == (extended, contracted):
+            return
+        self.thresholds = (extended, contracted)
+        phase = np.linspace(0.0, 1.0, self.steps + 1)
+        half = np.where(phase <= 0.5, 2 * phase, 2 * (1 - phase))
+        self.angles = extended + (contracted - extended) * _min_jerk(half)
+        # Rotating B->A by the joint angle gives B->C (the angle at B is the rotation).
+        # Every preset tracks the interior angle A-B-C, so this holds for all joints:
+        # elbow/knee need no pi - angle flip, which would draw the supplement
+        rotation = np.radians(self.angles)
+        self.cos, self.sin = np.cos(rotation).tolist(), np.sin(rotation).tolist()
+
+    def phase(self, stage: str, angle: float) -> float:
+        """Rep progress of a patient at `angle` in `stage` (0 when not mid-rep)."""
+        extended, contracted = self.thresholds
+        span = contracted - extended
+        progress = min(max((angle - extended) / span, 0.0), 1.0) if span else 0.0
+        if stage in _UP_STAGES:
+            return 0.5 * self._time_of_progress[int(progress * self.steps + 0.5)]
+        if stage in _DOWN_STAGES:
+            return 0.5 + 0.5 * self._time_of_progress[int((1 - progress) * self.steps + 0.5)]
+        return 0.0
+
+    def target_phase(self, stage: str, angle: float) -> float:
+        """Where the ghost should be: `lead` ahead, held at the end of the current half rep."""
+        if stage in _UP_STAGES:
+            return min(self.phase(stage, angle) + self.lead, 0.5)
+        if stage in _DOWN_STAGES:
+            return min(self.phase(stage, angle) + self.lead, 1.0)
+        return 0.0
+
+    def render(self, points: np.ndarray, visible: np.ndarray, phases: tuple,
+               out_points: np.ndarray, out_visible: np.ndarray):
+        """
+        Writes the ghost into out_points/out_visible (33, 2)/(33,).
+
+        Args:
+            points / visible: Current (or predicted) landmarks and their visibility mask
+            phases: (RIGHT, LEFT) target rep progress
+        """
+        np.copyto(out_points, points)
+        np.copyto(out_visible, visible)
+
+        # One gather for both limbs; the rest is scalar arithmetic on two rows,
+        # cheaper than numpy's per-call overhead on arrays this small
+        (ax, ay), (bx, by), (cx, cy) = points[self.abc].transpose(0, 2, 1).tolist()
+        shown = (visible[self.abc[0]] & visible[self.abc[1]] & visible[self.abc[2]]).tolist()
+        # Rotation direction depends on which way the patient faces (mirrored for LEFT)
+        facing = 1.0 if ax[0] > ax[1] else -1.0
+        for side, sign in ((0, facing), (1, -facing)):
+            dx, dy = ax[side] - bx[side], ay[side] - by[side]
+            norm = math.hypot(dx, dy)
+            if not shown[side] or norm == 0.0:
+                continue
+            i = int(phases[side] * self.steps + 0.5)
+            cos, sin = self.cos[i], sign * self.sin[i]
+            scale = math.hypot(cx[side] - bx[side], cy[side] - by[side]) / norm
+            out_points[self.abc[2, side]] = (bx[side] + scale * (cos * dx - sin * dy),
+                                             by[side] + scale * (sin * dx + cos * dy))
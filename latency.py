@@ -0,0 +1,124 @@
+"""
+End-to-end update latency
+Frames are stamped on the server's monotonic clock at capture, when processing
+is done and at emit. Clients estimate the offset between their clock and this
+one with an NTP-style handshake (clock_sync), map the stamps onto their own
+clock and send latency aggregates back (latency_report) to the sink below.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# Segments reported by clients (milliseconds):
+#   processing  capture -> processed (server only)
+#   emit_wait   processed -> emit (server only)
+#   network     emit -> received by the client
+#   end_to_end  capture -> next paint after the update
+SEGMENTS = ("processing", "emit_wait", "network", "end_to_end")
+SUMMARY_FIELDS = ("count", "mean", "p50", "p95", "max")
+
+
+def monotonic_ms() -> float:
+    return time.monotonic_ns() / 1e6
+
+
+def finite_number(value) -> Optional[float]:
+    """`value` as a float, or None if it is missing, not numeric, NaN or infinite."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def display_lookahead_ms(report: dict) -> Optional[float]:
+    """
+    How long after processing a client typically shows an update: its median
+    end-to-end latency minus the server-side processing (which the session
+    measures itself, per frame). None if the report has no usable figures.
+    """
+    segments = report.get('segments') if isinstance(report, dict) else None
+    if not isinstance(segments, dict):
+        return None
+    p50 = {name: finite_number(s.get('p50')) for name, s in segments.items() if isinstance(s, dict)}
+    if p50.get('end_to_end') is not None:
+        return max(0.0, p50['end_to_end'] - (p50.get('processing') or 0.0))
+    if p50.get('network') is not None:
+        return p50['network'] + (p50.get('emit_wait') or 0.0)
+    return None
+
+
+class LatencySink:
+    """Latest latency report per client (bounded) plus running totals per segment."""
+
+    def __init__(self, keep: int = 16):
+        self.keep = keep
+        self._reports: "OrderedDict[str, dict]" = OrderedDict()
+        self._totals = {s: {'count': 0, 'sum_ms': 0.0} for s in SEGMENTS}
+        self._lock = threading.Lock()
+
+    def add(self, client_id: str, report: dict) -> bool:
+        """Validates and stores one client report; returns False if it was unusable."""
+        if not isinstance(report, dict) or not isinstance(report.get('segments'), dict):
+            return False
+        segments = {}
+        for name in SEGMENTS:
+            raw = report['segments'].get(name)
+            if not isinstance(raw, dict):
+                continue
+            summary = {f: finite_number(raw.get(f)) for f in SUMMARY_FIELDS}
+            if summary['count'] and summary['mean'] is not None:
+                summary['count'] = int(summary['count'])
+                segments[name] = summary
+        if not segments:
+            return False
+
+        entry = {
+            'received_at': time.time(),
+            'clock_rtt_ms': finite_number(report.get('clock_rtt_ms')),
+            'segments': segments,
+        }
+        with self._lock:
+            self._reports.pop(client_id, None)
+            self._reports[client_id] = entry
+            while len(self._reports) > self.keep:
+                self._reports.popitem(last=False)
+            for name, summary in segments.items():
+                self._totals[name]['count'] += summary['count']
+                self._totals[name]['sum_ms'] += summary['mean'] * summary['count']
+        return True
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                'clients': {cid: dict(entry) for cid, entry in self._reports.items()},
+                'totals': {name: dict(t) for name, t in self._totals.items()},
+            }
+
+    def render_prometheus(self) -> str:
+        snap = self.snapshot()
+        lines = [
+            "# HELP physiocheck_client_latency_seconds Client-measured update latency (latest report per client)",
+            "# TYPE physiocheck_client_latency_seconds gauge",
+        ]
+        for cid, entry in snap['clients'].items():
+            for name, summary in entry['segments'].items():
+                for q, field in (("0.5", "p50"), ("0.95", "p95"), ("1", "max")):
+                    if summary[field] is not None:
+                        lines.append(f'physiocheck_client_latency_seconds{{client="{cid[:8]}",segment="{name}",'
+                                     f'quantile="{q}"}} {summary[field] / 1000:.6f}')
+        lines += [
+            "# HELP physiocheck_client_latency_samples_total Latency samples reported by clients",
+            "# TYPE physiocheck_client_latency_samples_total counter",
+        ]
+        lines += [f'physiocheck_client_latency_samples_total{{segment="{name}"}} {t["count"]}'
+                  for name, t in snap['totals'].items()]
+        lines += [
+            "# HELP physiocheck_client_latency_seconds_total Sum of client-reported latencies",
+            "# TYPE physiocheck_client_latency_seconds_total counter",
+        ]
+        lines += [f'physiocheck_client_latency_seconds_total{{segment="{name}"}} {t["sum_ms"] / 1000:.6f}'
+                  for name, t in snap['totals'].items()]
+        return "\n".join(lines) + "\n"
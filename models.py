@@ -2,9 +2,16 @@
 Data classes for state management - FIXED
 """
 from dataclasses import dataclass, field
-from typing import Dict, List
+from functools import cached_property
+from typing import Dict, List, Optional
+import hashlib
+import json
 import time
 
+import numpy as np
+
+from telemetry import TelemetrySeries
+
 # --- NEW MODELS FOR GHOST POSE ---
 @dataclass
 class Landmark2D:
@@ -18,12 +25,19 @@ class GhostPose:
     Represents the target pose skeleton and instructions for the ghost model overlay.
     Coordinates are normalized (0.0 to 1.0).
     """
-    # Key is MediaPipe index (converted to string on output), value is normalized [x, y]
-    landmarks: Dict[int, Landmark2D] = field(default_factory=dict)
+    # Row is the MediaPipe index, value is normalized [x, y]; only `visible` rows are drawn.
+    # Written in place every frame by GhostEngine.render
+    points: np.ndarray = field(default_factory=lambda: np.zeros((33, 2)))
+    visible: np.ndarray = field(default_factory=lambda: np.zeros(33, dtype=bool))
     color: str = "GRAY" # Will be "GREEN", "RED", "YELLOW", or "GRAY"
     instruction: str = "Calibrating..."
     connections: List[tuple] = field(default_factory=list)
 
+    def landmarks_dict(self) -> Dict[str, List[float]]:
+        """{"<index>": [x, y]} for the visible landmarks (the API format)."""
+        indices = np.flatnonzero(self.visible)
+        return dict(zip(map(str, indices.tolist()), self.points[indices].tolist()))
+
 
 @dataclass
 class ArmMetrics:
@@ -58,6 +72,7 @@ class CalibrationData:
     active: bool = False
     phase: 'CalibrationPhase' = None
     phase_start_time: float = 0.0
+    # Per-side (p10, p50, p90) of each calibration hold, from streaming sketches
     extended_angles: Dict[str, List[float]] = field(default_factory=lambda: {'RIGHT': [], 'LEFT': []})
     contracted_angles: Dict[str, List[float]] = field(default_factory=lambda: {'RIGHT': [], 'LEFT': []})
     message: str = ""
@@ -88,4 +103,41 @@ class SessionHistory:
         self.right_angle.clear()
         self.left_angle.clear()
         self.right_feedback_count = 0
-        self.left_feedback_count = 0
\ No newline at end of file
+        self.left_feedback_count = 0
+
+@dataclass(frozen=True)
+class ReportSnapshot:
+    """
+    Immutable, pre-serialized session report.
+    Published by the frame thread and swapped in with a single attribute
+    assignment, so HTTP readers never see a half-updated report.
+    """
+    report: dict
+    body: bytes
+    etag: str
+
+    @classmethod
+    def build(cls, report: dict) -> 'ReportSnapshot':
+        body = json.dumps(report).encode("utf-8")
+        etag = hashlib.blake2b(body, digest_size=8).hexdigest()
+        return cls(report=report, body=body, etag=etag)
+
+
+@dataclass(frozen=True)
+class StateSnapshot:
+    """
+    Per-frame session state published by the frame thread.
+    Other threads only ever read the latest published object; `state` is
+    built fresh for every frame and must not be mutated by readers.
+    `series` is a read-only view of the angle series up to this frame.
+    """
+    frame_id: int
+    timestamp: float
+    state: dict
+    report: Optional[ReportSnapshot] = None
+    series: Optional[TelemetrySeries] = None
+
+    @cached_property
+    def body(self) -> bytes:
+        """JSON of `state`, serialized once and shared by every consumer."""
+        return json.dumps(self.state).encode("utf-8")
@@ -0,0 +1,94 @@
+"""
+Motion-gated pose inference
+Each frame is shrunk to a small greyscale image and compared with the one that
+was last sent through the pose model, inside the bounding box of the last
+landmarks. While the patient is still (resting, holding a calibration pose,
+waiting out the countdown) the previous results are reused instead of running
+inference; a full inference is forced every `max_skip + 1` frames.
+"""
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from constants import (MOTION_GATE_THRESHOLD, MOTION_GATE_MAX_SKIP,
+                       MOTION_GATE_WIDTH, MOTION_GATE_PADDING)
+
+
+class MotionGate:
+    def __init__(self,
+                 threshold: float = MOTION_GATE_THRESHOLD,
+                 max_skip: int = MOTION_GATE_MAX_SKIP,
+                 width: int = MOTION_GATE_WIDTH,
+                 padding: float = MOTION_GATE_PADDING):
+        self.threshold = threshold
+        self.max_skip = max_skip
+        self.width = width
+        self.padding = padding
+
+        self.frames = 0
+        self.skipped = 0
+        self.last_score: Optional[float] = None
+        self.reset()
+
+    def reset(self):
+        """Forgets the reference frame (next frame always runs inference)."""
+        self._reference: Optional[np.ndarray] = None
+        self._box = None
+        self._run = 0
+
+    @property
+    def skip_ratio(self) -> float:
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def _small_grey(self, image: np.ndarray) -> np.ndarray:
+        h, w = image.shape[:2]
+        width = self.width
+        height = max(1, round(h * width / w))
+        # Bilinear to twice the size, then a 2x2 box average: close to INTER_AREA
+        # straight down, which is several times slower at non-integer scales
+        small = cv2.resize(image, (2 * width, 2 * height), interpolation=cv2.INTER_LINEAR)
+        small = cv2.resize(small, (width, height), interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def should_infer(self, image: np.ndarray) -> bool:
+        """Call once per frame (BGR, before inference); False means reuse the last results."""
+        self.frames += 1
+        grey = self._small_grey(image)
+
+        if self._reference is not None and self._box is not None and self._run < self.max_skip:
+            x0, y0, x1, y1 = self._box
+            diff = cv2.absdiff(grey[y0:y1, x0:x1], self._reference[y0:y1, x0:x1])
+            self.last_score = float(diff.mean()) if diff.size else None
+            if self.last_score is not None and self.last_score < self.threshold:
+                self._run += 1
+                self.skipped += 1
+                return False
+
+        self._reference = grey
+        self._run = 0
+        return True
+
+    def update_landmarks(self, results):
+        """Call after an inference: the next comparisons look at the new pose box."""
+        pose = getattr(results, 'pose_landmarks', None)
+        if not pose:
+            # Nobody in view: keep inferring until someone is found
+            self._box = None
+            return
+        h, w = self._reference.shape[:2]
+        xs = [lm.x for lm in pose.landmark if lm.visibility > 0.5] or [lm.x for lm in pose.landmark]
+        ys = [lm.y for lm in pose.landmark if lm.visibility > 0.5] or [lm.y for lm in pose.landmark]
+        x0 = int(np.clip(min(xs) - self.padding, 0, 1) * w)
+        x1 = int(np.ceil(np.clip(max(xs) + self.padding, 0, 1) * w))
+        y0 = int(np.clip(min(ys) - self.padding, 0, 1) * h)
+        y1 = int(np.ceil(np.clip(max(ys) + self.padding, 0, 1) * h))
+        self._box = (x0, y0, x1, y1) if x1 > x0 and y1 > y0 else None
+
+    def status(self) -> dict:
+        return {
+            'frames': self.frames,
+            'skipped': self.skipped,
+            'skip_ratio': round(self.skip_ratio, 3),
+            'last_score': None if self.last_score is None else round(self.last_score, 2),
+        }
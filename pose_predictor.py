@@ -0,0 +1,77 @@
+"""
+Short-horizon landmark prediction for the ghost
+An alpha-beta (constant velocity) or alpha-beta-gamma (constant acceleration)
+filter runs over the (33, 2) landmark array every frame; the ghost is built
+from the filtered landmarks extrapolated to when the browser will show it
+(time already spent on the server plus the client's measured latency).
+"""
+import numpy as np
+
+from constants import (GHOST_PREDICTION_MODEL, GHOST_PREDICTION_ALPHA, GHOST_PREDICTION_BETA,
+                       GHOST_PREDICTION_GAMMA, GHOST_LOOKAHEAD_MAX)
+
+# Gaps longer than this (s) restart the filter instead of extrapolating across them
+MAX_GAP = 0.5
+
+
+class LandmarkPredictor:
+    def __init__(self,
+                 model: str = GHOST_PREDICTION_MODEL,
+                 alpha: float = GHOST_PREDICTION_ALPHA,
+                 beta: float = GHOST_PREDICTION_BETA,
+                 gamma: float = GHOST_PREDICTION_GAMMA,
+                 max_horizon: float = GHOST_LOOKAHEAD_MAX):
+        """
+        Args:
+            model: "velocity", "acceleration" or "off" (latest landmarks, no extrapolation)
+            alpha / beta / gamma: Position, velocity and acceleration gains
+            max_horizon: Seconds; longer look-aheads are clamped (overshoot at turning points)
+        """
+        self.model = model
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+        self.max_horizon = max_horizon
+        self.reset()
+
+    def reset(self):
+        self.x = None     # filtered positions (33, 2)
+        self.v = None     # velocities (units/s)
+        self.a = None     # accelerations (units/s^2)
+        self.t = None
+        self.visible = None   # (33,) bool, visibility > 0 in the latest frame
+        self._out = None
+
+    def update(self, landmarks, t: float):
+        """Feeds one frame's landmarks observed at session time t."""
+        frame = np.array([(lm.x, lm.y, lm.visibility) for lm in landmarks], dtype=np.float64)
+        z = frame[:, :2]
+        self.visible = frame[:, 2] > 0.0
+        dt = None if self.t is None else t - self.t
+        if (self.model == "off" or self.x is None or z.shape != self.x.shape
+                or not dt or dt < 0 or dt > MAX_GAP):
+            self.x, self.v, self.a, self.t = z, np.zeros_like(z), np.zeros_like(z), t
+            self._out = np.empty_like(z)
+            return
+
+        x_pred = self.x + self.v * dt + 0.5 * self.a * dt * dt
+        v_pred = self.v + self.a * dt
+        residual = z - x_pred
+        self.x = x_pred + self.alpha * residual
+        self.v = v_pred + (self.beta / dt) * residual
+        if self.model == "acceleration":
+            self.a = self.a + (2 * self.gamma / (dt * dt)) * residual
+        self.t = t
+
+    def predict(self, horizon: float) -> np.ndarray:
+        """
+        Filtered (33, 2) positions extrapolated `horizon` seconds past the last
+        update; the returned buffer is reused by the next call.
+        """
+        h = min(max(horizon, 0.0), self.max_horizon)
+        out = self._out
+        np.multiply(self.v, h, out=out)
+        out += self.x
+        if self.model == "acceleration":
+            out += (0.5 * h * h) * self.a
+        return out
@@ -1,7 +1,6 @@
 """
 MediaPipe pose detection and landmark extraction - AGNOSTIC
 """
-import mediapipe as mp
 from typing import Dict, Optional
 # [Change] Import the new ExerciseConfig for type hinting and configuration
 from constants import ExerciseConfig 
@@ -0,0 +1,298 @@
+"""
+Pose recording and replay
+A recorder stores every frame's pose landmarks (x, y, z, visibility) and
+timestamp in a compressed .npz file; the replay driver feeds a recording
+through WorkoutSession on the recorded clock, without a camera or MediaPipe,
+as fast as possible or at the original pace.
+
+    python pose_replay.py recording.npz [--speed 1] [--calibration auto|hold] [--json]
+"""
+import argparse
+import json
+import time
+from collections import namedtuple
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+import numpy as np
+
+FORMAT_VERSION = 1
+NUM_LANDMARKS = 33
+# 30 minutes at 30 fps (~28 MB of landmarks before compression)
+DEFAULT_MAX_FRAMES = 54000
+
+# Just enough of MediaPipe's result objects for the session code
+ReplayLandmark = namedtuple("ReplayLandmark", "x y z visibility")
+ReplayLandmarkList = namedtuple("ReplayLandmarkList", "landmark")
+ReplayResults = namedtuple("ReplayResults", "pose_landmarks")
+
+
+class PoseRecorder:
+    """Collects pose results frame by frame (frame thread only)."""
+
+    def __init__(self, exercise: str, max_frames: int = DEFAULT_MAX_FRAMES):
+        self.exercise = exercise
+        self.max_frames = max_frames
+        self.times: List[float] = []
+        self.frames: List[Optional[np.ndarray]] = []
+        self.truncated = False
+
+    def __len__(self):
+        return len(self.times)
+
+    def add(self, results, timestamp: float):
+        if len(self.times) >= self.max_frames:
+            self.truncated = True
+            return
+        pose = getattr(results, "pose_landmarks", None)
+        self.times.append(timestamp)
+        self.frames.append(None if not pose else np.array(
+            [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose.landmark], dtype=np.float32))
+
+    def save(self, path: str) -> str:
+        n = len(self.times)
+        landmarks = np.zeros((n, NUM_LANDMARKS, 4), dtype=np.float32)
+        present = np.zeros(n, dtype=bool)
+        for i, frame in enumerate(self.frames):
+            if frame is not None:
+                landmarks[i, :len(frame)] = frame[:NUM_LANDMARKS]
+                present[i] = True
+        meta = {
+            "version": FORMAT_VERSION,
+            "exercise": self.exercise,
+            "created_at": time.time(),
+            "truncated": self.truncated,
+        }
+        np.savez_compressed(path, t=np.asarray(self.times, dtype=np.float64), present=present,
+                            landmarks=landmarks, meta=np.array(json.dumps(meta)))
+        return path
+
+
+@dataclass
+class PoseRecording:
+    t: np.ndarray                 # (n,) float64 seconds
+    present: np.ndarray           # (n,) bool, False where no pose was detected
+    landmarks: np.ndarray         # (n, 33, 4) float32 x, y, z, visibility
+    meta: dict = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str) -> "PoseRecording":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported recording version: {meta.get('version')}")
+            return cls(t=data["t"], present=data["present"], landmarks=data["landmarks"], meta=meta)
+
+    @classmethod
+    def synthetic(cls,
+                  exercise: str = "Bicep Curl",
+                  seconds: float = 40.0,
+                  fps: float = 30.0,
+                  period: float = 3.0,
+                  low: float = 40.0,
+                  high: float = 160.0,
+                  noise: float = 1.0,
+                  dropout: float = 0.01,
+                  seed: int = 0) -> "PoseRecording":
+        """
+        A person repeating the exercise: the tracked joint swings between `low` and
+        `high` degrees with a short pause at each end, `noise` degrees of landmark
+        jitter and a `dropout` fraction of frames without a detected pose.
+        """
+        from constants import EXERCISE_PRESETS
+
+        config = EXERCISE_PRESETS.get(exercise, EXERCISE_PRESETS["Bicep Curl"])
+        rng = np.random.default_rng(seed)
+        n = int(seconds * fps)
+        t = 1_700_000_000.0 + np.arange(n) / fps
+
+        phase = 2 * np.pi * (t - t[0]) / period
+        mid, amp = (high + low) / 2, (high - low) / 2
+        angle = mid + amp * np.clip(1.4 * np.cos(phase), -1, 1)
+
+        landmarks = np.empty((n, NUM_LANDMARKS, 4), dtype=np.float32)
+        landmarks[:, :, 0] = 0.5
+        landmarks[:, :, 1] = 0.5
+        landmarks[:, :, 2] = 0.0
+        landmarks[:, :, 3] = 0.9
+        for indices, x in ((config.right_landmarks, 0.4), (config.left_landmarks, 0.6)):
+            a, b, c = indices
+            side_angle = np.radians(angle + rng.normal(0, noise, n))
+            landmarks[:, a, 0], landmarks[:, a, 1] = x, 0.3
+            landmarks[:, b, 0], landmarks[:, b, 1] = x, 0.5
+            landmarks[:, c, 0] = x + 0.2 * np.sin(side_angle)
+            landmarks[:, c, 1] = 0.5 - 0.2 * np.cos(side_angle)
+            landmarks[:, (a, b, c), 3] = 0.99
+        landmarks[:, :, :2] += rng.normal(0, 0.001, (n, NUM_LANDMARKS, 2)).astype(np.float32)
+
+        present = rng.random(n) >= dropout
+        landmarks[~present] = 0
+        meta = {"version": FORMAT_VERSION, "exercise": config.name, "synthetic": True, "seed": seed}
+        return cls(t=t, present=present, landmarks=landmarks, meta=meta)
+
+    @property
+    def exercise(self) -> str:
+        return self.meta.get("exercise", "Bicep Curl")
+
+    @property
+    def duration(self) -> float:
+        return float(self.t[-1] - self.t[0]) if len(self.t) else 0.0
+
+    def __len__(self):
+        return len(self.t)
+
+    def results(self) -> List[ReplayResults]:
+        """Per-frame result objects (built up front so replay timing excludes them)."""
+        out = []
+        for present, frame in zip(self.present.tolist(), self.landmarks.tolist()):
+            out.append(ReplayResults(
+                ReplayLandmarkList([ReplayLandmark(*lm) for lm in frame]) if present else None))
+        return out
+
+
+class FramePacer:
+    """Blocks like a live camera read: one frame per `interval`, no burst after a stall."""
+
+    def __init__(self, fps: float):
+        self.interval = 1.0 / fps if fps > 0 else 1.0 / 30
+        self._next = None
+
+    def wait(self):
+        now = time.perf_counter()
+        if self._next is None:
+            self._next = now
+        delay = self._next - now
+        if delay > 0:
+            time.sleep(delay)
+        self._next = max(self._next + self.interval, time.perf_counter() - self.interval)
+
+
+class ReplayCapture:
+    """cv2.VideoCapture stand-in: blank frames at the recording's frame rate."""
+
+    def __init__(self, recording: PoseRecording, width: int = 640, height: int = 480):
+        fps = 1.0 / float(np.median(np.diff(recording.t))) if len(recording) > 1 else 30.0
+        self.pacer = FramePacer(fps)
+        self.frame = np.full((height, width, 3), 48, dtype=np.uint8)
+        self._open = True
+        self._times = recording.t.tolist()
+        # A loop restarts one frame interval after the last recorded frame
+        self._loop_span = (self._times[-1] - self._times[0] + self.pacer.interval) if self._times else 0.0
+        self._index = -1
+
+    def isOpened(self) -> bool:
+        return self._open
+
+    def read(self):
+        self.pacer.wait()
+        self._index += 1
+        return True, self.frame
+
+    def clock_ns(self) -> int:
+        """Recorded time of the last frame read (keeps increasing across loops)."""
+        if not self._times:
+            return 0
+        loops, i = divmod(max(self._index, 0), len(self._times))
+        return int((loops * self._loop_span + self._times[i] - self._times[0]) * 1e9)
+
+    def set(self, prop, value) -> bool:
+        return True
+
+    def release(self):
+        self._open = False
+
+
+class ReplayModel:
+    """Holistic stand-in: returns the recording's results in order, looping."""
+
+    def __init__(self, recording: PoseRecording):
+        self.frames = recording.results()
+        self._index = 0
+
+    def process(self, image):
+        results = self.frames[self._index % len(self.frames)]
+        self._index += 1
+        return results
+
+    def reset(self):
+        self._index = 0
+
+    def close(self):
+        pass
+
+
+def load_source(source: str) -> PoseRecording:
+    """A recording path, or "synthetic" / "synthetic:<exercise>" for a generated stream."""
+    if source.startswith("synthetic"):
+        _, _, exercise = source.partition(":")
+        return PoseRecording.synthetic(exercise or "Bicep Curl", seconds=60.0)
+    return PoseRecording.load(source)
+
+
+def replay(recording: PoseRecording,
+           exercise: Optional[str] = None,
+           speed: Optional[float] = None,
+           calibration_mode: Optional[str] = None,
+           calibration_profile: Optional[dict] = None,
+           on_frame: Optional[Callable] = None):
+    """
+    Runs a recording through a fresh WorkoutSession and returns the stopped session.
+
+    Args:
+        speed: None replays as fast as possible; 1.0 keeps the original pace
+        on_frame: Called as on_frame(session, index) after every frame
+    """
+    from workout_session import WorkoutSession
+
+    frames = recording.results()
+    if not frames:
+        raise ValueError("Empty recording")
+    times = recording.t.tolist()
+
+    session = WorkoutSession(exercise or recording.exercise)
+    now = [times[0]]
+    session.clock = lambda: now[0]
+    session.start(calibration_profile, calibration_mode, capture=False)
+
+    wall_start = time.perf_counter()
+    for i, (t, results) in enumerate(zip(times, frames)):
+        if speed:
+            delay = (t - times[0]) / speed - (time.perf_counter() - wall_start)
+            if delay > 0:
+                time.sleep(delay)
+        now[0] = t
+        if not session.process_results(results):
+            break
+        if on_frame:
+            on_frame(session, i)
+    session.stop()
+    return session
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a pose recording through WorkoutSession")
+    parser.add_argument("recording")
+    parser.add_argument("--exercise", help="Override the recorded exercise")
+    parser.add_argument("--speed", type=float, help="Playback speed (default: as fast as possible)")
+    parser.add_argument("--calibration", choices=["auto", "hold"], help="Calibration mode")
+    parser.add_argument("--json", action="store_true", help="Print the final report as JSON")
+    args = parser.parse_args(argv)
+
+    recording = PoseRecording.load(args.recording)
+    started = time.perf_counter()
+    session = replay(recording, args.exercise, args.speed, args.calibration)
+    elapsed = time.perf_counter() - started
+    report = session.get_final_report()
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+        return
+    summary = report["summary"]
+    print(f"🎞️ {len(recording)} frames ({recording.duration:.1f}s of {recording.exercise}) "
+          f"replayed in {elapsed:.2f}s ({len(recording) / max(elapsed, 1e-9):.0f} fps)")
+    for arm in ("RIGHT", "LEFT"):
+        print(f"   {arm}: {summary[arm]['total_reps']} reps, {summary[arm]['error_count']} errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Query-result cache for the analytics routes
+TTL + LRU cache keyed by (user, route) with write-through invalidation,
+single-flight computation and hit/miss metrics.
+Callers never share a mutable result: values are copied when stored and again
+for every caller (or made read-only by a cheaper `copy` for large arrays).
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+# User key for results that span every patient (therapist views)
+ALL_USERS = "*"
+
+_SCALARS = (str, int, float, bool, type(None))
+
+
+def copy_result(value):
+    """Deep copy of a JSON-like route result (several times faster than deepcopy)."""
+    if isinstance(value, _SCALARS):
+        return value
+    if type(value) is dict:
+        return {k: copy_result(v) for k, v in value.items()}
+    if type(value) is list:
+        return [copy_result(v) for v in value]
+    return copy.deepcopy(value)
+
+
+class _Flight:
+    """A computation in progress that concurrent callers wait on."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class QueryCache:
+    def __init__(self, max_entries: int = 1024, ttl: float = 60.0, copy=copy_result):
+        """
+        Args:
+            copy: Applied to a value when it is stored and to every value handed out
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.copy = copy
+
+        self._entries = OrderedDict()   # (user, route, params) -> (expires_at, value)
+        self._flights = {}              # (key, version) -> _Flight
+        self._inflight = {}             # user -> flights in progress
+        self._generation = {}           # user -> invalidation counter (only while in flight)
+        self._epoch = 0                 # bumped by clear()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'collapsed': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0,
+        }
+
+    def get_or_compute(self, user: str, route: str, compute, params=()):
+        """
+        Returns the cached value for (user, route, params), computing it with
+        `compute()` on a miss. Concurrent misses for the same key share one call.
+        """
+        key = (user, route, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self.stats['expirations'] += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+            else:
+                self.stats['misses'] += 1
+                # Flights started before an invalidation are not joined by later callers
+                version = self._version(user)
+                flight_key = (key, version)
+                flight = self._flights.get(flight_key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[flight_key] = _Flight()
+                    self._inflight[user] = self._inflight.get(user, 0) + 1
+                else:
+                    self.stats['collapsed'] += 1
+
+        if entry is not None:
+            return self.copy(entry[1])
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return self.copy(flight.value)
+
+        try:
+            value = compute()
+            # Private copy for the cache and the callers that joined the flight
+            flight.value = self.copy(value)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(flight_key, None)
+                # Don't store a result that was computed while its user was invalidated
+                if flight.error is None and self._version(user) == version:
+                    self._store(key, flight.value)
+                # Generations only matter while a flight can compare against them
+                remaining = self._inflight[user] - 1
+                if remaining:
+                    self._inflight[user] = remaining
+                else:
+                    del self._inflight[user]
+                    self._generation.pop(user, None)
+            flight.done.set()
+        return value
+
+    def _version(self, user):
+        return self._epoch, self._generation.get(user, 0)
+
+    def _store(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+
+    def invalidate(self, user: str):
+        """Drops every cached route for `user` (call after writing that user's data)."""
+        with self._lock:
+            if user in self._inflight:
+                self._generation[user] = self._generation.get(user, 0) + 1
+            for key in [k for k in self._entries if k[0] == user]:
+                del self._entries[key]
+            self.stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'entries': len(self._entries),
+                'hit_ratio': round(self.stats['hits'] / lookups, 3) if lookups else 0.0,
+            }
@@ -42,6 +42,9 @@ class RepCounter:
         # NEW: Store the Rep Validation Relief (the +/- 2 degree error space)
         self.rep_validation_relief = REP_VALIDATION_RELIEF
 
+        # Off while auto-calibration is still learning the thresholds
+        self.feedback_enabled = True
+
     def process_rep(self, arm, angle, metrics, current_time, history):
         """
         ENHANCED: Proper state machine with hysteresis and confirmation delays
@@ -104,7 +107,7 @@ class RepCounter:
             metrics.curr_rep_time = current_time - self.rep_start_time[arm]
 
         # Form feedback (only when not in rapid motion)
-        if velocity < 20:
+        if velocity < 20 and self.feedback_enabled:
             self._provide_form_feedback(
                 angle, metrics, contracted, extended, arm, history
             )
@@ -0,0 +1,234 @@
+"""
+Write-behind persistence for finished sessions
+Sessions are appended to a local journal (fsync'd) and acknowledged at once;
+a background worker flushes them to storage in batches with insert_many,
+retrying with exponential backoff. Pending entries are replayed on restart.
+
+Each flush appends a marker with the stored session ids, and the journal is
+truncated whenever the queue drains (compacted if it never does), so a flush
+never rewrites the whole file. A document that keeps failing with a
+non-transient error is isolated and moved to a dead-letter file instead of
+blocking every later session.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Callable, List, Optional
+
+
+class StorageUnavailable(Exception):
+    """Raised by write_batch while storage cannot be reached; retried indefinitely."""
+
+
+def is_transient_error(error: Exception) -> bool:
+    return isinstance(error, (StorageUnavailable, ConnectionError, TimeoutError))
+
+
+class SessionWriteQueue:
+    def __init__(self,
+                 journal_path: str,
+                 write_batch: Callable[[List[dict]], None],
+                 on_flushed: Optional[Callable[[List[dict]], None]] = None,
+                 batch_size: int = 100,
+                 flush_interval: float = 0.5,
+                 max_backoff: float = 30.0,
+                 max_attempts: int = 5,
+                 is_transient: Callable[[Exception], bool] = is_transient_error):
+        """
+        Args:
+            journal_path: Local append-only journal (JSON lines)
+            write_batch: Stores a batch, skipping sessions that are already stored;
+                raises while storage is unavailable
+            on_flushed: Called from the worker with every document of a stored batch,
+                including ones an earlier, failed-looking attempt already wrote
+            max_attempts: Non-transient failures before a batch is split into single
+                documents, and before a single document is dead-lettered
+            is_transient: Errors it accepts (outages) are retried without limit
+        """
+        self.journal_path = journal_path
+        self.dead_letter_path = journal_path + ".dead"
+        self.write_batch = write_batch
+        self.on_flushed = on_flushed
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.is_transient = is_transient
+
+        self._pending: List[dict] = []
+        self._cond = threading.Condition()
+        self._journal = None
+        self._journal_lines = 0
+        self._thread = None
+        self._running = False
+        self._backoff = 0.0
+        self._attempts = 0          # non-transient failures of the current head batch
+        self._isolating = 0         # documents still to be flushed one at a time
+
+        self.stats = {'submitted': 0, 'flushed': 0, 'batches': 0, 'retries': 0, 'replayed': 0,
+                      'dead_lettered': 0}
+
+    # --- LIFECYCLE ---
+    def start(self):
+        """Replays the journal and starts the background worker."""
+        with self._cond:
+            if self._running:
+                return
+            self._pending = self._read_journal()
+            self.stats['replayed'] = len(self._pending)
+            if self._pending:
+                print(f"↩️ Replaying {len(self._pending)} journaled session(s)")
+            self._rewrite_journal()
+            self._running = True
+
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stops the worker after one last flush attempt; anything left stays journaled."""
+        with self._cond:
+            if not self._running:
+                return
+            self._running = False
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+        with self._cond:
+            if self._journal:
+                self._journal.close()
+                self._journal = None
+
+    # --- PRODUCER ---
+    def submit(self, session_doc: dict) -> str:
+        """Durably enqueues a session and returns its session_id (no database round-trip)."""
+        session_doc.setdefault("session_id", uuid.uuid4().hex)
+        line = json.dumps(session_doc) + "\n"
+        with self._cond:
+            if self._journal is None:
+                raise RuntimeError("SessionWriteQueue is not running (call start() first)")
+            self._append(line)
+            self._pending.append(session_doc)
+            self.stats['submitted'] += 1
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+        return session_doc["session_id"]
+
+    def pending_count(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    # --- WORKER ---
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._running and (self._backoff or len(self._pending) < self.batch_size):
+                    self._cond.wait(max(self.flush_interval, self._backoff))
+                batch = self._pending[:1 if self._isolating else self.batch_size]
+                running = self._running
+
+            if batch:
+                self._flush(batch)
+                if not running and self._backoff:
+                    # Last flush on shutdown failed: leave the rest journaled
+                    return
+            elif not running:
+                return
+
+    def _flush(self, batch: List[dict]):
+        try:
+            self.write_batch(batch)
+        except Exception as e:
+            self._backoff = min(self.max_backoff, max(self.flush_interval, self._backoff * 2))
+            self.stats['retries'] += 1
+            if not self.is_transient(e):
+                self._attempts += 1
+                if self._attempts >= self.max_attempts:
+                    self._give_up(batch, e)
+                    return
+            print(f"⚠️ Session flush failed ({len(batch)} queued), retrying in {self._backoff:.1f}s: {e}")
+            return
+
+        self._backoff = 0.0
+        self._attempts = 0
+        with self._cond:
+            self._remove_head(batch)
+            self.stats['flushed'] += len(batch)
+            self.stats['batches'] += 1
+
+        if self.on_flushed:
+            try:
+                self.on_flushed(batch)
+            except Exception as e:
+                print(f"⚠️ Post-flush hook error: {e}")
+
+    def _give_up(self, batch: List[dict], error: Exception):
+        """Splits a failing batch into single documents, or dead-letters a single one."""
+        self._attempts = 0
+        if len(batch) > 1:
+            self._isolating = len(batch)
+            self._backoff = 0.0
+            print(f"⚠️ Session batch keeps failing ({error}); retrying its {len(batch)} documents one by one")
+            return
+        with self._cond:
+            with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({'error': str(error), 'failed_at': time.time(), 'doc': batch[0]}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._remove_head(batch)
+            self.stats['dead_lettered'] += 1
+        self._backoff = 0.0
+        print(f"❌ Session {batch[0].get('session_id')} moved to {self.dead_letter_path}: {error}")
+
+    def _remove_head(self, batch: List[dict]):
+        """Drops a handled batch from the queue and records it in the journal (lock held)."""
+        del self._pending[:len(batch)]
+        self._isolating = max(0, self._isolating - len(batch))
+        if not self._pending:
+            # Nothing left to replay: start the journal over
+            self._journal.truncate(0)
+            os.fsync(self._journal.fileno())
+            self._journal_lines = 0
+        elif self._journal_lines > 2 * (len(self._pending) + self.batch_size):
+            self._rewrite_journal()
+        else:
+            self._append(json.dumps({'_flushed': [d.get('session_id') for d in batch]}) + "\n")
+
+    # --- JOURNAL ---
+    def _append(self, line: str):
+        self._journal.write(line)
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._journal_lines += 1
+
+    def _read_journal(self) -> List[dict]:
+        if not os.path.exists(self.journal_path):
+            return []
+        entries, flushed = [], set()
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Torn last line from a crash mid-write
+                    continue
+                if '_flushed' in entry:
+                    flushed.update(entry['_flushed'])
+                else:
+                    entries.append(entry)
+        return [e for e in entries if e.get('session_id') not in flushed]
+
+    def _rewrite_journal(self):
+        """Atomically replaces the journal with the still-pending entries (lock held)."""
+        if self._journal:
+            self._journal.close()
+        tmp_path = self.journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for doc in self._pending:
+                f.write(json.dumps(doc) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._journal_lines = len(self._pending)
@@ -0,0 +1,819 @@
+"""
+Storage backends
+Repository layer for users, OTPs, sessions, notifications, analytics
+rollups, session telemetry and calibration profiles. MongoStorage wraps the
+production pymongo collections; MemoryStorage and SQLiteStorage are local
+stand-ins for offline runs, tests and load tests.
+"""
+import copy
+import json
+import sqlite3
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from bisect import insort
+from typing import Dict, Iterable, List, Optional, Sequence
+
+
+# ----------------------------------------------------
+# INTERFACES
+# ----------------------------------------------------
+class DuplicateUserError(ValueError):
+    """Raised when a user is inserted with an email that is already registered."""
+
+
+class UserRepository(ABC):
+    @abstractmethod
+    def find_by_email(self, email: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert(self, user: dict) -> None:
+        """Registers a user; raises DuplicateUserError if the email is taken."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_many(self, users: List[dict]) -> None:
+        """
+        Registers users in order. Stops with DuplicateUserError at the first
+        email that is already taken (or repeated in the batch); the users ahead
+        of it stay stored and an existing user is never replaced.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def list_by_role(self, role: str, skip: int = 0, limit: Optional[int] = None,
+                     fields: Optional[Sequence[str]] = None) -> List[dict]:
+        """Users with `role` in registration order; `fields` limits the returned keys."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def count_by_role(self, role: str) -> int:
+        raise NotImplementedError
+
+
+class OtpRepository(ABC):
+    @abstractmethod
+    def upsert(self, email: str, otp: str, created_at: float) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def find(self, email: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, email: str) -> None:
+        raise NotImplementedError
+
+
+class SessionRepository(ABC):
+    @abstractmethod
+    def insert(self, session: dict) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_many(self, sessions: List[dict]) -> List[dict]:
+        """
+        Bulk insert. Sessions whose session_id is already stored are skipped, so
+        replaying a batch is safe. Returns the sessions that were actually inserted.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def find_by_email(self, email: str, exercise: Optional[str] = None) -> List[dict]:
+        """All sessions of a user (optionally one exercise), oldest first."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def latest_per_email(self, emails: Sequence[str]) -> Dict[str, dict]:
+        """Most recent session of each user, in one query."""
+        raise NotImplementedError
+
+
+class NotificationRepository(ABC):
+    @abstractmethod
+    def insert(self, notification: dict) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def recent(self, limit: int = 10) -> List[dict]:
+        """Newest notifications first; every document carries an '_id'."""
+        raise NotImplementedError
+
+
+class RollupRepository(ABC):
+    @abstractmethod
+    def get(self, email: str, exercise: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def put(self, rollup: dict) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def insert_if_absent(self, rollup: dict) -> bool:
+        """Stores `rollup` only if none exists for its key; False if one already did."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_user(self, email: str) -> None:
+        raise NotImplementedError
+
+
+class CalibrationRepository(ABC):
+    """Per-user, per-exercise calibration profiles ({email, exercise, thresholds, calibrated_at})."""
+    @abstractmethod
+    def get(self, email: str, exercise: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def put(self, profile: dict) -> None:
+        raise NotImplementedError
+
+
+class TelemetryRepository(ABC):
+    @abstractmethod
+    def put(self, session_id: str, chunks: List[bytes]) -> None:
+        """Stores (or replaces) the binary chunks of one session's telemetry."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def get(self, session_id: str) -> List[bytes]:
+        """Chunks in order; empty if the session has no telemetry."""
+        raise NotImplementedError
+
+
+class Storage:
+    """Bundle of repositories handed to the routes."""
+    name = "base"
+
+    def __init__(self, users, otps, sessions, notifications, rollups, telemetry, calibrations):
+        self.users: UserRepository = users
+        self.otps: OtpRepository = otps
+        self.sessions: SessionRepository = sessions
+        self.notifications: NotificationRepository = notifications
+        self.rollups: RollupRepository = rollups
+        self.telemetry: TelemetryRepository = telemetry
+        self.calibrations: CalibrationRepository = calibrations
+
+    def ensure_indexes(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+def _project(doc: dict, fields: Optional[Sequence[str]]) -> dict:
+    if fields is None:
+        return copy.deepcopy(doc)
+    return {f: copy.deepcopy(doc[f]) for f in fields if f in doc}
+
+
+# ----------------------------------------------------
+# MONGODB
+# ----------------------------------------------------
+class MongoUserRepository(UserRepository):
+    def __init__(self, collection):
+        self.col = collection
+
+    def find_by_email(self, email):
+        return self.col.find_one({"email": email}, {"_id": 0})
+
+    def insert(self, user):
+        from pymongo.errors import DuplicateKeyError
+        try:
+            self.col.insert_one(dict(user))
+        except DuplicateKeyError:
+            raise DuplicateUserError(user["email"]) from None
+
+    def insert_many(self, users):
+        from pymongo.errors import BulkWriteError
+        if not users:
+            return
+        try:
+            self.col.insert_many([dict(u) for u in users])
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if not errors or errors[0].get("code") != 11000:
+                raise
+            raise DuplicateUserError(users[errors[0]["index"]]["email"]) from None
+
+    def list_by_role(self, role, skip=0, limit=None, fields=None):
+        projection = {"_id": 0, **{f: 1 for f in fields}} if fields else {"_id": 0}
+        cursor = self.col.find({"role": role}, projection).sort("_id", 1).skip(skip)
+        if limit:
+            cursor = cursor.limit(limit)
+        return list(cursor)
+
+    def count_by_role(self, role):
+        return self.col.count_documents({"role": role})
+
+
+class MongoOtpRepository(OtpRepository):
+    def __init__(self, collection):
+        self.col = collection
+
+    def upsert(self, email, otp, created_at):
+        self.col.update_one(
+            {"email": email},
+            {"$set": {"otp": otp, "created_at": created_at}},
+            upsert=True,
+        )
+
+    def find(self, email):
+        return self.col.find_one({"email": email}, {"_id": 0})
+
+    def delete(self, email):
+        self.col.delete_one({"email": email})
+
+
+class MongoSessionRepository(SessionRepository):
+    def __init__(self, collection):
+        self.col = collection
+
+    def insert(self, session):
+        self.col.insert_one(dict(session))
+
+    def insert_many(self, sessions):
+        from pymongo.errors import BulkWriteError
+        if not sessions:
+            return []
+        try:
+            self.col.insert_many([dict(s) for s in sessions], ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != 11000 for err in errors):
+                raise
+            duplicates = {err["index"] for err in errors}
+            return [s for i, s in enumerate(sessions) if i not in duplicates]
+        return list(sessions)
+
+    def find_by_email(self, email, exercise=None):
+        query = {"email": email}
+        if exercise is not None:
+            query["exercise"] = exercise
+        return list(self.col.find(query, {"_id": 0}).sort("timestamp", 1))
+
+    def latest_per_email(self, emails):
+        pipeline = [
+            {"$match": {"email": {"$in": list(emails)}}},
+            {"$sort": {"email": 1, "timestamp": -1}},
+            {"$group": {"_id": "$email", "doc": {"$first": "$$ROOT"}}},
+            {"$project": {"doc._id": 0}},
+        ]
+        return {row["_id"]: row["doc"] for row in self.col.aggregate(pipeline)}
+
+
+class MongoNotificationRepository(NotificationRepository):
+    def __init__(self, collection):
+        self.col = collection
+
+    def insert(self, notification):
+        self.col.insert_one(dict(notification))
+
+    def recent(self, limit=10):
+        return list(self.col.find({}).sort("timestamp", -1).limit(limit))
+
+
+class MongoRollupRepository(RollupRepository):
+    def __init__(self, collection):
+        self.col = collection
+
+    def get(self, email, exercise):
+        return self.col.find_one({"email": email, "exercise": exercise}, {"_id": 0})
+
+    def put(self, rollup):
+        key = {"email": rollup["email"], "exercise": rollup["exercise"]}
+        self.col.replace_one(key, rollup, upsert=True)
+
+    def insert_if_absent(self, rollup):
+        from pymongo.errors import DuplicateKeyError
+        key = {"email": rollup["email"], "exercise": rollup["exercise"]}
+        try:
+            result = self.col.update_one(key, {"$setOnInsert": rollup}, upsert=True)
+        except DuplicateKeyError:
+            # Lost a concurrent upsert race on the unique index
+            return False
+        return result.upserted_id is not None
+
+    def delete_user(self, email):
+        self.col.delete_many({"email": email})
+
+
+class MongoTelemetryRepository(TelemetryRepository):
+    """One document per chunk, GridFS style: {session_id, n, data: Binary}."""
+    def __init__(self, collection):
+        self.col = collection
+
+    def put(self, session_id, chunks):
+        self.col.delete_many({"session_id": session_id})
+        self.col.insert_many([
+            {"session_id": session_id, "n": i, "data": chunk} for i, chunk in enumerate(chunks)
+        ])
+
+    def get(self, session_id):
+        cursor = self.col.find({"session_id": session_id}, {"_id": 0, "data": 1}).sort("n", 1)
+        return [bytes(doc["data"]) for doc in cursor]
+
+
+class MongoCalibrationRepository(CalibrationRepository):
+    def __init__(self, collection):
+        self.col = collection
+
+    def get(self, email, exercise):
+        return self.col.find_one({"email": email, "exercise": exercise}, {"_id": 0})
+
+    def put(self, profile):
+        key = {"email": profile["email"], "exercise": profile["exercise"]}
+        self.col.replace_one(key, profile, upsert=True)
+
+
+class MongoStorage(Storage):
+    name = "mongo"
+
+    def __init__(self, db):
+        self.db = db
+        super().__init__(
+            MongoUserRepository(db["users"]),
+            MongoOtpRepository(db["otps"]),
+            MongoSessionRepository(db["sessions"]),
+            MongoNotificationRepository(db["notifications"]),
+            MongoRollupRepository(db["analytics_rollups"]),
+            MongoTelemetryRepository(db["session_telemetry"]),
+            MongoCalibrationRepository(db["calibration_profiles"]),
+        )
+
+    def ensure_indexes(self):
+        self.db["users"].create_index([("email", 1)], unique=True)
+        self.db["users"].create_index([("role", 1)])
+        self.db["otps"].create_index([("email", 1)])
+        # Supports per-patient history scans and the latest-session cohort query
+        self.db["sessions"].create_index([("email", 1), ("timestamp", -1)])
+        self.db["sessions"].create_index([("session_id", 1)], unique=True, sparse=True)
+        self.db["notifications"].create_index([("timestamp", -1)])
+        self.db["analytics_rollups"].create_index([("email", 1), ("exercise", 1)], unique=True)
+        self.db["session_telemetry"].create_index([("session_id", 1), ("n", 1)], unique=True)
+        self.db["calibration_profiles"].create_index([("email", 1), ("exercise", 1)], unique=True)
+
+
+# ----------------------------------------------------
+# IN-MEMORY
+# ----------------------------------------------------
+class _MemoryTable:
+    def __init__(self):
+        self.lock = threading.RLock()
+
+
+class MemoryUserRepository(UserRepository, _MemoryTable):
+    def __init__(self):
+        super().__init__()
+        self.by_email: Dict[str, dict] = {}   # insertion order = registration order
+
+    def find_by_email(self, email):
+        with self.lock:
+            user = self.by_email.get(email)
+            return copy.deepcopy(user) if user else None
+
+    def insert(self, user):
+        self.insert_many([user])
+
+    def insert_many(self, users):
+        with self.lock:
+            for u in users:
+                if u["email"] in self.by_email:
+                    raise DuplicateUserError(u["email"])
+                self.by_email[u["email"]] = copy.deepcopy(u)
+
+    def list_by_role(self, role, skip=0, limit=None, fields=None):
+        with self.lock:
+            matches = [u for u in self.by_email.values() if u.get("role") == role]
+            end = skip + limit if limit else None
+            return [_project(u, fields) for u in matches[skip:end]]
+
+    def count_by_role(self, role):
+        with self.lock:
+            return sum(1 for u in self.by_email.values() if u.get("role") == role)
+
+
+class MemoryOtpRepository(OtpRepository, _MemoryTable):
+    def __init__(self):
+        super().__init__()
+        self.by_email: Dict[str, dict] = {}
+
+    def upsert(self, email, otp, created_at):
+        with self.lock:
+            self.by_email[email] = {"email": email, "otp": otp, "created_at": created_at}
+
+    def find(self, email):
+        with self.lock:
+            otp = self.by_email.get(email)
+            return dict(otp) if otp else None
+
+    def delete(self, email):
+        with self.lock:
+            self.by_email.pop(email, None)
+
+
+class MemorySessionRepository(SessionRepository, _MemoryTable):
+    def __init__(self):
+        super().__init__()
+        # email -> [(timestamp, seq, doc)] kept sorted (the (email, timestamp) index)
+        self.by_email: Dict[str, list] = {}
+        self.session_ids = set()
+        self._seq = 0
+
+    def insert(self, session):
+        self.insert_many([session])
+
+    def insert_many(self, sessions):
+        inserted = []
+        with self.lock:
+            for s in sessions:
+                session_id = s.get("session_id")
+                if session_id is not None:
+                    if session_id in self.session_ids:
+                        continue
+                    self.session_ids.add(session_id)
+                self._seq += 1
+                rows = self.by_email.setdefault(s.get("email"), [])
+                insort(rows, (s.get("timestamp", 0), self._seq, copy.deepcopy(s)), key=lambda r: r[:2])
+                inserted.append(s)
+        return inserted
+
+    def find_by_email(self, email, exercise=None):
+        with self.lock:
+            rows = self.by_email.get(email, [])
+            return [copy.deepcopy(doc) for _, _, doc in rows
+                    if exercise is None or doc.get("exercise") == exercise]
+
+    def latest_per_email(self, emails):
+        with self.lock:
+            return {
+                email: copy.deepcopy(self.by_email[email][-1][2])
+                for email in emails if self.by_email.get(email)
+            }
+
+
+class MemoryNotificationRepository(NotificationRepository, _MemoryTable):
+    def __init__(self):
+        super().__init__()
+        self.rows: List[dict] = []
+
+    def insert(self, notification):
+        with self.lock:
+            doc = copy.deepcopy(notification)
+            doc.setdefault("_id", uuid.uuid4().hex)
+            self.rows.append(doc)
+
+    def recent(self, limit=10):
+        with self.lock:
+            rows = sorted(self.rows, key=lambda n: n.get("timestamp", 0), reverse=True)
+            return copy.deepcopy(rows[:limit])
+
+
+class MemoryRollupRepository(RollupRepository, _MemoryTable):
+    def __init__(self):
+        super().__init__()
+        self.by_key: Dict[tuple, dict] = {}
+
+    def get(self, email, exercise):
+        with self.lock:
+            rollup = self.by_key.get((email, exercise))
+            return copy.deepcopy(rollup) if rollup else None
+
+    def put(self, rollup):
+        with self.lock:
+            self.by_key[(rollup["email"], rollup["exercise"])] = copy.deepcopy(rollup)
+
+    def insert_if_absent(self, rollup):
+        with self.lock:
+            key = (rollup["email"], rollup["exercise"])
+            if key in self.by_key:
+                return False
+            self.by_key[key] = copy.deepcopy(rollup)
+            return True
+
+    def delete_user(self, email):
+        with self.lock:
+            for key in [k for k in self.by_key if k[0] == email]:
+                del self.by_key[key]
+
+
+class MemoryTelemetryRepository(TelemetryRepository, _MemoryTable):
+    def __init__(self):
+        super().__init__()
+        self.by_session: Dict[str, List[bytes]] = {}
+
+    def put(self, session_id, chunks):
+        with self.lock:
+            self.by_session[session_id] = [bytes(c) for c in chunks]
+
+    def get(self, session_id):
+        with self.lock:
+            return list(self.by_session.get(session_id, []))
+
+
+class MemoryCalibrationRepository(CalibrationRepository, _MemoryTable):
+    def __init__(self):
+        super().__init__()
+        self.by_key: Dict[tuple, dict] = {}
+
+    def get(self, email, exercise):
+        with self.lock:
+            profile = self.by_key.get((email, exercise))
+            return dict(profile) if profile else None
+
+    def put(self, profile):
+        with self.lock:
+            self.by_key[(profile["email"], profile["exercise"])] = dict(profile)
+
+
+class MemoryStorage(Storage):
+    name = "memory"
+
+    def __init__(self):
+        super().__init__(
+            MemoryUserRepository(),
+            MemoryOtpRepository(),
+            MemorySessionRepository(),
+            MemoryNotificationRepository(),
+            MemoryRollupRepository(),
+            MemoryTelemetryRepository(),
+            MemoryCalibrationRepository(),
+        )
+
+
+# ----------------------------------------------------
+# SQLITE
+# ----------------------------------------------------
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT UNIQUE NOT NULL,
+    role TEXT,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_role ON users (role, seq);
+
+CREATE TABLE IF NOT EXISTS otps (
+    email TEXT PRIMARY KEY,
+    doc TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT UNIQUE,
+    email TEXT,
+    exercise TEXT,
+    timestamp REAL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_email_ts ON sessions (email, timestamp);
+
+CREATE TABLE IF NOT EXISTS notifications (
+    id TEXT PRIMARY KEY,
+    timestamp REAL,
+    doc TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_notifications_ts ON notifications (timestamp);
+
+CREATE TABLE IF NOT EXISTS analytics_rollups (
+    email TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (email, exercise)
+);
+
+CREATE TABLE IF NOT EXISTS session_telemetry (
+    session_id TEXT NOT NULL,
+    n INTEGER NOT NULL,
+    data BLOB NOT NULL,
+    PRIMARY KEY (session_id, n)
+);
+
+CREATE TABLE IF NOT EXISTS calibration_profiles (
+    email TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    doc TEXT NOT NULL,
+    PRIMARY KEY (email, exercise)
+);
+"""
+
+
+class _SQLiteTable:
+    def __init__(self, conn: sqlite3.Connection, lock: threading.RLock):
+        self.conn = conn
+        self.lock = lock
+
+    def _query(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _write(self, sql, params=()):
+        with self.lock, self.conn:
+            self.conn.execute(sql, params)
+
+    def _write_many(self, sql, rows: Iterable):
+        with self.lock, self.conn:
+            self.conn.executemany(sql, rows)
+
+
+class SQLiteUserRepository(UserRepository, _SQLiteTable):
+    def find_by_email(self, email):
+        rows = self._query("SELECT doc FROM users WHERE email = ?", (email,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def insert(self, user):
+        self.insert_many([user])
+
+    def insert_many(self, users):
+        duplicate = None
+        with self.lock, self.conn:
+            for u in users:
+                try:
+                    self.conn.execute(
+                        "INSERT INTO users (email, role, doc) VALUES (?, ?, ?)",
+                        (u["email"], u.get("role"), json.dumps(u)),
+                    )
+                except sqlite3.IntegrityError:
+                    # Commit the users ahead of it, like an ordered Mongo insert
+                    duplicate = u["email"]
+                    break
+        if duplicate is not None:
+            raise DuplicateUserError(duplicate)
+
+    def list_by_role(self, role, skip=0, limit=None, fields=None):
+        rows = self._query(
+            "SELECT doc FROM users WHERE role = ? ORDER BY seq LIMIT ? OFFSET ?",
+            (role, limit if limit else -1, skip),
+        )
+        return [_project(json.loads(r[0]), fields) for r in rows]
+
+    def count_by_role(self, role):
+        return self._query("SELECT COUNT(*) FROM users WHERE role = ?", (role,))[0][0]
+
+
+class SQLiteOtpRepository(OtpRepository, _SQLiteTable):
+    def upsert(self, email, otp, created_at):
+        doc = {"email": email, "otp": otp, "created_at": created_at}
+        self._write("INSERT OR REPLACE INTO otps (email, doc) VALUES (?, ?)", (email, json.dumps(doc)))
+
+    def find(self, email):
+        rows = self._query("SELECT doc FROM otps WHERE email = ?", (email,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def delete(self, email):
+        self._write("DELETE FROM otps WHERE email = ?", (email,))
+
+
+class SQLiteSessionRepository(SessionRepository, _SQLiteTable):
+    def insert(self, session):
+        self.insert_many([session])
+
+    def insert_many(self, sessions):
+        inserted = []
+        with self.lock, self.conn:
+            for s in sessions:
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO sessions (session_id, email, exercise, timestamp, doc) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (s.get("session_id"), s.get("email"), s.get("exercise"), s.get("timestamp", 0), json.dumps(s)),
+                )
+                if cur.rowcount:
+                    inserted.append(s)
+        return inserted
+
+    def find_by_email(self, email, exercise=None):
+        if exercise is None:
+            rows = self._query(
+                "SELECT doc FROM sessions WHERE email = ? ORDER BY timestamp, seq", (email,))
+        else:
+            rows = self._query(
+                "SELECT doc FROM sessions WHERE email = ? AND exercise = ? ORDER BY timestamp, seq",
+                (email, exercise))
+        return [json.loads(r[0]) for r in rows]
+
+    def latest_per_email(self, emails):
+        emails = list(emails)
+        if not emails:
+            return {}
+        placeholders = ",".join("?" * len(emails))
+        rows = self._query(
+            f"""SELECT email, doc FROM (
+                    SELECT email, doc, ROW_NUMBER() OVER (
+                        PARTITION BY email ORDER BY timestamp DESC, seq DESC) AS rn
+                    FROM sessions WHERE email IN ({placeholders})
+                ) WHERE rn = 1""",
+            emails,
+        )
+        return {email: json.loads(doc) for email, doc in rows}
+
+
+class SQLiteNotificationRepository(NotificationRepository, _SQLiteTable):
+    def insert(self, notification):
+        doc = dict(notification)
+        doc.setdefault("_id", uuid.uuid4().hex)
+        self._write(
+            "INSERT INTO notifications (id, timestamp, doc) VALUES (?, ?, ?)",
+            (doc["_id"], doc.get("timestamp", 0), json.dumps(doc)),
+        )
+
+    def recent(self, limit=10):
+        rows = self._query("SELECT doc FROM notifications ORDER BY timestamp DESC LIMIT ?", (limit,))
+        return [json.loads(r[0]) for r in rows]
+
+
+class SQLiteRollupRepository(RollupRepository, _SQLiteTable):
+    def get(self, email, exercise):
+        rows = self._query(
+            "SELECT doc FROM analytics_rollups WHERE email = ? AND exercise = ?", (email, exercise))
+        return json.loads(rows[0][0]) if rows else None
+
+    def put(self, rollup):
+        self._write(
+            "INSERT OR REPLACE INTO analytics_rollups (email, exercise, doc) VALUES (?, ?, ?)",
+            (rollup["email"], rollup["exercise"], json.dumps(rollup)),
+        )
+
+    def insert_if_absent(self, rollup):
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO analytics_rollups (email, exercise, doc) VALUES (?, ?, ?)",
+                (rollup["email"], rollup["exercise"], json.dumps(rollup)),
+            )
+            return cursor.rowcount == 1
+
+    def delete_user(self, email):
+        self._write("DELETE FROM analytics_rollups WHERE email = ?", (email,))
+
+
+class SQLiteTelemetryRepository(TelemetryRepository, _SQLiteTable):
+    def put(self, session_id, chunks):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM session_telemetry WHERE session_id = ?", (session_id,))
+            self.conn.executemany(
+                "INSERT INTO session_telemetry (session_id, n, data) VALUES (?, ?, ?)",
+                [(session_id, i, sqlite3.Binary(c)) for i, c in enumerate(chunks)],
+            )
+
+    def get(self, session_id):
+        rows = self._query(
+            "SELECT data FROM session_telemetry WHERE session_id = ? ORDER BY n", (session_id,))
+        return [bytes(r[0]) for r in rows]
+
+
+class SQLiteCalibrationRepository(CalibrationRepository, _SQLiteTable):
+    def get(self, email, exercise):
+        rows = self._query(
+            "SELECT doc FROM calibration_profiles WHERE email = ? AND exercise = ?", (email, exercise))
+        return json.loads(rows[0][0]) if rows else None
+
+    def put(self, profile):
+        self._write(
+            "INSERT OR REPLACE INTO calibration_profiles (email, exercise, doc) VALUES (?, ?, ?)",
+            (profile["email"], profile["exercise"], json.dumps(profile)),
+        )
+
+
+class SQLiteStorage(Storage):
+    name = "sqlite"
+
+    def __init__(self, path: str = ":memory:"):
+        # One shared connection guarded by a lock (Flask serves requests from many threads)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        args = (self.conn, self.lock)
+        super().__init__(
+            SQLiteUserRepository(*args),
+            SQLiteOtpRepository(*args),
+            SQLiteSessionRepository(*args),
+            SQLiteNotificationRepository(*args),
+            SQLiteRollupRepository(*args),
+            SQLiteTelemetryRepository(*args),
+            SQLiteCalibrationRepository(*args),
+        )
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        with self.lock:
+            self.conn.executescript(SQLITE_SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def create_storage(backend: str, db=None, sqlite_path: str = "physiocheck.db") -> Storage:
+    """Builds the configured backend ("mongo" needs a connected pymongo database)."""
+    backend = (backend or "mongo").lower()
+    if backend == "mongo":
+        if db is None:
+            raise ValueError("Mongo storage requires a database handle")
+        return MongoStorage(db)
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "sqlite":
+        return SQLiteStorage(sqlite_path)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,186 @@
+"""
+Constant-memory streaming statistics
+P² quantile sketches (Jain & Chlamtac, 1985), Welford mean/variance and a
+hold-pose estimator built on them that decides when enough of a steady pose
+has been seen.
+"""
+import math
+from typing import Dict, Optional, Sequence
+
+
+class P2Quantile:
+    """Streaming estimate of one quantile with five markers (no samples stored)."""
+
+    def __init__(self, p: float):
+        self.p = p
+        self.count = 0
+        self._q = []                                   # marker heights
+        self._n = [0, 1, 2, 3, 4]                      # marker positions
+        self._np = [0, 2 * p, 4 * p, 2 + 2 * p, 4]     # desired positions
+        self._dn = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def add(self, x: float):
+        self.count += 1
+        q = self._q
+        if self.count <= 5:
+            q.append(x)
+            q.sort()
+            return
+
+        n = self._n
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._np[i] += self._dn[i]
+
+        # Nudge the three middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self._np[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = self._parabolic(i, d)
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = candidate
+                n[i] += d
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self._q, self._n
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def value(self) -> Optional[float]:
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            # Exact (linear interpolation) while only the first samples are known
+            pos = self.p * (len(self._q) - 1)
+            lo = int(math.floor(pos))
+            hi = min(lo + 1, len(self._q) - 1)
+            return self._q[lo] + (self._q[hi] - self._q[lo]) * (pos - lo)
+        return self._q[2]
+
+
+class RunningStats:
+    """Welford's online mean and variance."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, x: float):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class HoldEstimator:
+    """
+    Summarizes a held pose in constant memory and reports when the estimate is
+    tight enough to stop holding.
+
+    A sample far from the running median is ignored as a tracking glitch; a run
+    of `outlier_frames` such samples means the user moved, and the estimate
+    restarts from there.
+    """
+
+    QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+
+    def __init__(self,
+                 min_hold: float,
+                 max_hold: float,
+                 ci_target: float,
+                 move_tolerance: float,
+                 outlier_frames: int = 3,
+                 effective_rate: float = 10.0,
+                 min_samples: int = 10):
+        """
+        Args:
+            min_hold / max_hold: Seconds; stops between the two
+            ci_target: Stop once the ~95% CI half-width of the median is below this (degrees)
+            effective_rate: Independent samples per second (consecutive frames are correlated)
+        """
+        self.min_hold = min_hold
+        self.max_hold = max_hold
+        self.ci_target = ci_target
+        self.move_tolerance = move_tolerance
+        self.outlier_frames = outlier_frames
+        self.effective_rate = effective_rate
+        self.min_samples = min_samples
+        self.restarts = 0
+        self.reset(0.0)
+
+    def reset(self, start_time: float):
+        self.start_time = start_time
+        self.sketches: Dict[float, P2Quantile] = {p: P2Quantile(p) for p in self.QUANTILES}
+        self.stats = RunningStats()
+        self._deviating = 0
+
+    def add(self, x: float, t: float) -> bool:
+        """Feeds one sample; returns False if it was dropped (glitch or restart)."""
+        median = self.quantile(0.5)
+        if self.stats.count >= 5 and abs(x - median) > self.move_tolerance:
+            self._deviating += 1
+            if self._deviating < self.outlier_frames:
+                return False
+            self.restarts += 1
+            self.reset(t)
+        self._deviating = 0
+        for sketch in self.sketches.values():
+            sketch.add(x)
+        self.stats.add(x)
+        return True
+
+    def quantile(self, p: float) -> Optional[float]:
+        return self.sketches[p].value
+
+    def elapsed(self, t: float) -> float:
+        return max(0.0, t - self.start_time)
+
+    def ci_halfwidth(self, t: float) -> float:
+        """Approximate 95% CI half-width of the median (McGill et al. notch: 1.57 IQR / sqrt(n))."""
+        n_eff = min(self.stats.count, self.elapsed(t) * self.effective_rate)
+        if n_eff < 2:
+            return math.inf
+        iqr = self.quantile(0.75) - self.quantile(0.25)
+        return 1.57 * iqr / math.sqrt(n_eff)
+
+    def progress(self, t: float) -> float:
+        """0..1: the further of time towards max_hold and precision towards the target."""
+        ci = self.ci_halfwidth(t)
+        precision = 1.0 if ci <= self.ci_target else self.ci_target / ci
+        if self.elapsed(t) < self.min_hold or self.stats.count < self.min_samples:
+            precision = min(precision, self.elapsed(t) / self.min_hold)
+        return min(1.0, max(self.elapsed(t) / self.max_hold, precision))
+
+    def done(self, t: float) -> bool:
+        elapsed = self.elapsed(t)
+        if self.stats.count < self.min_samples or elapsed < self.min_hold:
+            return False
+        return elapsed >= self.max_hold or self.ci_halfwidth(t) <= self.ci_target
+
+    def summary(self, quantiles: Sequence[float] = (0.1, 0.5, 0.9)) -> list:
+        return [round(self.quantile(p), 1) for p in quantiles] if self.stats.count else []
@@ -0,0 +1,5 @@
+"""Shared pytest setup: the backend modules live at the repository root."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
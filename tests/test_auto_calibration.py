@@ -0,0 +1,33 @@
+"""Auto-calibration on replayed synthetic sessions."""
+import numpy as np
+
+from auto_calibration import AutoCalibrator
+from constants import SAFETY_MARGIN
+from models import CalibrationData
+from pose_replay import PoseRecording, replay
+
+
+def test_safe_range_surrounds_observed_turning_points():
+    data = CalibrationData()
+    calibrator = AutoCalibrator(data, SAFETY_MARGIN)
+    for angle in np.concatenate([np.linspace(160, 40, 30), np.linspace(40, 160, 30)] * 4):
+        calibrator.add({'RIGHT': float(angle), 'LEFT': None})
+
+    assert calibrator.settled
+    assert data.contracted_threshold > 40 and data.extended_threshold < 160
+    assert data.safe_angle_min == 40 - SAFETY_MARGIN
+    assert data.safe_angle_max == 160 + SAFETY_MARGIN
+
+
+def test_clean_session_has_no_safety_errors():
+    recording = PoseRecording.synthetic("Bicep Curl", seconds=60.0)
+    session = replay(recording, calibration_mode="auto")
+
+    data = session.calibration_manager.data
+    assert session.calibration_manager.source == "auto"
+    for series in (session.history.right_angle, session.history.left_angle):
+        tracked = np.array([a for a in series if a])
+        assert tracked.size
+        assert ((tracked < data.safe_angle_min) | (tracked > data.safe_angle_max)).sum() == 0
+    summary = session.get_final_report()['summary']
+    assert summary['RIGHT']['total_reps'] >= 15 and summary['LEFT']['total_reps'] >= 15
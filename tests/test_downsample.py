@@ -0,0 +1,57 @@
+"""LTTB downsampling of chart series."""
+import numpy as np
+
+from downsample import downsample_series, lttb_indices
+
+
+def _reference_lttb(x, y, n_out):
+    """Straightforward per-bucket loop, as in the original LTTB description."""
+    n = len(x)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    edges[-1] = n - 1
+    out, a = [0], 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < n_out - 1:
+            nlo, nhi = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            ax_, ay_ = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        else:
+            ax_, ay_ = x[-1], y[-1]
+        areas = [abs((x[a] - ax_) * (y[j] - y[a]) - (x[a] - x[j]) * (ay_ - y[a])) for j in range(lo, hi)]
+        a = lo + int(np.argmax(areas))
+        out.append(a)
+    return np.array(out + [n - 1])
+
+
+def test_matches_reference_implementation():
+    rng = np.random.default_rng(0)
+    x = np.sort(rng.uniform(0, 100, 2000))
+    y = np.cumsum(rng.normal(0, 1, 2000))
+    for n_out in (3, 10, 97, 500):
+        np.testing.assert_array_equal(lttb_indices(x, y, n_out), _reference_lttb(x, y, n_out))
+
+
+def test_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[377] = 50.0
+    idx = lttb_indices(x, y, 20)
+
+    assert idx[0] == 0 and idx[-1] == 999 and 377 in idx
+    assert np.all(np.diff(idx) > 0)
+
+
+def test_short_series_are_returned_whole():
+    x = np.arange(5, dtype=float)
+    np.testing.assert_array_equal(lttb_indices(x, x, 10), np.arange(5))
+    np.testing.assert_array_equal(lttb_indices(x, x, 2), [0, 4])
+
+
+def test_window_is_clipped_before_downsampling():
+    t = np.arange(0, 60, 0.5)
+    v = (t * 2).astype(np.int16)
+    result = downsample_series(t, v, 10, start=10.0, end=20.0)
+
+    assert result["t"][0] == 10.0 and result["t"][-1] == 20.0
+    assert len(result["t"]) == len(result["angle"]) == 10
+    assert result["angle"] == [int(s * 2) for s in result["t"]]
@@ -0,0 +1,65 @@
+"""Ghost limbs show the tracked angle for every exercise preset."""
+import math
+
+import numpy as np
+import pytest
+
+from angle_calculator import AngleCalculator
+from constants import EXERCISE_PRESETS
+from ghost_engine import GhostEngine
+
+EXTENDED, CONTRACTED = 160.0, 45.0
+
+
+def _pose(config, patient_angle):
+    """Both limbs at `patient_angle`, patient facing the camera (RIGHT on the image left)."""
+    points = np.full((33, 2), 0.5)
+    visible = np.zeros(33, dtype=bool)
+    for (a, b, c), x, side in ((config.right_landmarks, 0.4, -1), (config.left_landmarks, 0.6, 1)):
+        theta = math.radians(patient_angle)
+        points[a] = (x, 0.3)
+        points[b] = (x, 0.5)
+        points[c] = (x + side * 0.2 * math.sin(theta), 0.5 - 0.2 * math.cos(theta))
+        visible[[a, b, c]] = True
+    return points, visible
+
+
+def _cross(o, p, q):
+    return (p[0] - o[0]) * (q[1] - o[1]) - (p[1] - o[1]) * (q[0] - o[0])
+
+
+@pytest.mark.parametrize("name", sorted(EXERCISE_PRESETS))
+@pytest.mark.parametrize("phase, target", [(0.0, EXTENDED), (0.5, CONTRACTED)])
+def test_rendered_angle_matches_target(name, phase, target):
+    # The tracked angle is the interior angle A-B-C for every joint (angle_calculator),
+    # so rotating B->A by the target reproduces it without per-joint flips
+    config = EXERCISE_PRESETS[name]
+    engine = GhostEngine(config)
+    engine.calibrate(EXTENDED, CONTRACTED)
+    points, visible = _pose(config, 100.0)
+    out_points, out_visible = np.empty_like(points), np.empty_like(visible)
+    engine.render(points, visible, (phase, phase), out_points, out_visible)
+
+    for a, b, c in (config.right_landmarks, config.left_landmarks):
+        angle = AngleCalculator.calculate_angle(out_points[a], out_points[b], out_points[c])
+        assert angle == pytest.approx(target, abs=1e-6)
+        # Limb length kept, and the limb bends to the side B->A is rotated toward by the
+        # facing rule (the side the old per-joint code used as well)
+        assert np.hypot(*(out_points[c] - out_points[b])) == pytest.approx(0.2)
+    (ra, rb, rc), (la, lb, lc) = config.right_landmarks, config.left_landmarks
+    right_side = _cross(out_points[rb], out_points[ra], out_points[rc])
+    left_side = _cross(out_points[lb], out_points[la], out_points[lc])
+    assert right_side * left_side < 0  # mirrored limbs
+
+
+def test_hidden_limb_is_left_alone():
+    config = EXERCISE_PRESETS["Bicep Curl"]
+    engine = GhostEngine(config)
+    engine.calibrate(EXTENDED, CONTRACTED)
+    points, visible = _pose(config, 100.0)
+    visible[config.left_landmarks[2]] = False
+    out_points, out_visible = np.empty_like(points), np.empty_like(visible)
+    engine.render(points, visible, (0.5, 0.5), out_points, out_visible)
+
+    np.testing.assert_array_equal(out_points[config.left_landmarks[2]], points[config.left_landmarks[2]])
+    assert not out_visible[config.left_landmarks[2]]
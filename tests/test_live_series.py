@@ -0,0 +1,41 @@
+"""Live angle series: snapshot-owned views and the /report_series endpoint."""
+import os
+
+import numpy as np
+import pytest
+
+from pose_replay import PoseRecording, replay
+from telemetry import LiveSeries
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+import app as server  # noqa: E402
+
+
+def test_published_views_survive_growth():
+    buffer = LiveSeries(capacity=4)
+    early = buffer.view()
+    for i in range(3):
+        buffer.append(i / 10, i, -i)
+    before = buffer.view()
+    for i in range(3, 50):
+        buffer.append(i / 10, i, -i)
+
+    assert len(early) == 0
+    assert before.right.tolist() == [0, 1, 2]
+    assert not before.right.flags.writeable
+    assert buffer.view().left.tolist() == [-i for i in range(50)]
+
+
+def test_snapshot_series_matches_history():
+    session = replay(PoseRecording.synthetic("Bicep Curl", seconds=10.0), calibration_mode="auto")
+    series = session.state_snapshot.series
+    assert len(series) == len(session.history.time) > 0
+    np.testing.assert_array_equal(series.time, session.history.time)
+    np.testing.assert_array_equal(series.right, session.history.right_angle)
+    np.testing.assert_array_equal(series.left, session.history.left_angle)
+
+
+@pytest.mark.parametrize("query", ["start=nan", "end=inf", "start=-inf&end=5", "points=x"])
+def test_report_series_rejects_non_finite_bounds(query):
+    response = server.app.test_client().get(f"/report_series?{query}")
+    assert response.status_code == 400
@@ -0,0 +1,109 @@
+"""QueryCache: invalidation, stale in-flight results, TTL/LRU and private copies."""
+import threading
+import time
+
+from query_cache import QueryCache
+
+
+def test_invalidate_drops_only_that_user():
+    cache = QueryCache()
+    calls = []
+    compute = lambda tag: (lambda: calls.append(tag) or {"v": len(calls)})
+    cache.get_or_compute("a", "history", compute("a"))
+    cache.get_or_compute("a", "detail", compute("a"), params=("Squat",))
+    cache.get_or_compute("b", "history", compute("b"))
+
+    cache.invalidate("a")
+    cache.get_or_compute("a", "history", compute("a"))
+    cache.get_or_compute("b", "history", compute("b"))
+
+    assert calls == ["a", "a", "b", "a"]
+    assert cache.metrics()["invalidations"] == 1
+
+
+def test_result_computed_across_an_invalidation_is_not_cached():
+    cache = QueryCache()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "stale"
+
+    worker = threading.Thread(target=cache.get_or_compute, args=("a", "history", slow))
+    worker.start()
+    started.wait(5)
+    cache.invalidate("a")          # a write lands while the old read is computing
+    # Later callers start their own flight instead of joining the stale one
+    assert cache.get_or_compute("a", "history", lambda: "fresh") == "fresh"
+    release.set()
+    worker.join(5)
+
+    assert cache.get_or_compute("a", "history", lambda: "recomputed") == "fresh"
+    # Generation counters are dropped once no flight needs them
+    assert cache._generation == {} and cache._inflight == {}
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = QueryCache()
+    gate = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        gate.wait(5)
+        return {"rows": [1, 2, 3]}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("a", "r", compute)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    deadline = time.monotonic() + 5
+    while cache.metrics()["misses"] < 8 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    gate.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(calls) == 1 and len(results) == 8
+    assert cache.metrics()["collapsed"] == 7
+    assert len({id(r) for r in results}) == 8   # every caller gets its own copy
+
+
+def test_callers_cannot_mutate_the_cached_value():
+    cache = QueryCache()
+    first = cache.get_or_compute("a", "r", lambda: {"history": [1, 2]})
+    first["history"].append(99)
+    assert cache.get_or_compute("a", "r", lambda: None) == {"history": [1, 2]}
+
+
+def test_ttl_and_lru_eviction():
+    cache = QueryCache(max_entries=2, ttl=0.0)
+    cache.get_or_compute("a", "r", lambda: 1)
+    assert cache.get_or_compute("a", "r", lambda: 2) == 2
+    assert cache.metrics()["expirations"] == 1
+
+    cache = QueryCache(max_entries=2)
+    for user in ("a", "b", "c"):
+        cache.get_or_compute(user, "r", lambda: user)
+    assert cache.metrics()["evictions"] == 1
+    assert cache.get_or_compute("a", "r", lambda: "recomputed") == "recomputed"
+
+
+def test_clear_discards_in_flight_results():
+    cache = QueryCache()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "old"
+
+    worker = threading.Thread(target=cache.get_or_compute, args=("a", "r", slow))
+    worker.start()
+    started.wait(5)
+    cache.clear()
+    release.set()
+    worker.join(5)
+    assert cache.get_or_compute("a", "r", lambda: "new") == "new"
@@ -0,0 +1,81 @@
+"""Rollup maintenance in app: backfill, per-exercise documents, repeated flushes."""
+import os
+import time
+import uuid
+
+import pytest
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+import app as server  # noqa: E402
+from analytics_rollup import ALL_EXERCISES  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def client():
+    deadline = time.monotonic() + 5
+    while server.storage is None:
+        assert time.monotonic() < deadline, "storage never became ready"
+        time.sleep(0.01)
+    return server.app.test_client()
+
+
+def _session(email, exercise, reps, errors, day):
+    return {
+        "session_id": uuid.uuid4().hex,
+        "email": email,
+        "exercise": exercise,
+        "timestamp": time.time(),
+        "date": f"2026-10-{day:02d}",
+        "total_reps": reps,
+        "total_errors": errors,
+        "right_reps": reps // 2,
+        "left_reps": reps - reps // 2,
+        "duration": 30,
+    }
+
+
+def _store(docs):
+    server.storage.sessions.insert_many(docs)
+    server._on_sessions_flushed(docs)
+
+
+def test_flush_updates_user_and_exercise_rollups_once(client):
+    email = f"{uuid.uuid4().hex}@x"
+    docs = [_session(email, "Squat", 10, 2, 1), _session(email, "Bicep Curl", 20, 0, 2)]
+    _store(docs)
+    # A retried batch is delivered again; it must not be counted twice
+    server._on_sessions_flushed(docs)
+
+    user = server.storage.rollups.get(email, ALL_EXERCISES)
+    squat = server.storage.rollups.get(email, "Squat")
+    assert user["session_count"] == 2 and user["total_reps"] == 30
+    assert squat["session_count"] == 1 and squat["total_reps"] == 10
+    assert server.storage.rollups.get(email, "Bicep Curl")["total_errors"] == 0
+
+
+def test_missing_rollup_is_backfilled_and_then_updated(client):
+    email = f"{uuid.uuid4().hex}@x"
+    server.storage.sessions.insert_many([_session(email, "Squat", 10, 5, d) for d in (1, 2, 3)])
+    assert server.storage.rollups.get(email, ALL_EXERCISES) is None
+
+    body = client.post("/api/user/analytics_detailed", json={"email": email}).get_json()
+    assert len(body["history"]) == 3 and body["average_accuracy"] == 50
+    assert server.storage.rollups.get(email, ALL_EXERCISES)["session_count"] == 3
+
+    _store([_session(email, "Squat", 10, 0, 4)])
+    body = client.post("/api/user/analytics_detailed", json={"email": email}).get_json()
+    assert len(body["history"]) == 4
+
+
+def test_exercise_filter_reads_the_exercise_rollup(client):
+    email = f"{uuid.uuid4().hex}@x"
+    _store([_session(email, "Squat", 10, 0, 1), _session(email, "Bicep Curl", 4, 4, 1)])
+
+    everything = client.post("/api/user/analytics_detailed", json={"email": email}).get_json()
+    squat = client.post("/api/user/analytics_detailed", json={"email": email, "exercise": "Squat"}).get_json()
+    assert [e["name"] for e in everything["exercise_stats"]] == ["Squat", "Bicep Curl"]
+    assert squat["exercise_stats"] == [{"name": "Squat", "total_reps": 10}]
+    assert squat["average_accuracy"] == 100
+
+    prediction = client.post("/api/user/ai_prediction", json={"email": email, "exercise": "Bicep Curl"}).get_json()
+    assert prediction["asymmetry"] == {"right": 2, "left": 2, "score": 0}
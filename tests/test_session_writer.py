@@ -0,0 +1,109 @@
+"""Write-behind session queue: retries, delivery to on_flushed, dead letters, replay."""
+import json
+import time
+
+import pytest
+
+from session_writer import SessionWriteQueue, StorageUnavailable
+
+
+class FlakyStore:
+    """Stores by session_id (repeats are skipped) and fails on demand."""
+
+    def __init__(self):
+        self.docs = {}
+        self.down = False
+        self.raise_after_write = 0   # next N batches are written, then raise
+
+    def write_batch(self, batch):
+        if self.down:
+            raise StorageUnavailable("down")
+        if any(doc.get('poison') for doc in batch):
+            raise ValueError("bad document")
+        for doc in batch:
+            self.docs.setdefault(doc['session_id'], doc)
+        if self.raise_after_write:
+            self.raise_after_write -= 1
+            raise TimeoutError("ack lost")
+
+
+def _wait(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def store():
+    return FlakyStore()
+
+
+def _queue(tmp_path, store, flushed, **kwargs):
+    options = dict(batch_size=4, flush_interval=0.02, max_backoff=0.05, max_attempts=3)
+    options.update(kwargs)
+    return SessionWriteQueue(str(tmp_path / "journal.jsonl"), store.write_batch,
+                             on_flushed=flushed.extend, **options)
+
+
+def test_submit_requires_a_running_queue(tmp_path, store):
+    queue = _queue(tmp_path, store, [])
+    with pytest.raises(RuntimeError):
+        queue.submit({'email': 'p@x'})
+    queue.start()
+    queue.stop()
+    with pytest.raises(RuntimeError):
+        queue.submit({'email': 'p@x'})
+
+
+def test_batch_written_before_an_error_still_reaches_on_flushed(tmp_path, store):
+    flushed = []
+    queue = _queue(tmp_path, store, flushed)
+    store.raise_after_write = 1
+    queue.start()
+    ids = [queue.submit({'email': 'p@x', 'n': i}) for i in range(4)]
+    _wait(lambda: queue.pending_count() == 0)
+    queue.stop()
+
+    assert sorted(store.docs) == sorted(ids)
+    assert sorted(doc['session_id'] for doc in flushed) == sorted(ids)
+    assert queue.stats['retries'] == 1
+
+
+def test_outage_is_retried_and_poison_document_is_dead_lettered(tmp_path, store):
+    flushed = []
+    queue = _queue(tmp_path, store, flushed)
+    store.down = True
+    queue.start()
+    for i in range(6):
+        queue.submit({'email': 'p@x', 'n': i, 'poison': i == 2})
+    time.sleep(0.3)
+    assert queue.pending_count() == 6 and queue.stats['dead_lettered'] == 0
+
+    store.down = False
+    _wait(lambda: queue.pending_count() == 0)
+    queue.stop()
+
+    assert sorted(doc['n'] for doc in store.docs.values()) == [0, 1, 3, 4, 5]
+    with open(queue.dead_letter_path) as f:
+        dead = [json.loads(line) for line in f]
+    assert [d['doc']['n'] for d in dead] == [2]
+    # Drained queue leaves an empty journal
+    assert (tmp_path / "journal.jsonl").read_text() == ""
+
+
+def test_pending_sessions_are_replayed_after_restart(tmp_path, store):
+    store.down = True
+    queue = _queue(tmp_path, store, [])
+    queue.start()
+    ids = [queue.submit({'email': 'p@x', 'n': i}) for i in range(3)]
+    queue.stop(timeout=0.5)
+
+    store.down = False
+    flushed = []
+    queue = _queue(tmp_path, store, flushed)
+    queue.start()
+    _wait(lambda: queue.pending_count() == 0)
+    queue.stop()
+    assert queue.stats['replayed'] == 3
+    assert sorted(doc['session_id'] for doc in flushed) == sorted(ids)
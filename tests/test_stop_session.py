@@ -0,0 +1,22 @@
+"""stop_session persists a report built after the last frame."""
+import os
+
+from pose_replay import PoseRecording, replay
+
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+import app as server  # noqa: E402
+
+
+def test_final_report_duration_is_exact():
+    # 10.5 s: the throttled published report only refreshes on whole seconds
+    session = replay(PoseRecording.synthetic("Bicep Curl", seconds=10.5), calibration_mode="auto")
+    exact = round(session.history.time[-1], 2)
+    assert session.state_snapshot.report.report["duration"] != exact
+
+    server.workout_session = session
+    client = server.socketio.test_client(server.app)
+    client.emit("stop_session", {})
+
+    assert client.get_received()[-1]["args"][0]["status"] == "success"
+    assert server.last_session_report["duration"] == exact
+    assert server.workout_session is None
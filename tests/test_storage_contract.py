@@ -0,0 +1,76 @@
+"""Behaviour every storage backend must share (Mongo runs when MONGO_TEST_URI is set)."""
+import os
+import uuid
+
+import pytest
+
+from storage import DuplicateUserError, MemoryStorage, SQLiteStorage, UserRepository
+
+
+def _mongo_storage():
+    uri = os.getenv("MONGO_TEST_URI")
+    if not uri:
+        pytest.skip("MONGO_TEST_URI not set")
+    from pymongo import MongoClient
+    from storage import MongoStorage
+    client = MongoClient(uri, serverSelectionTimeoutMS=2000)
+    db = client[f"physiocheck_contract_{uuid.uuid4().hex[:8]}"]
+    storage = MongoStorage(db)
+    storage.ensure_indexes()
+    return storage, lambda: client.drop_database(db.name)
+
+
+@pytest.fixture(params=["memory", "sqlite", "mongo"])
+def storage(request):
+    if request.param == "memory":
+        backend, cleanup = MemoryStorage(), lambda: None
+    elif request.param == "sqlite":
+        backend = SQLiteStorage(":memory:")
+        cleanup = backend.close
+    else:
+        backend, cleanup = _mongo_storage()
+    yield backend
+    cleanup()
+
+
+def _user(email, name="Ada", role="patient"):
+    return {"email": email, "name": name, "role": role, "password": "x", "created_at": 1.0}
+
+
+def test_duplicate_user_is_rejected_and_original_kept(storage):
+    storage.users.insert(_user("a@x.com", name="First"))
+    with pytest.raises(DuplicateUserError):
+        storage.users.insert(_user("a@x.com", name="Second", role="therapist"))
+    assert storage.users.find_by_email("a@x.com")["name"] == "First"
+    assert storage.users.count_by_role("patient") == 1
+    assert storage.users.count_by_role("therapist") == 0
+
+
+def test_insert_many_stops_at_the_first_duplicate(storage):
+    storage.users.insert(_user("b@x.com", name="Stored"))
+    with pytest.raises(DuplicateUserError):
+        storage.users.insert_many([_user("a@x.com"), _user("b@x.com", name="Replacement"), _user("c@x.com")])
+    assert storage.users.find_by_email("a@x.com") is not None
+    assert storage.users.find_by_email("b@x.com")["name"] == "Stored"
+    assert storage.users.find_by_email("c@x.com") is None
+
+
+def test_repeated_email_within_one_batch_is_rejected(storage):
+    with pytest.raises(DuplicateUserError):
+        storage.users.insert_many([_user("a@x.com", name="First"), _user("a@x.com", name="Second")])
+    assert storage.users.find_by_email("a@x.com")["name"] == "First"
+
+
+def test_list_by_role_keeps_registration_order(storage):
+    storage.users.insert_many([_user(f"{i}@x.com", name=str(i)) for i in range(5)])
+    page = storage.users.list_by_role("patient", skip=1, limit=3, fields=("name",))
+    assert page == [{"name": "1"}, {"name": "2"}, {"name": "3"}]
+
+
+def test_incomplete_backend_fails_at_construction():
+    class HalfUsers(UserRepository):
+        def find_by_email(self, email):
+            return None
+
+    with pytest.raises(TypeError):
+        HalfUsers()
@@ -0,0 +1,71 @@
+"""Telemetry archive: lossless angles, timestamps within tolerance, v1 archives."""
+import struct
+import zlib
+
+import numpy as np
+import pytest
+
+import telemetry
+
+
+def _session(n=3000, fps=30.0, jitter_ms=2.0, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.round(np.arange(n) / fps + rng.normal(0, jitter_ms / 1000, n), 2)
+    t[n // 2:] += 4.0  # a pause mid-session
+    right = (100 + 60 * np.sin(np.arange(n) / 15)).astype(np.int16)
+    left = np.where(rng.random(n) < 0.05, 0, right - 3).astype(np.int16)
+    return np.sort(t), right, left
+
+
+def test_round_trip():
+    t, right, left = _session()
+    series = telemetry.decode(telemetry.encode(t, right, left))
+
+    np.testing.assert_array_equal(series.right, right)
+    np.testing.assert_array_equal(series.left, left)
+    assert np.abs(series.time - t).max() * 1000 <= telemetry.TIME_TOLERANCE_MS + 0.5
+
+
+def test_large_archives_split_into_chunks():
+    rng = np.random.default_rng(1)
+    n = 400_000
+    t = np.cumsum(rng.uniform(0.01, 0.2, n))
+    angles = rng.integers(0, 180, n).astype(np.int16)
+    chunks = telemetry.encode(t, angles, angles, level=1)
+
+    assert len(chunks) > 1 and all(len(c) <= telemetry.CHUNK_SIZE for c in chunks)
+    np.testing.assert_array_equal(telemetry.decode(chunks).right, angles)
+
+
+def test_empty_series():
+    series = telemetry.decode(telemetry.encode([], [], []))
+    assert len(series) == 0
+
+
+def test_version_1_archives_still_decode():
+    t_ms = np.array([0, 33, 67, 100], dtype=np.int64)
+    right = np.array([90, 91, 95, 0], dtype=np.int16)
+    payload = b"".join([
+        telemetry.HEADER.pack(telemetry.MAGIC, 1, t_ms.size),
+        telemetry._shuffle(np.diff(t_ms, prepend=0).astype(np.int32)),
+        telemetry._shuffle(np.diff(right, prepend=0).astype(np.int16)),
+        telemetry._shuffle(np.diff(right, prepend=0).astype(np.int16)),
+    ])
+    series = telemetry.decode([zlib.compress(payload)])
+
+    np.testing.assert_allclose(series.time, t_ms / 1000)
+    np.testing.assert_array_equal(series.left, right)
+
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        telemetry.decode([zlib.compress(struct.pack("<4sBI", b"XXXX", 2, 0))])
+
+
+def test_archive_metadata_and_rom():
+    t, right, left = _session()
+    chunks, meta, rom = telemetry.archive(telemetry.TelemetrySeries(t, right, left))
+
+    assert meta == {"samples": t.size, "bytes": sum(map(len, chunks)), "chunks": len(chunks)}
+    assert rom["RIGHT"] == telemetry.measured_rom(right)
+    assert 100 <= rom["RIGHT"] <= 120
@@ -0,0 +1,218 @@
+"""
+Warm pool of pose models and capture devices
+Holistic graphs are built once, run on a blank frame so their first real frame
+is fast, and handed back and forth between sessions instead of being closed.
+Returned models are reset (graph restarted, tracking/smoothing state cleared)
+on a background thread, so the next checkout is immediate.
+"""
+import threading
+from typing import Dict, List, Optional, Union
+
+import cv2
+import numpy as np
+
+from pose_replay import FramePacer, ReplayCapture, ReplayModel, load_source
+
+# Defaults of the workout session (model_complexity=0 is the fastest model)
+DEFAULT_MODEL_OPTIONS = {
+    'min_detection_confidence': 0.5,
+    'min_tracking_confidence': 0.5,
+    'model_complexity': 0,
+    'smooth_landmarks': True,
+}
+
+FRAME_WIDTH = 640
+FRAME_HEIGHT = 480
+
+
+def _options_key(options: dict) -> tuple:
+    return tuple(sorted(options.items()))
+
+
+class VideoFileCapture:
+    """Plays a video file like a live camera: paced at its frame rate, resized, looped."""
+
+    def __init__(self, path: str):
+        self.cap = cv2.VideoCapture(path)
+        self.pacer = FramePacer(self.cap.get(cv2.CAP_PROP_FPS) or 30.0)
+
+    def isOpened(self) -> bool:
+        return self.cap.isOpened()
+
+    def read(self):
+        self.pacer.wait()
+        ok, image = self.cap.read()
+        if not ok:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ok, image = self.cap.read()
+        if ok and image.shape[:2] != (FRAME_HEIGHT, FRAME_WIDTH):
+            image = cv2.resize(image, (FRAME_WIDTH, FRAME_HEIGHT))
+        return ok, image
+
+    def set(self, prop, value) -> bool:
+        return True
+
+    def release(self):
+        self.cap.release()
+
+
+class VisionPool:
+    def __init__(self,
+                 max_models: int = 2,
+                 keep_camera_open: bool = False,
+                 camera_index: Union[int, str] = 0,
+                 replay: Optional[str] = None):
+        """
+        Args:
+            max_models: Idle models kept per option set; extras are closed on release
+            keep_camera_open: Keep the capture device open between sessions
+                (instant restarts, but the camera light stays on)
+            camera_index: Device index, or a video file played as a camera
+            replay: Pose recording (or "synthetic") standing in for camera and
+                MediaPipe, e.g. for load tests
+        """
+        self.max_models = max_models
+        self.keep_camera_open = keep_camera_open
+        self.camera_index = camera_index
+        self.replay = replay
+        self._recording = None
+
+        self._idle: Dict[tuple, List] = {}
+        self._resetting: Dict[tuple, int] = {}
+        self._camera = None
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.stats = {'created': 0, 'reused': 0, 'resets': 0, 'camera_opens': 0, 'camera_reuses': 0}
+
+    # --- POSE MODELS ---
+    def acquire_model(self, **options):
+        """Checks out a warm Holistic model (built on demand when the pool is empty)."""
+        if self.replay:
+            return ReplayModel(self._replay_recording())
+        options = {**DEFAULT_MODEL_OPTIONS, **options}
+        key = _options_key(options)
+        with self._cond:
+            # A model being reset is ready sooner than a new one would be built
+            while not self._idle.get(key) and self._resetting.get(key):
+                self._cond.wait()
+            if self._idle.get(key):
+                self.stats['reused'] += 1
+                return self._idle[key].pop()
+            self.stats['created'] += 1
+        return self._build_model(options)
+
+    def release_model(self, model, **options):
+        """Returns a model; it is reset and warmed in the background before reuse."""
+        if isinstance(model, ReplayModel):
+            return
+        key = _options_key({**DEFAULT_MODEL_OPTIONS, **options})
+        with self._cond:
+            pooled = len(self._idle.get(key, [])) + self._resetting.get(key, 0)
+            if self._closed or pooled >= self.max_models:
+                model.close()
+                return
+            self._resetting[key] = self._resetting.get(key, 0) + 1
+        threading.Thread(target=self._reset_model, args=(key, model),
+                         name="pose-model-reset", daemon=True).start()
+
+    def prewarm(self, count: int = 1, **options):
+        """Fills the pool with `count` ready models (call from a background thread)."""
+        if self.replay:
+            return
+        options = {**DEFAULT_MODEL_OPTIONS, **options}
+        key = _options_key(options)
+        while True:
+            with self._cond:
+                if self._closed or len(self._idle.get(key, [])) >= min(count, self.max_models):
+                    return
+            model = self._build_model(options)
+            self.stats['created'] += 1
+            with self._cond:
+                self._idle.setdefault(key, []).append(model)
+                self._cond.notify_all()
+
+    def _build_model(self, options: dict):
+        # Imported on first build: replays and benchmarks never load MediaPipe
+        import mediapipe as mp
+        model = mp.solutions.holistic.Holistic(**options)
+        self._warm(model)
+        return model
+
+    def _reset_model(self, key: tuple, model):
+        try:
+            model.reset()
+            self._warm(model)
+            ok = True
+        except Exception as e:
+            print(f"⚠️ Pose model reset failed, discarding it: {e}")
+            model.close()
+            ok = False
+        with self._cond:
+            self._resetting[key] -= 1
+            if ok and not self._closed:
+                self.stats['resets'] += 1
+                self._idle.setdefault(key, []).append(model)
+            elif ok:
+                model.close()
+            self._cond.notify_all()
+
+    def _replay_recording(self):
+        with self._cond:
+            if self._recording is None:
+                self._recording = load_source(self.replay)
+            return self._recording
+
+    @staticmethod
+    def _warm(model):
+        # First inference initializes the TFLite interpreters
+        model.process(np.zeros((FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8))
+
+    # --- CAPTURE DEVICES ---
+    def acquire_camera(self):
+        """Returns an opened, configured capture device."""
+        with self._cond:
+            cap, self._camera = self._camera, None
+        if cap is not None and cap.isOpened():
+            self.stats['camera_reuses'] += 1
+            return cap
+
+        self.stats['camera_opens'] += 1
+        if self.replay:
+            return ReplayCapture(self._replay_recording(), FRAME_WIDTH, FRAME_HEIGHT)
+        if isinstance(self.camera_index, str):
+            return VideoFileCapture(self.camera_index)
+        cap = cv2.VideoCapture(self.camera_index)
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, FRAME_WIDTH)  # Lower res for speed
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, FRAME_HEIGHT)
+        cap.set(cv2.CAP_PROP_FPS, 30)
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimal buffer for low latency
+        return cap
+
+    def release_camera(self, cap):
+        with self._cond:
+            if self.keep_camera_open and not self._closed and self._camera is None and cap.isOpened():
+                self._camera = cap
+                return
+        cap.release()
+
+    # --- LIFECYCLE ---
+    def close(self):
+        with self._cond:
+            self._closed = True
+            models = [m for idle in self._idle.values() for m in idle]
+            self._idle.clear()
+            cap, self._camera = self._camera, None
+        for model in models:
+            model.close()
+        if cap is not None:
+            cap.release()
+
+    def status(self) -> dict:
+        with self._cond:
+            return {
+                **self.stats,
+                'idle_models': sum(len(v) for v in self._idle.values()),
+                'resetting': sum(self._resetting.values()),
+                'camera_open': self._camera is not None,
+            }
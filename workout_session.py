@@ -2,28 +2,42 @@
 Main workout session manager - OPTIMIZED FOR SPEED & ACCURACY
 """
 import cv2
-import mediapipe as mp
 import numpy as np
+import threading
 import time
 from typing import Tuple, Optional
 from collections import deque
 
-from mediapipe.python.solutions.holistic import PoseLandmark as mp_pose_lm 
+from constants import PoseLandmark as mp_pose_lm
 # NOTE: 'models', 'ai_engine', 'constants', 'angle_calculator', 
 # 'pose_processor', 'calibration', 'rep_counter' are assumed to exist.
-from models import ArmMetrics, CalibrationData, SessionHistory, GhostPose, Landmark2D 
+from models import ArmMetrics, CalibrationData, SessionHistory, GhostPose, Landmark2D, ReportSnapshot, StateSnapshot
 from ai_engine import AIEngine
+from vision_pool import VisionPool
+from auto_calibration import AutoCalibrator
+from calibration import is_profile_usable
+from frame_profiler import FrameProfiler
+from latency import monotonic_ms
+from motion_gate import MotionGate
+from frame_scheduler import FrameScheduler
+from pose_predictor import LandmarkPredictor
+from pose_replay import ReplayCapture
+from ghost_engine import GhostEngine
+from telemetry import LiveSeries
 
 
 class WorkoutSession:
     """Manages entire workout session state with optimized performance"""
     
-    def __init__(self, exercise_name: str = "Bicep Curl"):
+    def __init__(self, exercise_name: str = "Bicep Curl", vision_pool: Optional[VisionPool] = None,
+                 profiler: Optional[FrameProfiler] = None,
+                 motion_gate: Optional[MotionGate] = None):
         from constants import (WorkoutPhase, MIN_DETECTION_CONFIDENCE, 
                                MIN_TRACKING_CONFIDENCE, WORKOUT_COUNTDOWN_TIME,
                                CALIBRATION_HOLD_TIME, SMOOTHING_WINDOW, 
                                SAFETY_MARGIN, MIN_REP_DURATION, 
-                               EXERCISE_PRESETS, ArmStage, ExerciseJoint) 
+                               EXERCISE_PRESETS, ArmStage, ExerciseJoint,
+                               GHOST_LOOKAHEAD_DEFAULT) 
         
         from angle_calculator import AngleCalculator
         from pose_processor import PoseProcessor
@@ -61,6 +75,9 @@ class WorkoutSession:
         
         self.rep_counter = RepCounter(calibration_data, MIN_REP_DURATION)
         self.history = SessionHistory()
+        # Angle series published with every state snapshot (serves /report_series)
+        self.live_series = LiveSeries()
+        self.auto_calibrator: Optional[AutoCalibrator] = None
         
         # MediaPipe - Optimized for speed
         self.holistic_model = None
@@ -68,9 +85,32 @@ class WorkoutSession:
         self.min_detection_conf = 0.5  # Balanced for speed
         self.min_tracking_conf = 0.5  # Balanced for speed
 
-        # AI State Management - Optimized timing
-        self.last_ai_check = 0
-        self.ai_interval = 0.1  # Fast checks (100ms)
+        # Models and cameras are checked out of a (warm) pool; a private pool
+        # with no idle slots simply builds and closes them per session
+        self.vision_pool = vision_pool or VisionPool(max_models=0)
+        # Held while a frame uses the camera/model so stop() never returns them mid-frame
+        self._frame_lock = threading.Lock()
+        # Per-stage timings (None when profiling is off: one truthiness check per stage)
+        self.profiler = profiler
+        # Skips pose inference on still frames (None: infer every frame)
+        self.motion_gate = motion_gate
+        self._last_results = None
+        # Optional PoseRecorder fed every frame's pose results (see pose_replay.py)
+        self.recorder = None
+        # Session clock; replays substitute the recorded timestamps
+        self.clock = time.time
+
+        # Decides which deferrable work (ghost, AI check, emit, encode)
+        # fits each frame's budget; the AI check runs at most every 100 ms
+        self.scheduler = FrameScheduler()
+
+        # Extrapolates the ghost's landmarks to when the browser shows them:
+        # server time since capture plus ghost_lookahead (network + display, in
+        # seconds, set from the viewers' measured latency)
+        self.ghost_predictor = LandmarkPredictor()
+        self.ghost_lookahead = GHOST_LOOKAHEAD_DEFAULT
+        # Ideal rep trajectory, rebuilt whenever the calibrated thresholds change
+        self.ghost_engine = GhostEngine(self.exercise_config)
         
         self.ai_latched_state = {
             'RIGHT': False,
@@ -114,87 +154,240 @@ class WorkoutSession:
         # Cache for performance
         self._last_ghost_update = 0
         self._ghost_update_interval = 0.0 # Update every frame
+
+        # Published snapshots: the only state other threads may read
+        self._report_key = None
+        self._report_snapshot: Optional[ReportSnapshot] = None
+        self._frame_id = 0
+        # Monotonic capture stamp of the frame being processed (see latency.py)
+        self._capture_ms = 0.0
+        self.state_snapshot: Optional[StateSnapshot] = None
     
-    def start(self):
-        """Initialize new workout session - FAST START"""
-        from constants import WorkoutPhase
+    def start(self, calibration_profile: Optional[dict] = None, calibration_mode: Optional[str] = None,
+              capture: bool = True):
+        """
+        Initialize new workout session - FAST START
+        A usable stored calibration profile replaces the full calibration with a 1 s check;
+        otherwise "auto" mode starts counting at once and "hold" runs the extend/contract holds.
+        capture=False skips the camera and pose model (results come from process_results).
+        """
+        from constants import WorkoutPhase, DEFAULT_CALIBRATION_MODE
         
         for arm in ['RIGHT', 'LEFT']:
             self.arm_metrics[arm] = ArmMetrics()
         
         self.history.reset()
+        # New arrays: snapshots of an earlier run keep viewing the old ones
+        self.live_series = LiveSeries()
         self.pose_processor.angle_calculator.reset_buffers()
         self.landmark_buffer.clear()
         self.color_buffer.clear()
+        self._last_results = None
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+        self.ghost_predictor.reset()
         
         self.ai_latched_state = {'RIGHT': False, 'LEFT': False}
         self.last_feedback_text = {'RIGHT': "", 'LEFT': ""}
         self.ghost_pose = GhostPose(instruction="Ready...", connections=self.ghost_connections) 
 
-        # Start camera with optimal settings for SPEED
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)  # Lower res for speed
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # Minimal buffer for low latency
-        
-        # Fast MediaPipe initialization
-        self.holistic_model = mp.solutions.holistic.Holistic(
-            min_detection_confidence=self.min_detection_conf,
-            min_tracking_confidence=self.min_tracking_conf,
-            model_complexity=0,  # Fastest model
-            smooth_landmarks=True  # Built-in smoothing
-        )
-        
-        self.calibration_manager.start()
-        self.phase = WorkoutPhase.CALIBRATION
+        # Camera (640x480 @ 30fps, 1-frame buffer) and a warm MediaPipe model
+        if capture:
+            with self._frame_lock:
+                self.cap = self.vision_pool.acquire_camera()
+                self.holistic_model = self.vision_pool.acquire_model(**self._model_options())
+        self.scheduler = FrameScheduler(clock_ns=self._scheduler_clock(capture))
+        self.calibration_manager.clock = self.clock
+        
+        # Loaded lazily so API-only processes never import joblib/sklearn
+        AIEngine.load_model()
+
+        self.auto_calibrator = None
+        self.rep_counter.feedback_enabled = True
+        calibration_mode = calibration_mode or DEFAULT_CALIBRATION_MODE
+        if calibration_mode == "auto" and not is_profile_usable(calibration_profile):
+            self._start_auto_calibration()
+        else:
+            self.calibration_manager.start(calibration_profile, calibration_mode)
+            self.phase = WorkoutPhase.CALIBRATION
+        self._report_key = None
+        self._publish()
     
+    def _start_auto_calibration(self, prefix: str = ""):
+        """Straight to ACTIVE on default thresholds; no calibration or countdown phase."""
+        from constants import WorkoutPhase, SAFETY_MARGIN
+
+        self.calibration_manager.start_auto(prefix)
+        self.auto_calibrator = AutoCalibrator(self.calibration_manager.data, SAFETY_MARGIN)
+        # Form feedback on unlearned thresholds would be noise
+        self.rep_counter.feedback_enabled = False
+        self.start_time = self.clock()
+        for metrics in self.arm_metrics.values():
+            metrics.last_down_time = metrics.stage_start_time = self.start_time
+        self.phase = WorkoutPhase.ACTIVE
+
+    def _update_auto_calibration(self, angles: dict):
+        from constants import AUTO_CALIBRATION_REPS
+
+        calibrator = self.auto_calibrator
+        settled = calibrator.add(angles)
+        found = min(len(calibrator.peaks), len(calibrator.valleys))
+        self.calibration_manager.data.progress = int(found / AUTO_CALIBRATION_REPS * 100)
+        if not settled:
+            return
+
+        # Count the early reps again on the settled thresholds
+        counter, metrics, feedback = AutoCalibrator.recount(
+            self.history, self.start_time, self.calibration_manager.data, self.rep_counter.min_rep_duration)
+        for arm in ['RIGHT', 'LEFT']:
+            live, replayed = self.arm_metrics[arm], metrics[arm]
+            live.rep_count = replayed.rep_count
+            live.stage = replayed.stage
+            live.rep_time = replayed.rep_time
+            live.min_rep_time = replayed.min_rep_time
+            live.curr_rep_time = replayed.curr_rep_time
+            live.last_down_time = replayed.last_down_time
+        self.history.right_feedback_count += feedback['RIGHT']
+        self.history.left_feedback_count += feedback['LEFT']
+        self.rep_counter = counter
+        self.calibration_manager.finish_auto()
+
     def stop(self):
-        """Clean up session resources"""
+        """Return camera and model to the pool; waits for the frame in flight, after which no frame runs"""
         from constants import WorkoutPhase
         
-        if self.cap:
-            self.cap.release()
-        if self.holistic_model:
-            self.holistic_model.close()
-            self.holistic_model = None
-        
         self.phase = WorkoutPhase.INACTIVE
+        with self._frame_lock:
+            if self.motion_gate is not None and self.motion_gate.frames:
+                print(f"🎯 Pose inference skipped on {self.motion_gate.skip_ratio:.0%} of frames")
+            if self.cap:
+                self.vision_pool.release_camera(self.cap)
+                self.cap = None
+            if self.holistic_model:
+                self.vision_pool.release_model(self.holistic_model, **self._model_options())
+                self.holistic_model = None
+
+    def _scheduler_clock(self, capture: bool):
+        """
+        Wall time for live cameras; the recording's frame clock for replays
+        (VISION_REPLAY captures, or process_results driven by a recorded clock).
+        """
+        if not capture:
+            return lambda: int(self.clock() * 1e9)
+        if isinstance(self.cap, ReplayCapture):
+            return self.cap.clock_ns
+        return time.perf_counter_ns
+
+    def _model_options(self) -> dict:
+        return {
+            'min_detection_confidence': self.min_detection_conf,
+            'min_tracking_confidence': self.min_tracking_conf,
+            'model_complexity': 0,  # Fastest model
+            'smooth_landmarks': True,  # Built-in smoothing
+        }
     
     def process_frame(self) -> Tuple[Optional[np.ndarray], bool]:
         """Process single frame - OPTIMIZED FOR SPEED"""
+        with self._frame_lock:
+            return self._process_frame_locked()
+
+    def _process_frame_locked(self) -> Tuple[Optional[np.ndarray], bool]:
         from constants import WorkoutPhase
         
         if not self.cap or not self.cap.isOpened():
             return None, False
         
+        p = self.profiler
+        t = p.now() if p else 0
         success, image = self.cap.read()
+        self._capture_ms = monotonic_ms()
         if not success:
+            if p:
+                p.drop("capture_failed")
             return None, False
+        # The frame ends after emit/encode in the stream loop (scheduler.end_frame)
+        self.scheduler.begin_frame(self.clock())
+        if p:
+            t = p.lap("capture", t)
         
         # FIX: Ensure non-mirrored (Observer) view for correct form perception 
         image = cv2.flip(image, 1)
-
-        # MediaPipe processing - minimal overhead
-        image.flags.writeable = False
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        results = self.holistic_model.process(image)
-        image.flags.writeable = True
-        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        if p:
+            t = p.lap("flip", t)
+
+        gate = self.motion_gate
+        infer = True
+        if gate is not None:
+            infer = gate.should_infer(image) or self._last_results is None
+            if p:
+                t = p.lap("motion_gate", t)
+
+        if infer:
+            # MediaPipe processing - minimal overhead
+            image.flags.writeable = False
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            if p:
+                t = p.lap("color_to_rgb", t)
+            results = self.holistic_model.process(image)
+            if p:
+                t = p.lap("pose_inference", t)
+            image.flags.writeable = True
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+            if p:
+                t = p.lap("color_to_bgr", t)
+            if gate is not None:
+                gate.update_landmarks(results)
+            self._last_results = results
+        else:
+            # Patient still: the last pose stands (no inference, no colour conversions)
+            results = self._last_results
         
-        current_time = time.time()
+        current_time = self.clock()
+        if self.recorder is not None:
+            self.recorder.add(results, current_time)
         
-        # Handle different phases
+        phase = self.phase
+        self._process_phase(results, current_time)
+        if p:
+            # The active phase times its own stages
+            t = p.lap("calibration", t) if phase == WorkoutPhase.CALIBRATION else p.now()
+        
+        # Skip drawing user skeleton for speed (ghost is enough)
+
+        self._publish()
+        if p:
+            p.lap("state_snapshot", t)
+        
+        return image, True
+
+    def process_results(self, results) -> bool:
+        """
+        Runs one frame of already-inferred pose results (replays, benchmarks).
+        Returns False once the session is stopped.
+        """
+        from constants import WorkoutPhase
+
+        with self._frame_lock:
+            if self.phase == WorkoutPhase.INACTIVE:
+                return False
+            self._capture_ms = monotonic_ms()
+            now = self.clock()
+            self.scheduler.begin_frame(now)
+            self._process_phase(results, now)
+            self._publish()
+            self.scheduler.end_frame()
+            return True
+
+    def _process_phase(self, results, current_time: float):
+        """Handle different phases"""
+        from constants import WorkoutPhase
+
         if self.phase == WorkoutPhase.CALIBRATION:
             self._process_calibration(results, current_time)
         elif self.phase == WorkoutPhase.COUNTDOWN:
             self._process_countdown(current_time)
         elif self.phase == WorkoutPhase.ACTIVE:
             self._process_workout(results, current_time)
-        
-        # Skip drawing user skeleton for speed (ghost is enough)
-        
-        return image, True
     
     def _process_calibration(self, results, current_time: float):
         """Handle calibration phase"""
@@ -203,6 +396,9 @@ class WorkoutSession:
         if complete:
             self.phase = WorkoutPhase.COUNTDOWN
             self.start_time = current_time
+        elif self.calibration_manager.auto_fallback:
+            # Stored profile failed its check in auto mode: learn from the first reps instead
+            self._start_auto_calibration(prefix="Range changed. ")
             
         if results.pose_landmarks:
              self.ghost_pose.instruction = self.calibration_manager.data.message
@@ -256,14 +452,16 @@ class WorkoutSession:
             return self.color_buffer[1]
         return new_color
 
-    def _calculate_ideal_pose_realtime(self, reference_landmarks) -> None:
+    def _calculate_ideal_pose_realtime(self, points: np.ndarray, visible: np.ndarray) -> None:
         """
         OPTIMIZED: Real-time ghost calculation with minimal overhead.
-        Uses RAW (unsmoothed) landmark data for maximum speed.
+        Uses the (33, 2) landmark array from the predictor (unsmoothed) and the
+        precomputed trajectory of the ghost engine: each exercise limb is shown
+        a little further along the ideal rep than the patient.
         """
-        from constants import ArmStage, ExerciseJoint
+        from constants import ArmStage
 
-        current_time = time.time()
+        current_time = self.clock()
         
         self._last_ghost_update = current_time
 
@@ -287,90 +485,15 @@ class WorkoutSession:
         if metrics.feedback:
             instruction = metrics.feedback.replace("AI: ", "")
             
-        # 3. Build Full Body Ghost - DIRECT COPY (NO SMOOTHING APPLIED HERE)
-        target_landmarks_2d = {}
-        try:
-            # Copy all detected landmarks directly from the CURRENT frame
-            for idx in range(33):
-                if idx < len(reference_landmarks) and reference_landmarks[idx].visibility > 0.0:
-                    lm = reference_landmarks[idx]
-                    target_landmarks_2d[idx] = Landmark2D(x=lm.x, y=lm.y)
-        except Exception:
-            self.ghost_pose.instruction = "LOST"
-            self.ghost_pose.color = "GRAY"
-            return
-
-        # 4. Adjust ONLY exercise limbs to show ideal position
-        R_A, R_B, R_C = self.exercise_config.right_landmarks
-        L_A, L_B, L_C = self.exercise_config.left_landmarks
-
-        target_angle = (self.calibration_manager.data.contracted_threshold 
-                        if target_stage == ArmStage.UP.value 
-                        else self.calibration_manager.data.extended_threshold)
-
-        # --- OPTIMIZED IK CALCULATION (Right Side) ---
-        if all(lm in target_landmarks_2d for lm in [R_A, R_B, R_C]):
-            P_A = np.array([target_landmarks_2d[R_A].x, target_landmarks_2d[R_A].y])
-            P_B = np.array([target_landmarks_2d[R_B].x, target_landmarks_2d[R_B].y])
-            
-            # Calculate limb length B->C
-            orig_len_BC = np.hypot(reference_landmarks[R_C].x - reference_landmarks[R_B].x, 
-                                   reference_landmarks[R_C].y - reference_landmarks[R_B].y)
-            
-            # Vector B -> A (Proximal segment)
-            V_BA = P_A - P_B 
-            angle_BA = np.arctan2(V_BA[1], V_BA[0])
-
-            # Rotation required (Elbow/Knee joints flex *inward*)
-            if self.exercise_config.joint_to_track in [ExerciseJoint.ELBOW, ExerciseJoint.KNEE]:
-                rotation_angle = np.pi - np.radians(target_angle)
-            else:
-                rotation_angle = np.radians(target_angle)
-
-            # Check if user is facing left or right (based on shoulder X position)
-            if target_landmarks_2d[R_A].x > target_landmarks_2d[L_A].x: # Facing right/away
-                 final_angle = angle_BA + rotation_angle 
-            else: # Facing left/towards
-                 final_angle = angle_BA - rotation_angle 
-            
-            # Set new position for right limb (R_C)
-            target_landmarks_2d[R_C] = Landmark2D(
-                x=P_B[0] + orig_len_BC * np.cos(final_angle),
-                y=P_B[1] + orig_len_BC * np.sin(final_angle)
-            )
-
-        # --- OPTIMIZED IK CALCULATION (Left Side) ---
-        if all(lm in target_landmarks_2d for lm in [L_A, L_B, L_C]):
-            P_A_L = np.array([target_landmarks_2d[L_A].x, target_landmarks_2d[L_A].y])
-            P_B_L = np.array([target_landmarks_2d[L_B].x, target_landmarks_2d[L_B].y])
-            
-            orig_len_BC_L = np.hypot(reference_landmarks[L_C].x - reference_landmarks[L_B].x,
-                                     reference_landmarks[L_C].y - reference_landmarks[L_B].y)
-            
-            V_BA_L = P_A_L - P_B_L
-            angle_BA_L = np.arctan2(V_BA_L[1], V_BA_L[0])
-
-            if self.exercise_config.joint_to_track in [ExerciseJoint.ELBOW, ExerciseJoint.KNEE]:
-                 rotation_angle = np.pi - np.radians(target_angle)
-            else:
-                 rotation_angle = np.radians(target_angle)
-
-            # Mirror logic for the left arm
-            if target_landmarks_2d[R_A].x > target_landmarks_2d[L_A].x: # Facing right/away
-                 final_angle_L = angle_BA_L - rotation_angle 
-            else: # Facing towards/left
-                 final_angle_L = angle_BA_L + rotation_angle 
-
-            target_landmarks_2d[L_C] = Landmark2D(
-                x=P_B_L[0] + orig_len_BC_L * np.cos(final_angle_L),
-                y=P_B_L[1] + orig_len_BC_L * np.sin(final_angle_L)
-            )
-
-        # 5. NO LANDMARK SMOOTHING APPLIED HERE FOR MAX SPEED
-        smoothed_landmarks = target_landmarks_2d
+        # 3. Full body ghost with the exercise limbs moved along the calibrated trajectory
+        cal = self.calibration_manager.data
+        engine = self.ghost_engine
+        engine.calibrate(cal.extended_threshold, cal.contracted_threshold)
+        phases = (engine.target_phase(metrics.stage, metrics.angle),
+                  engine.target_phase(self.arm_metrics['LEFT'].stage, self.arm_metrics['LEFT'].angle))
+        engine.render(points, visible, phases, self.ghost_pose.points, self.ghost_pose.visible)
 
         # Update ghost pose
-        self.ghost_pose.landmarks = smoothed_landmarks
         self.ghost_pose.color = ghost_color
         self.ghost_pose.instruction = instruction
 
@@ -386,13 +509,22 @@ class WorkoutSession:
             self.ghost_pose.color = "GRAY"
             return
         
-        # 1. Fast AI checks (throttled to 100ms)
-        if (current_time - self.last_ai_check) > self.ai_interval:
-            self.last_ai_check = current_time
+        p = self.profiler
+        t = p.now() if p else 0
+
+        sched = self.scheduler
+
+        # 1. Fast AI checks (throttled to 100ms, deferred under load)
+        if sched.begin("ai_check"):
             self._update_ai_latch(results)
+            sched.end("ai_check")
+            if p:
+                t = p.lap("ai_check", t)
 
         # 2. Get Angles (Uses built-in smoothing or AngleCalculator's smoothing)
         angles = self.pose_processor.get_both_arm_angles(results)
+        if p:
+            t = p.lap("angles", t)
         
         # 3. Process each arm
         for arm in ['RIGHT', 'LEFT']:
@@ -432,15 +564,29 @@ class WorkoutSession:
                 
             else:
                 self.arm_metrics[arm].feedback_color = "GRAY"
-
-        # 4. Update Ghost - REAL-TIME (updates every frame now)
-        if results.pose_landmarks:
-             self._calculate_ideal_pose_realtime(results.pose_landmarks.landmark)
+        if p:
+            t = p.lap("rep_counting", t)
+
+        # 4. Update Ghost - REAL-TIME (every frame the budget allows); the
+        # predictor sees every frame so its velocities stay current
+        self.ghost_predictor.update(results.pose_landmarks.landmark, current_time)
+        if sched.begin("ghost"):
+            # Time since capture on the scheduler's clock, so replays predict the same pose
+            horizon = sched.elapsed() + self.ghost_lookahead
+            self._calculate_ideal_pose_realtime(self.ghost_predictor.predict(horizon),
+                                                self.ghost_predictor.visible)
+            sched.end("ghost")
+        if p:
+            p.lap("ghost", t)
 
         # Log history
         self.history.time.append(round(current_time - self.start_time, 2))
         self.history.right_angle.append(angles['RIGHT'] or 0)
         self.history.left_angle.append(angles['LEFT'] or 0)
+        self.live_series.append(self.history.time[-1], self.history.right_angle[-1], self.history.left_angle[-1])
+
+        if self.auto_calibrator is not None and not self.auto_calibrator.settled:
+            self._update_auto_calibration(angles)
 
     def _update_ai_latch(self, results):
         """Fast AI inference"""
@@ -478,7 +624,7 @@ class WorkoutSession:
     
     def get_state_dict(self) -> dict:
         """
-        Get current state for API.
+        Get current state for API (frame thread only; other threads read state_snapshot).
         
         FIX: Swaps the metrics output to match the non-mirrored screen display.
         The user's physical RIGHT arm appears on the LEFT of the screen, 
@@ -504,17 +650,54 @@ class WorkoutSession:
                 'progress': self.calibration_manager.data.progress
             },
             'ghost_pose': {
-                'landmarks': {
-                    str(k): [v.x, v.y] for k, v in self.ghost_pose.landmarks.items()
-                },
+                'landmarks': self.ghost_pose.landmarks_dict(),
                 'color': self.ghost_pose.color,
                 'instruction': self.ghost_pose.instruction,
                 'connections': self.ghost_connections
             }
         }
     
+    def _report_state_key(self) -> tuple:
+        """Everything the report depends on; duration only counts in whole seconds."""
+        r, l = self.arm_metrics['RIGHT'], self.arm_metrics['LEFT']
+        cal = self.calibration_manager.data
+        return (
+            r.rep_count, r.min_rep_time, self.history.right_feedback_count,
+            l.rep_count, l.min_rep_time, self.history.left_feedback_count,
+            cal.extended_threshold, cal.contracted_threshold,
+            cal.safe_angle_min, cal.safe_angle_max, self.calibration_manager.source,
+            int(self.history.time[-1]) if self.history.time else 0,
+        )
+
+    def _publish(self):
+        """
+        Called from the frame thread once per frame. The report is only rebuilt
+        on rep/feedback events; the state snapshot is swapped in by a single
+        attribute assignment.
+        """
+        key = self._report_state_key()
+        if key != self._report_key:
+            self._report_key = key
+            self._report_snapshot = ReportSnapshot.build(self.get_final_report())
+
+        self._frame_id += 1
+        timestamp = self.clock()
+        state = self.get_state_dict()
+        # Lets clients order updates and measure delivery latency
+        state['frame_id'] = self._frame_id
+        state['timestamp'] = timestamp
+        # Server monotonic ms; app.py sends the 'emit' stamp alongside the update
+        state['timing'] = {'capture': self._capture_ms or monotonic_ms(), 'processed': monotonic_ms()}
+        self.state_snapshot = StateSnapshot(
+            frame_id=self._frame_id,
+            timestamp=timestamp,
+            state=state,
+            report=self._report_snapshot,
+            series=self.live_series.view(),
+        )
+
     def get_final_report(self) -> dict:
-        """Generate final session report"""
+        """Generate final session report (frame thread only; other threads read state_snapshot.report)"""
         # The final report does not need to be swapped, as it reports physical data.
         return {
             'exercise_name': self.exercise_config.name, 
@@ -535,6 +718,7 @@ class WorkoutSession:
                 'extended_threshold': self.calibration_manager.data.extended_threshold,
                 'contracted_threshold': self.calibration_manager.data.contracted_threshold,
                 'safe_min': self.calibration_manager.data.safe_angle_min,
-                'safe_max': self.calibration_manager.data.safe_angle_max
+                'safe_max': self.calibration_manager.data.safe_angle_max,
+                'source': self.calibration_manager.source
             }
         }
\ No newline at end of file